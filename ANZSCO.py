@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 from supabase_client import get_supabase_client
+from card_grid import card_grid
+from reference_data import load_ased_table, load_asced_detail
+from exports import export_buttons
 
 # 获取 Supabase 客户端
 supabase = get_supabase_client()
@@ -8,14 +11,28 @@ supabase = get_supabase_client()
 # 页面标题
 st.title("Australian Standard Classification of Education")
 
+
+def _code_names(rows, code_col):
+    """代码 → 名称（描述列按列名识别）"""
+    desc_col = next((c for c in (rows[0] if rows else {})
+                     if any(k in c.lower() for k in ("description", "name", "title"))), None)
+    return {str(r.get(code_col, "")).strip(): str(r.get(desc_col) or "") for r in rows}
+
+
+def asced_taxonomy(broad_code_col: str) -> pd.DataFrame:
+    """完整 ASCED 分类：每个细分领域及其所属的 narrow / broad 领域（导出时才生成）"""
+    broad = _code_names(load_ased_table("ased_broad"), broad_code_col)
+    narrow = _code_names(load_ased_table("ased_narrow"), "narrow_field_code")
+    detail = _code_names(load_asced_detail(), "detailed_field_code")
+    return pd.DataFrame([{
+        "Broad Code": code[:2], "Broad Field": broad.get(code[:2], ""),
+        "Narrow Code": code[:4], "Narrow Field": narrow.get(code[:4], ""),
+        "Detailed Code": code, "Detailed Field": name,
+    } for code, name in sorted(detail.items())])
+
 # 查询 ased_broad 表并在主要内容区域显示
 try:
-    ased_response = (
-        supabase.table("ased_broad")
-        .select("*")
-        .execute()
-    )
-    ased_broad_data = ased_response.data
+    ased_broad_data = load_ased_table("ased_broad")
     if ased_broad_data:
         st.markdown("### Australian Standard Classification of Education (ASCED) Classification Browser")
         ased_df = pd.DataFrame(ased_broad_data)
@@ -32,90 +49,9 @@ try:
         
         # 如果找到了 code 列，创建多级卡片选择器
         if code_column:
-            # 添加弹出框样式
+            # 当前选择的样式（卡片网格的样式在组件内）
             st.markdown("""
             <style>
-            /* 弹出框遮罩层 */
-            .modal-overlay {
-                display: none;
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background: rgba(0, 0, 0, 0.5);
-                z-index: 10000;
-                justify-content: center;
-                align-items: center;
-            }
-            
-            .modal-overlay.active {
-                display: flex;
-            }
-            
-            /* 弹出框内容 */
-            .modal-content {
-                background: white;
-                border-radius: 15px;
-                padding: 2rem;
-                max-width: 800px;
-                max-height: 80vh;
-                overflow-y: auto;
-                box-shadow: 0 10px 40px rgba(0,0,0,0.3);
-                position: relative;
-            }
-            
-            .modal-header {
-                font-size: 1.5rem;
-                font-weight: 700;
-                color: #007958;
-                margin-bottom: 1.5rem;
-                padding-bottom: 1rem;
-                border-bottom: 3px solid #007958;
-            }
-            
-            .modal-close {
-                position: absolute;
-                top: 1rem;
-                right: 1rem;
-                background: #f0f0f0;
-                border: none;
-                border-radius: 50%;
-                width: 30px;
-                height: 30px;
-                cursor: pointer;
-                font-size: 1.2rem;
-                color: #666;
-            }
-            
-            .modal-close:hover {
-                background: #e0e0e0;
-            }
-            
-            /* 选择卡片样式 */
-            .selection-card {
-                background: white;
-                border: 2px solid #e0e0e0;
-                border-radius: 10px;
-                padding: 1.5rem;
-                margin: 0.5rem;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }
-            
-            .selection-card:hover {
-                border-color: #007958;
-                box-shadow: 0 4px 8px rgba(0,121,88,0.2);
-                transform: translateY(-2px);
-            }
-            
-            .selection-card.selected {
-                border-color: #007958;
-                background: #f0f9f7;
-                box-shadow: 0 4px 12px rgba(0,121,88,0.3);
-            }
-            
             /* 当前选择显示 */
             .current-selection {
                 background: linear-gradient(135deg, #f0f9f7 0%, #ffffff 100%);
@@ -205,31 +141,27 @@ try:
             if st.session_state.show_broad_modal:
                 with st.expander("🔍 Select Broad Field", expanded=True):
                     st.markdown("### Select a Broad Field")
-                    # 显示 broad fields 选择卡片
-                    broad_cols = st.columns(3)
-                    for idx, (_, row) in enumerate(ased_df.iterrows()):
-                        col_idx = idx % 3
-                        with broad_cols[col_idx]:
-                            broad_code = str(row[code_column]).strip()
-                            if len(broad_code) == 1:
-                                broad_code = f"0{broad_code}"
-                            broad_desc = str(row[description_column]) if description_column else broad_code
-                            
-                            is_selected = st.session_state.selected_broad_code == broad_code
-                            
-                            if st.button(
-                                f"**{broad_desc}**\n\n`{broad_code}`",
-                                key=f"modal_broad_{broad_code}",
-                                use_container_width=True,
-                                type="primary" if is_selected else "secondary"
-                            ):
-                                st.session_state.selected_broad_code = broad_code
-                                st.session_state.selected_broad_desc = broad_desc
-                                st.session_state.show_broad_modal = False
-                                # 清除下级选择
-                                st.session_state.selected_narrow_code = None
-                                st.session_state.selected_narrow_desc = None
-                                st.rerun()
+                    # 显示 broad fields 选择卡片（整个网格是一个组件）
+                    broad_fields = {}
+                    for _, row in ased_df.iterrows():
+                        broad_code = str(row[code_column]).strip()
+                        if len(broad_code) == 1:
+                            broad_code = f"0{broad_code}"
+                        broad_fields[broad_code] = str(row[description_column]) if description_column else broad_code
+
+                    def select_broad(broad_code: str):
+                        st.session_state.selected_broad_code = broad_code
+                        st.session_state.selected_broad_desc = broad_fields[broad_code]
+                        st.session_state.show_broad_modal = False
+                        # 清除下级选择
+                        st.session_state.selected_narrow_code = None
+                        st.session_state.selected_narrow_desc = None
+
+                    card_grid(
+                        [{"id": code, "title": desc, "badge": code} for code, desc in broad_fields.items()],
+                        columns=3, theme="selection", selected=st.session_state.selected_broad_code,
+                        on_click=select_broad, key="broad_grid",
+                    )
                     
                     if st.button("Close", key="close_broad_modal"):
                         st.session_state.show_broad_modal = False
@@ -242,12 +174,7 @@ try:
                 with st.expander("🔍 Select Narrow Field", expanded=True):
                     st.markdown(f"### Select a Narrow Field (Broad: {selected_broad_code})")
                     try:
-                        narrow_response = (
-                            supabase.table("ased_narrow")
-                            .select("*")
-                            .execute()
-                        )
-                        narrow_all = narrow_response.data
+                        narrow_all = load_ased_table("ased_narrow")
                         
                         if narrow_all:
                             # 过滤出 narrow_field_code 的前两位等于 broad_code 的记录
@@ -267,26 +194,22 @@ try:
                                         narrow_desc_col = col
                                         break
                                 
-                                # 显示 narrow fields 卡片（每行3个）
-                                narrow_cols = st.columns(3)
-                                for idx, (_, row) in enumerate(narrow_df.iterrows()):
-                                    col_idx = idx % 3
-                                    with narrow_cols[col_idx]:
-                                        narrow_code = str(row['narrow_field_code']).strip()
-                                        narrow_desc = str(row[narrow_desc_col]) if narrow_desc_col else narrow_code
-                                        
-                                        is_selected = st.session_state.selected_narrow_code == narrow_code
-                                        
-                                        if st.button(
-                                            f"**{narrow_desc}**\n\n`{narrow_code}`",
-                                            key=f"modal_narrow_{narrow_code}",
-                                            use_container_width=True,
-                                            type="primary" if is_selected else "secondary"
-                                        ):
-                                            st.session_state.selected_narrow_code = narrow_code
-                                            st.session_state.selected_narrow_desc = narrow_desc
-                                            st.session_state.show_narrow_modal = False
-                                            st.rerun()
+                                # 显示 narrow fields 卡片（每行3个，整个网格是一个组件）
+                                narrow_fields = {}
+                                for _, row in narrow_df.iterrows():
+                                    narrow_code = str(row['narrow_field_code']).strip()
+                                    narrow_fields[narrow_code] = str(row[narrow_desc_col]) if narrow_desc_col else narrow_code
+
+                                def select_narrow(narrow_code: str):
+                                    st.session_state.selected_narrow_code = narrow_code
+                                    st.session_state.selected_narrow_desc = narrow_fields[narrow_code]
+                                    st.session_state.show_narrow_modal = False
+
+                                card_grid(
+                                    [{"id": code, "title": desc, "badge": code} for code, desc in narrow_fields.items()],
+                                    columns=3, theme="selection", selected=st.session_state.selected_narrow_code,
+                                    on_click=select_narrow, key="narrow_grid",
+                                )
                                 
                                 if st.button("Close", key="close_narrow_modal"):
                                     st.session_state.show_narrow_modal = False
@@ -305,12 +228,7 @@ try:
                 with st.expander(f"📋 Detailed Fields for {selected_narrow_code}", expanded=True):
                     st.markdown(f"### Detailed Fields (Narrow: {selected_narrow_code})")
                     try:
-                        detail_response = (
-                            supabase.table("ased_detail")
-                            .select("detailed_field_code, description")
-                            .execute()
-                        )
-                        detail_all = detail_response.data
+                        detail_all = load_asced_detail()
                         
                         if detail_all:
                             # 过滤出 detailed_field_code 的前几位等于 narrow_field_code 的记录
@@ -320,25 +238,12 @@ try:
                             ]
                             
                             if detail_data:
-                                # 显示 detailed fields 卡片（每行3个）
-                                detail_cols = st.columns(3)
-                                for idx, item in enumerate(detail_data):
-                                    col_idx = idx % 3
-                                    with detail_cols[col_idx]:
-                                        detail_code = str(item.get('detailed_field_code', '')).strip()
-                                        detail_desc = str(item.get('description', '')).strip()
-                                        
-                                        # 使用卡片样式显示
-                                        st.markdown(f"""
-                                        <div class="selection-card">
-                                            <div style="font-weight: 600; color: #007958; margin-bottom: 0.5rem;">
-                                                {detail_code}
-                                            </div>
-                                            <div style="color: #666; font-size: 0.9rem; line-height: 1.4;">
-                                                {detail_desc}
-                                            </div>
-                                        </div>
-                                        """, unsafe_allow_html=True)
+                                # 显示 detailed fields 卡片（每行3个，仅展示）
+                                card_grid(
+                                    [{"badge": str(item.get('detailed_field_code', '')).strip(),
+                                      "body": str(item.get('description', '')).strip()} for item in detail_data],
+                                    columns=3, theme="selection",
+                                )
                                 
                                 if st.button("Close", key="close_detail_modal"):
                                     st.session_state.show_detail_modal = False
@@ -349,6 +254,10 @@ try:
                             st.info(f"No detailed fields available in ased_detail table")
                     except Exception as e:
                         st.error(f"Error loading detailed fields: {str(e)}")
+
+            # 完整分类导出（点击下载时才生成文件）
+            with st.expander("📥 Export full ASCED taxonomy"):
+                export_buttons(lambda: asced_taxonomy(code_column), "asced_taxonomy")
         
         st.divider()
 except Exception as e:
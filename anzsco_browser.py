@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 from supabase_client import get_supabase_client
+from reference_data import load_anzsco
+from exports import export_buttons
 
 # 获取 Supabase 客户端
 supabase = get_supabase_client()
@@ -27,16 +29,10 @@ if "anzsco_data" not in st.session_state:
 if "selected_major_group" not in st.session_state:
     st.session_state.selected_major_group = None
 
-# 加载数据（自动加载，使用缓存提高性能）
-@st.cache_data
+# 加载数据（自动加载，使用共享缓存提高性能）
 def load_anzsco_data():
     try:
-        response = (
-            supabase.table("anzsco")
-            .select("*")
-            .execute()
-        )
-        return response.data
+        return load_anzsco()
     except Exception as e:
         st.error(f"Error loading ANZSCO data: {e}")
         return None
@@ -198,14 +194,8 @@ if st.session_state.anzsco_data:
                 height=400
             )
             
-            # 下载按钮
-            csv = df[[code_col, title_col, 'Major_Group_Name']].to_csv(index=False)
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name="anzsco_data.csv",
-                mime="text/csv"
-            )
+            # 下载按钮（点击时才生成文件）
+            export_buttons(lambda: df[[code_col, title_col, 'Major_Group_Name']], "anzsco_data")
 
 else:
     st.info("⏳ Loading ANZSCO data... Please wait.")
@@ -1,4 +1,5 @@
 import streamlit as st
+from warmup import start_warmup
 
 st.set_page_config(
     page_title="OIC Education",
@@ -9,10 +10,15 @@ st.set_page_config(
 with st.sidebar:
     st.image("Logo.svg")
 
+# 预热共享缓存（serve.py 启动时已开始；`streamlit run` 部署时由第一个会话触发，只执行一次）
+start_warmup()
+
 # 定义页面
 pages = [
     st.Page("./home.py", title="Home", icon="🏠"),
     st.Page("./person.py", title="Personal Survey", icon="📊"),
+    st.Page("./roster.py", title="Student Roster", icon="🗂️"),
+    st.Page("./cohort_insights.py", title="Cohort Field Demand", icon="🗺️"),
     st.Page("./ANZSCO.py", title="Australian Standard Classification of Education", icon="📚"),
     st.Page("./anzsco_browser.py", title="ANZSCO Classification", icon="💼"),
     st.Page("./unis.py", title="Universities", icon="🎓"),
@@ -0,0 +1,137 @@
+"""预热缓存制品：构建时由 bake.py 生成，运行时只读加载
+
+目录结构（OIC_ARTIFACT_DIR，默认 artifacts/）：
+    CURRENT                    当前使用的版本号
+    <版本>/manifest.json        版本、生成时间、prompt 版本、embedding 模型、每个文件的 sha256
+    <版本>/tables/<表>.json.gz  anzsco / ased_* 快照
+    <版本>/rankings.json.gz     {国家: 排名行}
+    <版本>/profiles.json.gz     {国家: {大学: {"details": 概况, "courses": 课程}}}
+    <版本>/field_index.npy      ASCED 向量矩阵（运行时内存映射）
+    <版本>/field_index.json     矩阵每行的内容哈希
+
+版本号由所有文件内容的哈希得出，内容不变时重新 bake 得到同一个版本。
+JSON 文件在第一次使用时解压并缓存；制品不存在或损坏时返回 None，页面照常查询数据库。
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+ARTIFACT_DIR = Path(os.environ.get("OIC_ARTIFACT_DIR", "artifacts"))
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Artifact:
+    """一个已 bake 的制品版本"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format: {self.manifest.get('format')}")
+        self._json: Dict[str, object] = {}
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest["files"]
+
+    def file(self, name: str) -> Path:
+        return self.path / name
+
+    def json(self, name: str):
+        """解压读取 .json.gz（每个文件只解压一次）"""
+        if name not in self._json:
+            with gzip.open(self.file(name), "rt", encoding="utf-8") as f:
+                self._json[name] = json.load(f)
+        return self._json[name]
+
+    def table(self, table: str) -> Optional[list]:
+        name = f"tables/{table}.json.gz"
+        return self.json(name) if self.has(name) else None
+
+
+@lru_cache(maxsize=1)
+def get_artifact() -> Optional[Artifact]:
+    """当前版本的制品（进程内共享）；没有或无法读取时返回 None"""
+    try:
+        version = (ARTIFACT_DIR / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        return Artifact(ARTIFACT_DIR / version) if version else None
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring artifact in {ARTIFACT_DIR}: {e}", file=sys.stderr)
+        return None
+
+
+class ArtifactWriter:
+    """在临时目录中写入文件，commit() 时按内容哈希定版本并原子切换 CURRENT"""
+
+    def __init__(self, root: Path = ARTIFACT_DIR, **metadata):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.directory = Path(tempfile.mkdtemp(prefix=".bake-", dir=self.root))
+        self.metadata = metadata
+        self.files: Dict[str, dict] = {}
+
+    def path(self, name: str) -> Path:
+        """调用方自行写入的文件（如 .npy）；写完后调用 add(name)"""
+        target = self.directory / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target
+
+    def add(self, name: str, **info) -> None:
+        self.files[name] = dict(info, sha256=_sha256(self.directory / name), bytes=(self.directory / name).stat().st_size)
+
+    def write_json(self, name: str, data, **info) -> None:
+        # mtime=0：相同内容得到相同的压缩字节，版本号才稳定
+        with open(self.path(name), "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        self.add(name, **info)
+
+    def commit(self) -> Artifact:
+        version = hashlib.sha256(json.dumps(
+            {"files": {n: f["sha256"] for n, f in self.files.items()}, "metadata": self.metadata},
+            sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        manifest = {
+            "format": FORMAT_VERSION,
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **self.metadata,
+            "files": self.files,
+        }
+        (self.directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        target = self.root / version
+        if target.exists():
+            # 内容完全相同的版本已存在
+            shutil.rmtree(self.directory)
+        else:
+            # mkdtemp 建的目录只有本用户可读，容器里运行应用的可能是其他用户
+            os.chmod(self.directory, 0o755)
+            os.replace(self.directory, target)
+        current = self.root / f"{CURRENT_FILE}.tmp"
+        current.write_text(version, encoding="utf-8")
+        os.replace(current, self.root / CURRENT_FILE)
+        return Artifact(target)
+
+    def abort(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+# 向量模型与缓存目录（可通过环境变量覆盖）
+EMBEDDING_MODEL = "text-embedding-3-small"
+CACHE_DIR = Path(os.environ.get("OIC_CACHE_DIR", ".cache"))
+# 行哈希（首行 JSON）和 float32 矩阵存在同一个文件里，一次 os.replace 同时生效
+VECTORS_FILE = "asced_detail.vec"
+HEADER_ALIGN = 64
+# bake 制品中的文件名（见 artifact.py）
+BAKED_MATRIX_FILE = "field_index.npy"
+BAKED_INDEX_FILE = "field_index.json"
+
+# 每个字母对应的典型学科方向（与 SYSTEM_PROMPT_2 中的 RULES 保持一致）
+RIASEC_HINTS = {
+    "R": "engineering, trades, applied technology, environmental fieldwork",
+    "I": "science, mathematics, computer science, data, research",
+    "A": "design, media, performing arts, architecture",
+    "S": "education, nursing, psychology, social work, community services",
+    "E": "business, entrepreneurship, management, law, communications",
+    "C": "accounting, finance operations, information systems, administration, library and information management",
+}
+HLAFPS_HINTS = {
+    "H": "creative, experiential, hands-on or project-based study",
+    "L": "research-intensive, academically rigorous study",
+    "A": "health, education, social impact, sustainability",
+    "F": "business, economics, accounting, fintech, quantitative fields",
+    "P": "leadership, policy, law, management, public speaking",
+    "S": "regulated stable careers: healthcare, civil service, accounting, infrastructure",
+}
+
+
+def _embeddings_client() -> OpenAIEmbeddings:
+    # 领域描述都很短，不需要 tiktoken 分块（分块时还需联网下载编码表）
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, check_embedding_ctx_length=False)
+
+
+def _field_text(field: dict) -> str:
+    return f"{field.get('detailed_field_code', '')} {field.get('description', '')}".strip()
+
+
+def _field_hash(field: dict) -> str:
+    return hashlib.sha1(f"{EMBEDDING_MODEL}|{_field_text(field)}".encode("utf-8")).hexdigest()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class FieldIndex:
+    """ASCED 细分领域的归一化向量矩阵（内存映射），支持余弦 top-k"""
+
+    def __init__(self, fields: List[dict], matrix: np.ndarray):
+        self.fields = fields
+        self.matrix = matrix
+
+    def top_k(self, query: np.ndarray, k: int = 25) -> List[dict]:
+        if len(self.fields) == 0:
+            return []
+        k = min(k, len(self.fields))
+        sims = self.matrix @ _normalize(np.asarray(query, dtype=np.float32))
+        # argpartition 先取 k 个，再只对这 k 个排序
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [self.fields[i] for i in top]
+
+
+def export_field_index(index: FieldIndex, directory: Path) -> List[str]:
+    """把向量矩阵导出为 .npy（可内存映射）和行哈希，返回写入的文件名"""
+    np.save(directory / BAKED_MATRIX_FILE, np.ascontiguousarray(index.matrix, dtype=np.float32))
+    (directory / BAKED_INDEX_FILE).write_text(
+        json.dumps({"model": EMBEDDING_MODEL, "rows": [_field_hash(f) for f in index.fields]}),
+        encoding="utf-8")
+    return [BAKED_MATRIX_FILE, BAKED_INDEX_FILE]
+
+
+def _load_baked(directory: Optional[Path]) -> Tuple[List[str], Optional[np.ndarray]]:
+    if directory is None:
+        return [], None
+    try:
+        meta = json.loads((directory / BAKED_INDEX_FILE).read_text(encoding="utf-8"))
+        if meta.get("model") == EMBEDDING_MODEL and meta.get("rows"):
+            return meta["rows"], np.load(directory / BAKED_MATRIX_FILE, mmap_mode="r")
+    except (ValueError, KeyError, OSError):
+        pass
+    return [], None
+
+
+def _read_vectors(path: Path) -> Tuple[dict, np.ndarray]:
+    """读取缓存文件：首行是 JSON 索引，其后是内存映射的矩阵"""
+    with open(path, "rb") as f:
+        header = f.readline()
+    meta = json.loads(header)
+    return meta, np.memmap(path, dtype=np.float32, mode="r", offset=len(header),
+                           shape=(len(meta["rows"]), meta["dim"]))
+
+
+def _write_vectors(path: Path, meta: dict, matrix: np.ndarray) -> np.ndarray:
+    """写入缓存文件并返回它的内存映射
+
+    每个进程写自己的临时文件，再原子替换：其他进程要么读到旧文件，要么读到完整的新文件。
+    替换前就建立映射，之后别的进程再替换文件，这里拿到的仍是自己写入的矩阵。
+    """
+    header = json.dumps(meta).encode("utf-8")
+    header += b" " * (-(len(header) + 1) % HEADER_ALIGN) + b"\n"
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+        tmp.write(header)
+        tmp.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+    try:
+        _, mapped = _read_vectors(Path(tmp.name))
+        os.replace(tmp.name, path)
+    except OSError:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+    return mapped
+
+
+def build_field_index(fields: List[dict],
+                      embeddings: Optional[OpenAIEmbeddings] = None,
+                      cache_dir: Path = CACHE_DIR,
+                      baked_dir: Optional[Path] = None) -> FieldIndex:
+    """加载或增量更新 ASCED 向量矩阵：只对新增/变更的行重新 embedding
+
+    baked_dir 为 bake 制品目录：本地缓存没有或已过时时，直接内存映射制品中的矩阵，
+    或从中复用未变更的行。
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    vectors_path = cache_dir / VECTORS_FILE
+
+    if not fields:
+        return FieldIndex([], np.zeros((0, 0), dtype=np.float32))
+
+    # 读取旧索引，按内容哈希找到可复用的行
+    old_hashes: List[str] = []
+    old_rows: Dict[str, int] = {}
+    old_matrix = None
+    try:
+        meta, old_matrix = _read_vectors(vectors_path)
+        if meta.get("model") == EMBEDDING_MODEL and meta.get("rows"):
+            old_hashes = meta["rows"]
+            old_rows = {h: i for i, h in enumerate(old_hashes)}
+        else:
+            old_matrix = None
+    except (ValueError, KeyError, OSError):
+        old_hashes, old_rows, old_matrix = [], {}, None
+
+    hashes = [_field_hash(f) for f in fields]
+
+    # 所有行都没变：直接复用内存映射
+    if old_matrix is not None and hashes == old_hashes:
+        return FieldIndex(fields, old_matrix)
+    baked_hashes, baked_matrix = _load_baked(baked_dir)
+    if baked_matrix is not None and hashes == baked_hashes:
+        return FieldIndex(fields, baked_matrix)
+    if old_matrix is None and baked_matrix is not None:
+        old_hashes, old_matrix = baked_hashes, baked_matrix
+        old_rows = {h: i for i, h in enumerate(old_hashes)}
+    missing = [i for i, h in enumerate(hashes) if h not in old_rows]
+
+    new_vectors = {}
+    if missing:
+        embeddings = embeddings or _embeddings_client()
+        vectors = embeddings.embed_documents([_field_text(fields[i]) for i in missing])
+        new_vectors = dict(zip(missing, _normalize(np.asarray(vectors, dtype=np.float32))))
+
+    dim = old_matrix.shape[1] if old_matrix is not None else len(next(iter(new_vectors.values())))
+    matrix = np.empty((len(fields), dim), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        matrix[i] = new_vectors[i] if i in new_vectors else old_matrix[old_rows[h]]
+    del old_matrix
+
+    return FieldIndex(fields, _write_vectors(vectors_path, {"model": EMBEDDING_MODEL, "dim": dim, "rows": hashes},
+                                             matrix))
+
+
+def profile_query_text(holland: Dict[str, float], riasec: Dict[str, float]) -> str:
+    """把学生得分最高的类型转换为检索用的描述文本"""
+    top_r = sorted(riasec, key=riasec.get, reverse=True)[:3]
+    top_h = sorted(holland, key=holland.get, reverse=True)[:2]
+    parts = [RIASEC_HINTS[k] for k in top_r if k in RIASEC_HINTS]
+    parts += [HLAFPS_HINTS[k] for k in top_h if k in HLAFPS_HINTS]
+    return "Fields of study related to: " + "; ".join(parts)
+
+
+@lru_cache(maxsize=256)
+def _embed_query(text: str) -> tuple:
+    # 查询文本只取决于最高分的几个字母，命中率很高
+    return tuple(_embeddings_client().embed_query(text))
+
+
+def shortlist_fields(index: FieldIndex,
+                     holland: Dict[str, float],
+                     riasec: Dict[str, float],
+                     k: int = 25) -> List[dict]:
+    """返回与学生画像最相关的 k 个 ASCED 细分领域"""
+    query = np.asarray(_embed_query(profile_query_text(holland, riasec)), dtype=np.float32)
+    return index.top_k(query, k)
@@ -0,0 +1,43 @@
+"""页面登录检查：与 Personal Survey 页面相同的 Supabase 会话校验
+
+登录 / 注册表单只在 Personal Survey 页面；其他需要登录的页面调用 require_login()，
+未登录时提示前往该页面登录并停止渲染。
+"""
+import streamlit as st
+
+from supabase_client import get_supabase_client
+
+
+def check_session():
+    """检查 Supabase 认证会话，返回 (user, session)；无效时清除登录状态"""
+    session = st.session_state.get("auth_session")
+    if not session:
+        return None, None
+    supabase = get_supabase_client()
+    try:
+        supabase.auth.set_session(
+            access_token=session.access_token,
+            refresh_token=session.refresh_token
+        )
+        user = supabase.auth.get_user()
+        if user and user.user:
+            return user.user, session
+    except Exception:
+        # 会话可能已过期，清除它
+        pass
+    st.session_state.auth_session = None
+    st.session_state.auth_user = None
+    return None, None
+
+
+def require_login(page: str):
+    """未登录时显示提示并 st.stop()；已登录时返回当前用户"""
+    user, session = check_session()
+    if user:
+        st.session_state.auth_user = user
+        st.session_state.auth_session = session
+        return user
+    st.title("🔐 Login Required")
+    st.markdown("---")
+    st.info(f"Please log in on the Personal Survey page to access {page}.")
+    st.stop()
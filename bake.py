@@ -0,0 +1,123 @@
+"""构建时 bake：执行确定性的预热，把结果写成版本化制品，新副本从第一个请求起就是热的
+
+用法：
+    python bake.py                        # 写入 artifacts/<版本>/，CURRENT 指向新版本
+    python bake.py --out build/artifacts --concurrency 8
+    python bake.py --no-generate          # 只打包知识库中已有的数据，不调用 LLM
+
+制品内容见 artifact.py：anzsco / ased_* 表快照、ASCED 向量索引（.npy，运行时内存映射）、
+四个国家的 QS 排名，以及排名内各大学的概况和课程。知识库里缺少的排名和大学详情默认先调用
+LLM 生成并写回知识库；过期记录不在这里刷新，需要时先运行 python university_kb.py --stale-only。
+学生的 dominant type 总结按个人得分生成，属于用户数据，不放进制品。
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from artifact import ARTIFACT_DIR, Artifact, ArtifactWriter
+from asced_embeddings import EMBEDDING_MODEL, build_field_index, export_field_index
+from university_kb import (
+    COUNTRY_NAMES, PROMPT_VERSION, TOP_N, load_country, load_courses, load_details,
+    refresh_country, refresh_courses, refresh_details,
+)
+
+TABLES = ("anzsco", "ased_broad", "ased_narrow", "ased_detail")
+PROFILE_STAGES = {"details": (load_details, refresh_details), "courses": (load_courses, refresh_courses)}
+
+
+def _profile(supabase, stage: str, country: str, university: str, generate: bool) -> Optional[dict]:
+    load, refresh = PROFILE_STAGES[stage]
+    row = load(supabase, country, university)
+    if row is None and generate:
+        row = refresh(supabase, country, university)
+    return row
+
+
+def bake_profiles(supabase, rankings: Dict[str, List[dict]], concurrency: int,
+                  generate: bool) -> Tuple[dict, int]:
+    """{国家: {大学: {阶段: 记录}}} 和失败数"""
+    profiles = {country: {r["university_name"]: {} for r in rows} for country, rows in rankings.items()}
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        jobs = {pool.submit(_profile, supabase, stage, country, name, generate): (stage, country, name)
+                for country, universities in profiles.items()
+                for name in universities
+                for stage in PROFILE_STAGES}
+        for done, future in enumerate(as_completed(jobs), start=1):
+            stage, country, name = jobs[future]
+            try:
+                profiles[country][name][stage] = future.result()
+            except Exception as e:
+                failed += 1
+                profiles[country][name][stage] = None
+                print(f"\n{stage} failed for {name} ({country}): {e}", file=sys.stderr)
+            print(f"\rprofiles {done}/{len(jobs)}", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return profiles, failed
+
+
+def bake(supabase, out: Path = ARTIFACT_DIR, countries: List[str] = COUNTRY_NAMES, top_n: int = TOP_N,
+         concurrency: int = 4, generate: bool = True) -> Tuple[Artifact, int]:
+    """生成一个制品版本并切换为当前版本，返回 (制品, 失败数)"""
+    writer = ArtifactWriter(out, prompt_version=PROMPT_VERSION, embedding_model=EMBEDDING_MODEL)
+    try:
+        tables = {}
+        for table in TABLES:
+            # PostgREST 不保证返回顺序；排序后相同数据得到相同字节，版本号才稳定
+            tables[table] = sorted(supabase.table(table).select("*").execute().data or [],
+                                   key=lambda row: json.dumps(row, sort_keys=True, default=str))
+            writer.write_json(f"tables/{table}.json.gz", tables[table], rows=len(tables[table]))
+            print(f"{table}: {len(tables[table])} rows", file=sys.stderr)
+
+        fields = [{"detailed_field_code": r.get("detailed_field_code"), "description": r.get("description")}
+                  for r in tables["ased_detail"]]
+        if fields:
+            for name in export_field_index(build_field_index(fields), writer.directory):
+                writer.add(name, rows=len(fields))
+
+        rankings = {}
+        for country in countries:
+            rows = load_country(supabase, country, top_n)
+            if not rows and generate:
+                refresh_country(supabase, country, top_n)
+                rows = load_country(supabase, country, top_n)
+            rankings[country] = rows
+            print(f"rankings {country}: {len(rows)} universities", file=sys.stderr)
+        writer.write_json("rankings.json.gz", rankings, rows=sum(len(r) for r in rankings.values()))
+
+        profiles, failed = bake_profiles(supabase, rankings, concurrency, generate)
+        writer.write_json("profiles.json.gz", profiles, rows=sum(len(u) for u in profiles.values()))
+        return writer.commit(), failed
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, default=ARTIFACT_DIR)
+    parser.add_argument("--countries", nargs="*", default=COUNTRY_NAMES)
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--no-generate", action="store_true",
+                        help="only package what the knowledge base already has")
+    args = parser.parse_args(argv)
+
+    if "OPENAI_API_KEY" not in os.environ:
+        os.environ["OPENAI_API_KEY"] = st.secrets["openai"]["api_key"]
+
+    from supabase_client import get_supabase_client
+    artifact, failed = bake(get_supabase_client(), args.out, args.countries, args.top_n,
+                            args.concurrency, generate=not args.no_generate)
+    print(json.dumps({"version": artifact.version, "path": str(artifact.path), "failed": failed,
+                      "files": {name: f["bytes"] for name, f in artifact.manifest["files"].items()}}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""卡片网格组件：整个网格作为一个元素渲染，点击卡片时回调
+
+前端是 frontend/card_grid/index.html 中的静态页面（无需构建），主题样式都写在里面，
+浏览器加载一次后缓存；每次重跑只发送卡片数据，不再为每张卡片各发一段 HTML、
+一个按钮和一段 <style>。
+
+卡片字段（都可省略）：id、badge、title、subtitle、body、footer、href、color（背景）。
+带 href 的卡片点击时在新标签页打开链接，其余卡片点击时回调 on_click(id)。
+"""
+from functools import partial
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+THEMES = ("country", "ranking", "selection", "recommendation")
+
+_component = components.declare_component(
+    "card_grid", path=str(Path(__file__).parent / "frontend" / "card_grid"))
+
+
+def _clicked(key: str, on_click: Callable[[str], None]) -> None:
+    value = st.session_state.get(key)
+    if isinstance(value, dict) and value.get("id") is not None:
+        on_click(value["id"])
+
+
+def card_grid(cards: List[dict],
+              columns: int = 5,
+              theme: str = "ranking",
+              selected: Optional[str] = None,
+              on_click: Optional[Callable[[str], None]] = None,
+              key: Optional[str] = None) -> Optional[str]:
+    """渲染卡片网格，返回最近一次点击的卡片 id（没有点击时为 None）
+
+    on_click 需要同时提供 key；回调在下一次重跑之前执行，无需再调用 st.rerun()。
+    """
+    if theme not in THEMES:
+        raise ValueError(f"Unknown card theme: {theme}")
+    if on_click is not None and key is None:
+        raise ValueError("card_grid needs a key when on_click is given")
+    value = _component(
+        cards=cards,
+        columns=columns,
+        theme=theme,
+        selected=selected,
+        clickable=on_click is not None,
+        key=key,
+        default=None,
+        on_change=partial(_clicked, key, on_click) if on_click is not None else None,
+    )
+    return value.get("id") if isinstance(value, dict) else None
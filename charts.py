@@ -0,0 +1,228 @@
+"""雷达图等可在页面、批处理报告中复用的图表（不依赖 Streamlit）"""
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+
+# RIASEC / HLAFPS 全称与解释
+RIASEC_DESC = {
+    "R": ("Realistic", "Practical, hands-on, and mechanical activities."),
+    "I": ("Investigative", "Analytical, intellectual, and scientific tasks."),
+    "A": ("Artistic", "Creative, expressive, and design-related activities."),
+    "S": ("Social", "Helping, teaching, and cooperative interactions."),
+    "E": ("Enterprising", "Leadership, persuasion, and business ventures."),
+    "C": ("Conventional", "Organizing, planning, and data-oriented tasks.")
+}
+RIASEC_DESC_CN = {
+    "R": "现实型：喜欢实际操作、动手实验、机械工程类任务。",
+    "I": "研究型：喜欢分析、思考、探索和科学研究。",
+    "A": "艺术型：喜欢创意表达、设计、艺术与想象。",
+    "S": "社会型：喜欢帮助他人、教学、合作与沟通。",
+    "E": "企业型：喜欢领导、说服、管理与商业活动。",
+    "C": "常规型：喜欢组织、记录、文书与数据管理。"
+}
+HLAFPS_DESC = {
+    "H": ("Hedonism", "Seeking enjoyment, pleasure, and creative life experiences; values freedom, aesthetics, and fun."),
+    "P": ("Power & Status", "Aspiring to influence, leadership, and recognition; motivated by prestige and social standing."),
+    "A": ("Altruism", "Driven by empathy, compassion, and a desire to help others or contribute to society."),
+    "L": ("Learning & Achievement", "Motivated by curiosity, mastery, and personal growth through knowledge and accomplishment."),
+    "F": ("Finance", "Focused on financial success, material stability, and economic independence."),
+    "S": ("Security", "Prefers stability, predictability, and safety; values structured environments and long-term certainty.")
+}
+
+AXIS_ORDER = {"RIASEC": ["R","I","A","S","E","C"], "HLAFPS": ["H","L","A","F","P","S"]}
+
+
+@lru_cache(maxsize=None)
+def _axis_text(order: str, show_fullname: bool, bilingual: bool):
+    """每个轴的 (字母, 标签, hover 说明)；与学生无关，所有人共用"""
+    axis = AXIS_ORDER.get(order.upper(), AXIS_ORDER["RIASEC"])
+    out = []
+    for k in axis:
+        if order == 'RIASEC':
+            fullname, explanation = RIASEC_DESC.get(k, (k, ""))
+        else:
+            fullname, explanation = HLAFPS_DESC.get(k, (k, ""))
+        if bilingual:
+            explanation += f"<br><i>{RIASEC_DESC_CN.get(k, '')}</i>"
+        out.append((k, fullname if show_fullname else k, f"<b>{fullname}</b><br>{explanation}"))
+    return tuple(out)
+
+
+def _freeze(values: dict):
+    # NaN 不等于自身，换成 None 才能作为缓存键命中
+    if not values:
+        return None
+    return tuple(sorted((k, None if v != v else float(v)) for k, v in values.items()))
+
+
+def _thaw(items):
+    return {k: np.nan if v is None else v for k, v in items} if items else None
+
+
+def cached_spider_chart(scores: dict, avg_scores: dict = None, order="RIASEC", title="RIASEC Spider Chart with Average",
+                        percentiles: dict = None, **options):
+    """按 (得分, 均值, 顺序, 选项) 缓存的 spider_chart_with_avg
+
+    缓存的是图表的 JSON 描述，每次调用都据此新建 Figure，
+    调用方修改返回的图表不会影响缓存（Figure 本身是可变的，也不是线程安全的）。
+    """
+    return go.Figure(_cached_spider_chart(_freeze(scores), _freeze(avg_scores), order, title,
+                                          _freeze(percentiles), tuple(sorted(options.items()))))
+
+
+@lru_cache(maxsize=512)
+def _cached_spider_chart(scores, avg_scores, order, title, percentiles, options):
+    return spider_chart_with_avg(_thaw(scores), _thaw(avg_scores), order=order, title=title,
+                                 percentiles=_thaw(percentiles), **dict(options)).to_plotly_json()
+
+
+def spider_chart_with_avg(
+    scores: dict,
+    avg_scores: dict = None,
+    order="RIASEC",
+    title="RIASEC Spider Chart with Average",
+    show_fullname=True,
+    bilingual=False,
+    hover_font_size=16,
+    percentiles: dict = None
+):
+    labels, values, hover_texts = [], [], []
+    for k, label, hover_prefix in _axis_text(order, show_fullname, bilingual):
+        if k not in scores:
+            continue
+        labels.append(label)
+        values.append(scores[k])
+        hover = f"{hover_prefix}<br><b>Score:</b> {scores[k]}"
+        if percentiles and not np.isnan(percentiles.get(k, np.nan)):
+            hover += f"<br><b>Percentile:</b> {percentiles[k]:.0f}"
+        hover_texts.append(hover)
+
+    # 闭合图形
+    labels_closed = labels + [labels[0]]
+    values_closed = values + [values[0]]
+    r_max = max(max(values), max(avg_scores.values()) if avg_scores else max(values)) * 1.3
+
+    fig = go.Figure()
+
+    # 如果提供平均值，先画平均层（灰色）
+    if avg_scores:
+        avg_vals = [avg_scores.get(k, 0) for k, _, _ in _axis_text(order, show_fullname, bilingual) if k in scores]
+        avg_vals += [avg_vals[0]]
+        fig.add_trace(go.Scatterpolar(
+            r=avg_vals,
+            theta=labels_closed,
+            mode='lines+markers',
+            line=dict(color='#ed2939', width=2),
+            marker=dict(size=6, color='#ed2939'),
+            fill='toself',
+            name="Average",
+            hovertemplate="<b>%{theta}</b><br>Average: %{r}<extra></extra>"
+        ))
+
+
+    # 用户个人得分层
+
+
+    fig.add_trace(go.Scatterpolar(
+        r=values_closed,
+        theta=labels_closed,
+        mode='lines+markers',
+        
+        line=dict(color='#007958', width=3),
+        marker=dict(size=10, color='#007958', line=dict(width=1, color='white')),
+        fill='toself',
+        name="You",
+        hovertext=hover_texts + [hover_texts[0]],
+        hoverinfo="text"
+    ))
+
+    # 外圈 hover 捕捉
+    fig.add_trace(go.Scatterpolar(
+        r=[r_max for _ in labels],
+        theta=labels,
+        mode='markers',
+        hovertext=hover_texts,
+        hoverinfo="text",
+        marker=dict(size=20, color='rgba(0,0,0,0)'),
+        showlegend=False
+    ))
+
+    # 布局
+    fig.update_layout(
+        title=title,
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, r_max], showticklabels=False),
+            angularaxis=dict(
+                direction="clockwise",
+                tickfont=dict(size=16, color="#222", family="Arial Black")
+            )
+        ),
+        hoverlabel=dict(
+            font_size=hover_font_size,
+            font_family="Arial",
+            bgcolor="rgba(255,255,255,0.95)",
+            bordercolor="#555"
+        ),
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.2,
+            xanchor="center",
+            x=0.5
+        ),
+        margin=dict(l=40, r=40, t=60, b=60)
+    )
+
+    return fig
+
+
+# 对比图的配色，按学生顺序循环使用
+COMPARE_COLORS = ["#007958", "#1f77b4", "#ff7f0e", "#9467bd", "#e377c2", "#8c564b", "#17becf", "#bcbd22"]
+
+# 所有学生共用的 trace 模板：每条 trace 只需给出 r / name / 颜色
+COMPARE_TEMPLATE = go.layout.Template(
+    data={"scatterpolar": [go.Scatterpolar(
+        mode="lines+markers",
+        fill="toself",
+        opacity=0.55,
+        line=dict(width=2),
+        marker=dict(size=7),
+        hovertemplate="<b>%{theta}</b><br>%{fullData.name}: %{r}<extra></extra>",
+    )]},
+    layout=dict(
+        polar=dict(angularaxis=dict(direction="clockwise",
+                                    tickfont=dict(size=16, color="#222", family="Arial Black")),
+                   radialaxis=dict(visible=True, showticklabels=False)),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
+        margin=dict(l=40, r=40, t=60, b=60),
+    ),
+)
+
+
+def comparison_chart(profiles: dict, avg_scores: dict = None, order="RIASEC", title="Comparison"):
+    """多名学生叠加在同一张雷达图上；profiles 为 {显示名: 得分 dict}"""
+    axis = AXIS_ORDER.get(order.upper(), AXIS_ORDER["RIASEC"])
+    desc = RIASEC_DESC if order.upper() == "RIASEC" else HLAFPS_DESC
+    labels = [desc.get(k, (k, ""))[0] for k in axis]
+    labels_closed = labels + [labels[0]]
+
+    traces = []
+    if avg_scores:
+        avg_vals = [avg_scores.get(k, 0) for k in axis]
+        traces.append(go.Scatterpolar(r=avg_vals + [avg_vals[0]], theta=labels_closed, name="Average",
+                                      fill="none", line=dict(color="#ed2939", dash="dot"),
+                                      marker=dict(color="#ed2939")))
+    r_max = max(avg_scores.values()) if avg_scores else 0
+    for i, (name, scores) in enumerate(profiles.items()):
+        values = [scores.get(k, 0) for k in axis]
+        r_max = max(r_max, max(values))
+        color = COMPARE_COLORS[i % len(COMPARE_COLORS)]
+        traces.append(go.Scatterpolar(r=values + [values[0]], theta=labels_closed, name=name,
+                                      line=dict(color=color), marker=dict(color=color)))
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(template=COMPARE_TEMPLATE, title=title,
+                      polar=dict(radialaxis=dict(range=[0, r_max * 1.2 if r_max else 1])))
+    return fig
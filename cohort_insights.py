@@ -0,0 +1,87 @@
+import streamlit as st
+import plotly.graph_objects as go
+from supabase_client import get_supabase_client
+from auth import require_login
+from cohort_stats import GROUP_COLUMN
+from field_demand import affinity_matrix, field_demand
+from survey_scores import SCORE_SELECT, load_score_vectors
+from reference_data import get_field_index, load_ased_table
+
+# 获取 Supabase 客户端
+supabase = get_supabase_client()
+
+# 热力图由全体学生的得分汇总而来，必须登录
+require_login("Cohort Field Demand")
+
+# 页面标题
+st.title("Cohort Field Demand")
+st.markdown("Which study areas does the cohort lean towards? Each student's profile is matched against "
+            "every ASCED field and their top matches are aggregated by group.")
+
+
+@st.cache_data(ttl=600)
+def load_cohort():
+    columns = SCORE_SELECT + (f",{GROUP_COLUMN}" if GROUP_COLUMN else "")
+    rows, matrix = load_score_vectors(supabase, columns=columns)
+    groups = [str(r.get(GROUP_COLUMN)) for r in rows] if GROUP_COLUMN else None
+    return matrix, groups
+
+
+@st.cache_data(ttl=3600)
+def load_field_names(table: str):
+    """ASCED broad / narrow 代码 → 名称"""
+    data = load_ased_table(table) or []
+    if not data:
+        return {}
+    code_col = next((c for c in data[0] if "code" in c.lower()), None)
+    name_col = next((c for c in data[0] if "description" in c.lower() or "name" in c.lower()), None)
+    if not code_col:
+        return {}
+    return {str(r[code_col]).strip(): str(r.get(name_col) or r[code_col]) for r in data}
+
+
+@st.cache_resource
+def get_affinity():
+    """领域索引与特质–领域亲和度矩阵（进程内共享）"""
+    index = get_field_index()
+    return index, affinity_matrix(index)
+
+
+col1, col2 = st.columns(2)
+with col1:
+    level = st.radio("Level", ["broad", "narrow"], horizontal=True, format_func=str.title)
+with col2:
+    k = st.slider("Top fields per student", 1, 10, 5)
+
+try:
+    with st.spinner("Loading cohort..."):
+        matrix, groups = load_cohort()
+        index, affinity = get_affinity()
+except Exception as e:
+    st.error(f"Error loading cohort data: {e}")
+    st.stop()
+
+if not len(matrix):
+    st.info("No survey results yet.")
+    st.stop()
+
+demand = field_demand(matrix, index, groups=groups, level=level, k=k, affinity=affinity)
+names = load_field_names("ased_broad" if level == "broad" else "ased_narrow")
+labels = [f"{code} {names.get(code, '')}".strip() for code in demand.columns]
+
+st.caption(f"{len(matrix):,} students" + (f" · grouped by {GROUP_COLUMN}" if GROUP_COLUMN else ""))
+fig = go.Figure(go.Heatmap(
+    z=demand.values.round(1),
+    x=labels,
+    y=list(demand.index),
+    colorscale="Greens",
+    colorbar=dict(title="% of top picks"),
+    hovertemplate="<b>%{y}</b><br>%{x}<br>%{z}% of top picks<extra></extra>",
+))
+fig.update_layout(height=max(300, 60 * len(demand.index) + 200), xaxis=dict(tickangle=-45),
+                  margin=dict(l=40, r=40, t=30, b=160))
+st.plotly_chart(fig, use_container_width=True)
+
+table = demand.round(1)
+table.columns = labels
+st.dataframe(table, use_container_width=True)
@@ -0,0 +1,126 @@
+"""survey_processed 全体（或按学校 / 年级分组）的得分统计
+
+每组维护按特质排序的 (n, 12) 数组和累计和：均值 O(1)，分位数和百分位按二分查找。
+新行按 id 增量合并；已有行被重新计分时，由定期的全量重建覆盖。
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from survey_scores import HLAFPS_KEYS, RIASEC_KEYS, SCORE_COLUMNS, SCORE_SELECT, score_matrix, vector_to_dicts
+
+TABLE = "survey_processed"
+# 可选分组列，例如学校或入学年份；为空时只统计全体
+GROUP_COLUMN = os.environ.get("OIC_COHORT_GROUP_COLUMN") or None
+
+# 统计表为空或查询失败时使用的历史均值
+FALLBACK_MEAN = np.array([31.25, 22.48, 18.73, 27.10, 25.87, 29.55,
+                          21.13, 19.85, 29.34, 22.68, 24.25, 18.72])
+
+
+class _Group:
+    def __init__(self):
+        self.sorted = np.zeros((0, len(SCORE_COLUMNS)), dtype=np.float32)
+        self.total = np.zeros(len(SCORE_COLUMNS))
+
+    def add(self, matrix: np.ndarray):
+        # 每列各自有序，新值按二分位置插入
+        merged = np.empty((len(self.sorted) + len(matrix), matrix.shape[1]), dtype=np.float32)
+        for j in range(matrix.shape[1]):
+            new = np.sort(matrix[:, j])
+            merged[:, j] = np.insert(self.sorted[:, j], np.searchsorted(self.sorted[:, j], new), new)
+        self.sorted = merged
+        self.total += matrix.sum(axis=0, dtype=np.float64)
+
+
+class CohortStats:
+    def __init__(self, group_column: Optional[str] = GROUP_COLUMN,
+                 refresh_interval: float = 60, rebuild_interval: float = 24 * 3600):
+        self.group_column = group_column
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._groups: Dict[Optional[str], _Group] = {}
+        self._last_id = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, supabase, page_size: int = 1000, force: bool = False) -> int:
+        """读取上次之后新增的行并合并，返回新增行数；间隔内重复调用直接返回"""
+        now = time.time()
+        if not force and now - self._refreshed_at < self.refresh_interval:
+            return 0
+        with self._lock:
+            # 全量重建时在新字典上累积，完成后再替换，读取方不会看到空统计
+            rebuild = now - self._rebuilt_at >= self.rebuild_interval
+            groups = {} if rebuild else self._groups
+            last_id = None if rebuild else self._last_id
+            columns = "id," + SCORE_SELECT + (f",{self.group_column}" if self.group_column else "")
+            added = 0
+            while True:
+                query = supabase.table(TABLE).select(columns).order("id").limit(page_size)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                page = query.execute().data or []
+                if not page:
+                    break
+                last_id = page[-1]["id"]
+                added += self._add_rows(groups, page)
+            self._groups, self._last_id = groups, last_id
+            if rebuild:
+                self._rebuilt_at = now
+            self._refreshed_at = now
+            return added
+
+    def _add_rows(self, groups: Dict[Optional[str], _Group], rows: List[dict]) -> int:
+        matrix = score_matrix(rows)
+        valid = ~np.isnan(matrix).any(axis=1)
+        matrix = matrix[valid]
+        groups.setdefault(None, _Group()).add(matrix)
+        if self.group_column:
+            keys = np.array([str(r.get(self.group_column)) for r, ok in zip(rows, valid) if ok])
+            for key in np.unique(keys):
+                groups.setdefault(key, _Group()).add(matrix[keys == key])
+        return len(matrix)
+
+    def groups(self) -> List[str]:
+        return sorted(k for k in self._groups if k is not None)
+
+    def size(self, group: Optional[str] = None) -> int:
+        g = self._groups.get(group)
+        return len(g.sorted) if g else 0
+
+    def mean(self, group: Optional[str] = None) -> np.ndarray:
+        g = self._groups.get(group)
+        if not g or not len(g.sorted):
+            return FALLBACK_MEAN.copy()
+        return g.total / len(g.sorted)
+
+    def quantiles(self, qs=(0.25, 0.5, 0.75), group: Optional[str] = None) -> np.ndarray:
+        """(len(qs), 12)；已排序，直接按下标取值"""
+        g = self._groups.get(group)
+        if not g or not len(g.sorted):
+            return np.full((len(qs), len(SCORE_COLUMNS)), np.nan)
+        idx = np.clip((np.asarray(qs) * (len(g.sorted) - 1)).round().astype(int), 0, len(g.sorted) - 1)
+        return g.sorted[idx]
+
+    def percentiles(self, vector, group: Optional[str] = None) -> np.ndarray:
+        """学生在每个特质上的百分位（0–100，不高于该分数的比例）"""
+        g = self._groups.get(group)
+        if not g or not len(g.sorted):
+            return np.full(len(SCORE_COLUMNS), np.nan)
+        vector = np.asarray(vector, dtype=np.float32)
+        ranks = [np.searchsorted(g.sorted[:, j], vector[j], side="right") for j in range(len(vector))]
+        return 100.0 * np.array(ranks) / len(g.sorted)
+
+    def averages(self, group: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """(HLAFPS 均值 dict, RIASEC 均值 dict)，供图表使用"""
+        return vector_to_dicts(self.mean(group).round(2))
+
+    def student_percentiles(self, holland: Dict[str, float], riasec: Dict[str, float],
+                            group: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+        vector = [holland[k] for k in HLAFPS_KEYS] + [riasec[k] for k in RIASEC_KEYS]
+        return vector_to_dicts(self.percentiles(vector, group).round(0))
@@ -0,0 +1,121 @@
+"""数据导出：点击下载时才生成文件，按数据集版本缓存在磁盘上
+
+页面每次重跑只注册一个回调，不再序列化数据；用户点击下载时才计算数据集版本（内容哈希），
+版本已导出过就直接读缓存文件（所有会话共用），否则分块写出 CSV / 压缩 CSV / Parquet，
+大表不会在内存里拼出整份文本。同一数据集只保留最新版本的文件。
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Union
+
+import pandas as pd
+import streamlit as st
+
+from asced_embeddings import CACHE_DIR
+
+EXPORT_DIR = CACHE_DIR / "exports"
+CHUNK_ROWS = 50_000
+
+# 格式 → (显示名称, 扩展名, MIME 类型)
+FORMATS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "csv.zip": ("Zipped CSV", ".csv.zip", "application/zip"),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+}
+
+Frame = Union[pd.DataFrame, Callable[[], pd.DataFrame]]
+
+
+def frame_version(df: pd.DataFrame) -> str:
+    """数据集版本：列名和所有值的哈希"""
+    digest = hashlib.sha1(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    try:
+        values = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        # 单元格里有列表 / 字典时按文本哈希
+        values = pd.util.hash_pandas_object(df.astype(str), index=False)
+    digest.update(values.values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _write_csv(df: pd.DataFrame, f) -> None:
+    for start in range(0, max(len(df), 1), CHUNK_ROWS):
+        df.iloc[start:start + CHUNK_ROWS].to_csv(f, index=False, header=start == 0)
+
+
+def _write(df: pd.DataFrame, fmt: str, path: Path, inner_name: str) -> None:
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            _write_csv(df, f)
+    elif fmt == "csv.zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf, zf.open(inner_name, "w") as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                _write_csv(df, f)
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            # 混合类型的对象列转为文本
+            table = pa.Table.from_pandas(
+                df.astype({c: str for c in df.columns if df[c].dtype == object}), preserve_index=False)
+        pq.write_table(table, path, row_group_size=CHUNK_ROWS, compression="zstd")
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_file(name: str, df: pd.DataFrame, fmt: str) -> Path:
+    """导出文件路径；该版本尚未导出时先写出（原子替换），并删除同一数据集的旧版本"""
+    ext = FORMATS[fmt][1]
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = EXPORT_DIR / f"{name}-{frame_version(df)}{ext}"
+    if not path.exists():
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            _write(df, fmt, tmp, f"{name}.csv")
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        for old in EXPORT_DIR.glob(f"{name}-*{ext}"):
+            if old != path and old.name[len(name) + 1:-len(ext)].isalnum():
+                old.unlink(missing_ok=True)
+    return path
+
+
+def export_bytes(name: str, data: Frame, fmt: str) -> bytes:
+    df = data() if callable(data) else data
+    try:
+        return export_file(name, df, fmt).read_bytes()
+    except FileNotFoundError:
+        # 其他会话导出了新版本，刚好把这个文件当作旧版本删掉了：重新写出一次
+        return export_file(name, df, fmt).read_bytes()
+
+
+def export_buttons(data: Frame,
+                   name: str,
+                   label: str = "Download",
+                   formats: Sequence[str] = ("csv", "csv.zip", "parquet"),
+                   key: Optional[str] = None) -> None:
+    """每种格式一个下载按钮；data 可以是 DataFrame 或返回 DataFrame 的函数（点击时才调用）
+
+    下载不触发页面重跑。
+    """
+    columns = st.columns(len(formats))
+    for column, fmt in zip(columns, formats):
+        title, ext, mime = FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=f"📥 {label} ({title})",
+                data=lambda fmt=fmt: export_bytes(name, data, fmt),
+                file_name=f"{name}{ext}",
+                mime=mime,
+                key=f"{key or name}_{fmt}",
+                on_click="ignore",
+                use_container_width=True,
+            )
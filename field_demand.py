@@ -0,0 +1,75 @@
+"""全校（或按年级 / 学校分组）的 ASCED 领域需求矩阵
+
+特质–领域亲和度矩阵 A（12 × 领域数）由 12 个特质的提示文本与 ASCED 细分领域的
+向量余弦相似度得到，并按特质标准化。学生得分矩阵先按全体标准化，
+再与 A 相乘得到每个学生对每个领域的匹配分；每人取 top-k 领域，
+按 broad / narrow 代码前缀汇总成需求热力图。
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from asced_embeddings import HLAFPS_HINTS, RIASEC_HINTS, FieldIndex, _embeddings_client, _normalize
+from survey_scores import HLAFPS_KEYS, RIASEC_KEYS
+
+# 与得分向量顺序一致：6 个 HLAFPS + 6 个 RIASEC
+TRAIT_HINTS = tuple([HLAFPS_HINTS[k] for k in HLAFPS_KEYS] + [RIASEC_HINTS[k] for k in RIASEC_KEYS])
+
+# 各级别对应的 ASCED 代码前缀长度
+LEVEL_DIGITS = {"broad": 2, "narrow": 4, "detailed": 6}
+
+
+@lru_cache(maxsize=4)
+def _trait_vectors(hints: Tuple[str, ...]) -> np.ndarray:
+    return _normalize(np.asarray(_embeddings_client().embed_documents(list(hints)), dtype=np.float32))
+
+
+def affinity_matrix(index: FieldIndex) -> np.ndarray:
+    """(12, 领域数)；每个特质在所有领域上标准化为均值 0、方差 1"""
+    sims = _trait_vectors(TRAIT_HINTS) @ np.asarray(index.matrix).T
+    sims -= sims.mean(axis=1, keepdims=True)
+    sims /= np.maximum(sims.std(axis=1, keepdims=True), 1e-6)
+    return sims.astype(np.float32)
+
+
+def top_fields(scores: np.ndarray, affinity: np.ndarray, k: int = 5, chunk_size: int = 20000) -> np.ndarray:
+    """每个学生匹配分最高的 k 个领域下标，(n, k)
+
+    得分按本批学生标准化，突出每人相对同伴更强的特质；分块相乘以限制内存。
+    """
+    z = (scores - scores.mean(axis=0)) / np.maximum(scores.std(axis=0), 1e-6)
+    z = z.astype(np.float32)
+    k = min(k, affinity.shape[1])
+    out = np.empty((len(z), k), dtype=np.int64)
+    for i in range(0, len(z), chunk_size):
+        fit = z[i:i + chunk_size] @ affinity
+        out[i:i + chunk_size] = np.argpartition(-fit, k - 1, axis=1)[:, :k]
+    return out
+
+
+def field_demand(scores: np.ndarray,
+                 index: FieldIndex,
+                 groups: Optional[List[str]] = None,
+                 level: str = "broad",
+                 k: int = 5,
+                 affinity: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """需求矩阵：行为分组，列为 broad / narrow 领域代码，值为该组 top-k 名额中落在该领域的百分比"""
+    if affinity is None:
+        affinity = affinity_matrix(index)
+    top = top_fields(scores, affinity, k=k)
+
+    # 细分领域 → 所选级别的代码
+    digits = LEVEL_DIGITS[level]
+    codes = [str(f.get("detailed_field_code", "")).strip()[:digits] for f in index.fields]
+    columns, field_to_col = np.unique(codes, return_inverse=True)
+    cols = field_to_col[top]  # (n, k)
+
+    groups = np.asarray(groups if groups is not None else ["All students"] * len(scores))
+    names, group_idx = np.unique(groups, return_inverse=True)
+    # 一次 bincount 同时统计所有 (分组, 领域) 组合
+    flat = np.repeat(group_idx, cols.shape[1]) * len(columns) + cols.ravel()
+    counts = np.bincount(flat, minlength=len(names) * len(columns)).reshape(len(names), len(columns))
+    share = 100.0 * counts / counts.sum(axis=1, keepdims=True)
+    return pd.DataFrame(share, index=names, columns=columns)
@@ -0,0 +1,99 @@
+"""survey_processed 得分批量导入 / 回填
+
+用法：
+    python import_scores.py                  # 回填表中仍只有字符串得分的旧行
+    python import_scores.py --csv new.csv    # 导入旧格式导出文件（Username,Holland_Scores,RIASEC_Scores）
+
+旧字符串按批向量化解析为 12 个数值列，再分块 upsert；旧字符串列同时保留，
+兼容尚未迁移的读取方。CSV 导入按自然键 (Username, response_hash) upsert，
+同一文件重复导入不会产生重复行。
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from survey_scores import LEGACY_COLUMNS, SCORE_COLUMNS, parse_legacy_frame, response_hash
+
+TABLE = "survey_processed"
+NATURAL_KEY = "Username,response_hash"
+
+
+def to_records(df: pd.DataFrame, key_columns: List[str]) -> List[dict]:
+    """解析一批旧行，返回可直接 upsert 的记录（跳过无法解析的行）"""
+    scores = parse_legacy_frame(df)
+    valid = ~scores.isna().any(axis=1)
+    if (~valid).any():
+        print(f"Skipping {int((~valid).sum())} unparseable row(s)", file=sys.stderr)
+    out = pd.concat([df.loc[valid, key_columns + LEGACY_COLUMNS], scores.loc[valid].round(4)], axis=1)
+    return out.replace({np.nan: None}).to_dict("records")
+
+
+def upsert_chunks(supabase, records: List[dict], chunk_size: int, on_conflict: str) -> int:
+    for i in range(0, len(records), chunk_size):
+        supabase.table(TABLE).upsert(records[i:i + chunk_size], on_conflict=on_conflict).execute()
+    return len(records)
+
+
+def pending_pages(supabase, page_size: int) -> Iterator[pd.DataFrame]:
+    """按 id keyset 分页读取数值列尚未填充的行"""
+    last_id = None
+    while True:
+        query = (
+            supabase.table(TABLE)
+            .select("id,Username," + ",".join(LEGACY_COLUMNS))
+            .is_(SCORE_COLUMNS[0], "null")
+            .order("id")
+            .limit(page_size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.execute().data or []
+        if not page:
+            return
+        last_id = page[-1]["id"]
+        yield pd.DataFrame(page)
+
+
+def backfill(supabase, page_size: int = 1000, chunk_size: int = 500) -> int:
+    """回填表内旧行的数值列"""
+    total = 0
+    for df in pending_pages(supabase, page_size):
+        total += upsert_chunks(supabase, to_records(df, ["id", "Username"]), chunk_size, on_conflict="id")
+        print(f"backfilled {total} row(s)")
+    return total
+
+
+def import_csv(supabase, path: Path, page_size: int = 1000, chunk_size: int = 500) -> int:
+    """导入旧格式 CSV（按块读取，不会一次性载入整个文件）"""
+    total = 0
+    for df in pd.read_csv(path, chunksize=page_size, dtype=str):
+        df = df.assign(response_hash=response_hash(df[LEGACY_COLUMNS]))
+        # 同一次 upsert 中不能出现两行相同的键
+        df = df.drop_duplicates(["Username", "response_hash"])
+        total += upsert_chunks(supabase, to_records(df, ["Username", "response_hash"]), chunk_size,
+                               on_conflict=NATURAL_KEY)
+        print(f"imported {total} row(s)")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", type=Path, default=None, help="legacy export to import (re-running updates the same rows)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    from supabase_client import get_supabase_client
+    supabase = get_supabase_client()
+    if args.csv:
+        import_csv(supabase, args.csv, args.page_size, args.chunk_size)
+    else:
+        backfill(supabase, args.page_size, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
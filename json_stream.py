@@ -0,0 +1,235 @@
+"""流式 JSON 解析：在模型还在输出时提取顶层字符串字段的内容，或逐个取出数组元素"""
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type
+
+from pydantic import BaseModel
+
+from structured_output import (
+    invoke_structured, item_model, list_field, repair_json, response_format, retry_messages,
+)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldExtractor:
+    """逐块喂入模型输出，实时得到顶层字符串字段（如 "summary"）已生成的部分
+
+    只关心最外层对象的字符串值，嵌套结构整体跳过；第一个 "{" 之前的内容
+    （例如 ```json）被忽略。最终结果仍应在流结束后用 json.loads 校验。
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {}
+        self._depth = 0
+        self._in_string = False
+        self._role = None          # "key" / "value" / None（不关心的字符串）
+        self._expect_key = False
+        self._key = ""
+        self._current_key = None
+        self._escape = None        # 转义序列缓冲（可能跨 chunk）
+        self._high_surrogate = None
+
+    def feed(self, text: str) -> Dict[str, str]:
+        """喂入一段文本，返回本次新增的内容 {字段: 增量}"""
+        delta: Dict[str, str] = {}
+        for c in text:
+            if self._in_string:
+                self._string_char(c, delta)
+            elif self._depth == 0 and c != "{":
+                continue
+            elif c in "{[":
+                self._depth += 1
+                if c == "{" and self._depth == 1:
+                    self._expect_key = True
+            elif c in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and c == ",":
+                self._expect_key = True
+            elif self._depth == 1 and c == ":":
+                self._expect_key = False
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._role, self._key = "key", ""
+                elif self._depth == 1 and self._current_key in self.fields:
+                    self._role = "value"
+                    self.values.setdefault(self._current_key, "")
+                else:
+                    self._role = None
+        return delta
+
+    def _string_char(self, c: str, delta: Dict[str, str]) -> None:
+        if self._escape is not None:
+            self._escape += c
+            if self._escape[0] == "u":
+                if len(self._escape) < 5:
+                    return
+                self._emit_codepoint(int(self._escape[1:], 16), delta)
+            else:
+                self._emit(_ESCAPES.get(c, c), delta)
+            self._escape = None
+        elif c == "\\":
+            self._escape = ""
+        elif c == '"':
+            self._in_string = False
+            if self._role == "key":
+                self._current_key = self._key
+            self._role = None
+        else:
+            self._emit(c, delta)
+
+    def _emit_codepoint(self, code: int, delta: Dict[str, str]) -> None:
+        # 😀 这类代理对需要两个转义拼成一个字符
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit(chr(code), delta)
+
+    def _emit(self, s: str, delta: Dict[str, str]) -> None:
+        if self._role == "key":
+            self._key += s
+        elif self._role == "value":
+            self.values[self._current_key] += s
+            delta[self._current_key] = delta.get(self._current_key, "") + s
+
+
+class JsonArrayStreamer:
+    """逐块喂入模型输出，目标数组中的每个对象一闭合就解析并返回
+
+    key 为空时目标是第一个出现的数组（顶层数组，或顶层对象里的第一个数组），
+    否则是顶层对象中该键对应的数组。单个元素解析失败时跳过。
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.items: List[Any] = []
+        self.done = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._target = None        # 目标数组内部的深度
+        self._element = None       # 当前元素的文本
+        self._string = None        # 顶层对象中的字符串（用于识别键名）
+        self._last_string = None
+
+    def feed(self, text: str) -> List[Any]:
+        """喂入一段文本，返回本次新完成的元素"""
+        new: List[Any] = []
+        for c in text:
+            if self.done:
+                break
+            if self._element is not None:
+                self._element.append(c)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string is not None:
+                        self._last_string = "".join(self._string)
+                elif self._string is not None:
+                    self._string.append(c)
+            elif not self._started and c not in "{[":
+                # 忽略 ```json 之类的前缀
+                continue
+            elif c == '"':
+                self._in_string = True
+                self._string = [] if self._depth == 1 and self._element is None else None
+            elif c in "{[":
+                self._started = True
+                if self._target is None and c == "[" and self._depth <= 1 and (
+                        self.key is None or (self._depth == 1 and self._last_string == self.key)):
+                    self._target = self._depth + 1
+                elif self._element is None and self._depth == self._target:
+                    self._element = [c]
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._target is None:
+                    continue
+                if self._element is not None and self._depth == self._target:
+                    try:
+                        item = json.loads("".join(self._element))
+                    except json.JSONDecodeError:
+                        item = None
+                    self._element = None
+                    if item is not None:
+                        self.items.append(item)
+                        new.append(item)
+                elif self._depth < self._target:
+                    self.done = True
+        return new
+
+
+def _array_from_text(text: str, key: Optional[str]) -> List[Any]:
+    """整体解析（流式解析没有得到任何元素时的回退）"""
+    text = text.strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("Model did not return valid JSON.\n" + text)
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]") + 1
+    data = json.loads(text[start:end])
+    if isinstance(data, dict):
+        data = data.get(key) if key else next((v for v in data.values() if isinstance(v, list)), None)
+    if not isinstance(data, list):
+        raise ValueError("Model did not return a JSON array.\n" + text[:200])
+    return data
+
+
+def stream_json_array(llm, messages, site=None, key: Optional[str] = None,
+                      schema: Optional[Type[BaseModel]] = None) -> Iterator[Any]:
+    """流式调用 LLM，依次产出目标数组中已完整的元素；结束后记录调用点的缓存命中
+
+    schema 为列表模型（如 QSUniversityList）时由服务商按 schema 约束输出，目标数组就是它的列表字段，
+    每个元素按元素模型校验后以 dict 产出，不合格的元素跳过。流中一个元素也没解析出来时回退为整体解析；
+    仍失败时，有 schema 则带着错误重试一次（非流式），否则抛出异常。
+    """
+    streaming_llm = llm
+    if schema is not None:
+        key = list_field(schema)
+        item = item_model(schema)
+        streaming_llm = llm.bind(response_format=response_format(schema))
+    parser = JsonArrayStreamer(key)
+    usage = None
+    text = ""
+    count = 0
+    for chunk in streaming_llm.stream(messages):
+        # 带 schema 的流最后会把用量再发一遍，只记最后一个带用量的 chunk，避免重复累计
+        if getattr(chunk, "usage_metadata", None):
+            usage = chunk
+        if chunk.content:
+            text += chunk.content
+            for value in parser.feed(chunk.content):
+                if schema is not None:
+                    try:
+                        value = item.model_validate(value).model_dump()
+                    except ValueError:
+                        continue
+                count += 1
+                yield value
+    if site is not None and usage is not None:
+        site.record(usage)
+    if count:
+        return
+    if schema is None:
+        yield from _array_from_text(text, key)
+        return
+    try:
+        # 整体修复后逐个校验（裸数组也可以）
+        data = repair_json(text)
+        values = data.get(key) if isinstance(data, dict) else data
+        if not isinstance(values, list):
+            raise ValueError(f"Expected a JSON array under {key!r}.")
+        values = [item.model_validate(value).model_dump() for value in values]
+    except ValueError as e:
+        result = invoke_structured(llm, retry_messages(messages, text, str(e)), schema, site, retries=0)
+        values = [value.model_dump() for value in getattr(result, key)]
+    yield from values
@@ -0,0 +1,119 @@
+"""本地 OpenAI 兼容 LLM 桩服务，用于端到端测试批处理任务（不产生任何费用）
+
+用法：
+    python llm_stub.py --port 8765
+    python precompute.py --llm-base-url http://127.0.0.1:8765/v1
+
+支持 /v1/chat/completions（含 stream=true）和 /v1/embeddings，
+根据 system prompt 返回固定结构的 JSON。
+"""
+import argparse
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 64
+
+SUMMARY = {
+    "dominant_type": "Investigative-Social + Learning-Altruism",
+    "summary": "You enjoy understanding how things work and sharing that with others. "
+               "Your curiosity and wish to help point towards study paths that combine research with people.",
+}
+RECOMMENDATION = {
+    "top_recommendations": [
+        {
+            "field_name": "Natural and Physical Sciences",
+            "asced_broad_code": "01",
+            "asced_narrow_code": "0101",
+            "why_fit": "Matches strong investigative interests.",
+            "sample_university_majors": ["Mathematics", "Physics"],
+            "suggested_high_school_subjects": ["Mathematics", "Physics"],
+            "useful_extracurriculars": ["Science olympiad"],
+            "possible_career_paths": ["Research scientist", "Data analyst"],
+            "cautions": ["Heavy math load"],
+            "Universities": ["University of Melbourne"],
+            "Courses": ["Bachelor of Science"],
+        }
+    ],
+    "notes": "Stub response.",
+}
+
+
+def _reply_for(messages) -> str:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "dominant_type" in system:
+        return json.dumps(SUMMARY)
+    if "top_recommendations" in system:
+        return json.dumps(RECOMMENDATION)
+    return json.dumps({"results": [], "recommendations": []})
+
+
+def _embedding(text: str):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIM)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/embeddings"):
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({
+                "object": "list",
+                "model": request.get("model"),
+                "data": [{"object": "embedding", "index": i, "embedding": _embedding(str(t))}
+                         for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+            return
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        content = _reply_for(request.get("messages", []))
+        base = {"id": "stub", "created": int(time.time()), "model": request.get("model", "stub")}
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        if not request.get("stream"):
+            self._send_json({**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]})
+            return
+
+        # SSE 流式：按小块返回，模拟真实的逐 token 输出
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(content), 16):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"content": content[i:i + 16], **({"role": "assistant"} if i == 0 else {})},
+                 "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        done = {**base, "object": "chat.completion.chunk", "usage": usage, "choices": [
+            {"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
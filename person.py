@@ -1,19 +1,26 @@
 import os
-import json
-import numpy as np
+import time
 import streamlit as st
-import plotly.graph_objects as go
-from typing import Dict, List, Tuple
-import matplotlib.pyplot as plt
-from pydantic import BaseModel
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from typing import Dict, List
 import re
-import sys
-from pathlib import Path
-from typing import Dict, List, Optional
 import pandas as pd
-from supabase import create_client, Client
 from supabase_client import get_supabase_client
+from auth import check_session
+from asced_embeddings import shortlist_fields
+from reference_data import get_field_index, load_asced_detail
+from prompt_compiler import cache_report
+from survey_analysis import brf_smry_streaming, stream_recommendations
+from survey_scores import SCORE_SELECT, load_score_vectors, row_scores, vector_to_dicts
+from charts import cached_spider_chart, comparison_chart
+from cohort_stats import GROUP_COLUMN, CohortStats
+from similar_students import StudentIndex
+from reports import build_report_bundle
+from recommendation_store import load_latest_analyses, load_stored_analysis, save_analysis, score_fingerprint
+from speculative import (
+    cancel_speculative_analysis,
+    get_speculative_analysis,
+    start_speculative_analysis,
+)
 
 # Load secrets from Streamlit secrets management
 try:
@@ -31,30 +38,6 @@ if "auth_user" not in st.session_state:
 if "auth_session" not in st.session_state:
     st.session_state.auth_session = None
 
-# 检查当前会话
-def check_session():
-    """检查 Supabase 认证会话"""
-    try:
-        # 尝试从 session_state 获取会话
-        if st.session_state.auth_session:
-            # 使用会话的 access_token 获取用户信息
-            try:
-                # 设置会话到客户端
-                supabase.auth.set_session(
-                    access_token=st.session_state.auth_session.access_token,
-                    refresh_token=st.session_state.auth_session.refresh_token
-                )
-                user = supabase.auth.get_user()
-                if user and user.user:
-                    return user.user, st.session_state.auth_session
-            except Exception:
-                # 会话可能已过期，清除它
-                st.session_state.auth_session = None
-                st.session_state.auth_user = None
-        return None, None
-    except Exception:
-        return None, None
-
 # 登录函数
 def sign_in(email: str, password: str):
     """使用 Supabase Auth 登录"""
@@ -258,262 +241,150 @@ with st.sidebar:
             if sign_out():
                 st.success("Logged out successfully!")
                 st.rerun()
+    # 显示各调用点的 prompt 前缀缓存命中率
+    if cache_report():
+        with st.expander("Prompt cache"):
+            st.dataframe(pd.DataFrame(cache_report()), hide_index=True)
 
 st.divider()
 
 # 允许查询任何用户的邮箱地址
 user_id = st.text_input(
     "User Email Address", 
-    value="mark.m.2024@benendenguangzhou.cn",
+    value=st.session_state.get("roster_selected_email", "mark.m.2024@benendenguangzhou.cn"),
     placeholder="Enter email address to query",
     help="You can enter any user's email address to view their survey results."
 )
 
+# 只保留当前已加载学生的后台分析
+cancel_speculative_analysis(keep_email=st.session_state.get("loaded_email"))
+
+
+@st.cache_resource
+def get_cohort_stats():
+    """全体学生得分统计（进程内共享，按 id 增量刷新）"""
+    return CohortStats()
+
+
+def cohort_averages(h_vals: dict, r_vals: dict):
+    """返回 (HLAFPS 均值, RIASEC 均值, HLAFPS 百分位, RIASEC 百分位)"""
+    stats = get_cohort_stats()
+    try:
+        stats.refresh(supabase)
+    except Exception:
+        # 查询失败时沿用上次的统计（首次失败则为历史均值）
+        pass
+    h_avg, r_avg = stats.averages()
+    h_pct, r_pct = stats.student_percentiles(h_vals, r_vals)
+    return h_avg, r_avg, h_pct, r_pct
+
+
+@st.cache_resource
+def get_student_index():
+    """历届学生得分向量索引（进程内共享，按 id 增量插入新问卷）"""
+    return StudentIndex()
+
+
+def similar_students(username: str, h_vals: dict, r_vals: dict, k: int = 8) -> pd.DataFrame:
+    """得分最相近的 k 位学生及其已存储的推荐领域"""
+    index = get_student_index()
+    index.refresh(supabase)
+    neighbours = index.top_k(h_vals, r_vals, k=k, exclude=username)
+    try:
+        stored = load_latest_analyses(supabase, [name for name, _ in neighbours])
+    except Exception:
+        stored = {}
+    return pd.DataFrame([{
+        "Student": name,
+        "Similarity": round(sim, 3),
+        "Dominant Type": stored.get(name, {}).get("plan_name") or "",
+        "Recommended Fields": ", ".join(stored.get(name, {}).get("recommended_fields") or []),
+    } for name, sim in neighbours])
 
-def spider_chart_with_avg(
-    scores: dict,
-    avg_scores: dict = None,
-    order="RIASEC",
-    title="RIASEC Spider Chart with Average",
-    show_fullname=True,
-    bilingual=False,
-    hover_font_size=16
-):
-    # --- 定义 RIASEC 全称与解释 ---
-    desc_en = {
-        "R": ("Realistic", "Practical, hands-on, and mechanical activities."),
-        "I": ("Investigative", "Analytical, intellectual, and scientific tasks."),
-        "A": ("Artistic", "Creative, expressive, and design-related activities."),
-        "S": ("Social", "Helping, teaching, and cooperative interactions."),
-        "E": ("Enterprising", "Leadership, persuasion, and business ventures."),
-        "C": ("Conventional", "Organizing, planning, and data-oriented tasks.")
-
-    }
-    desc_cn = {
-        "R": "现实型：喜欢实际操作、动手实验、机械工程类任务。",
-        "I": "研究型：喜欢分析、思考、探索和科学研究。",
-        "A": "艺术型：喜欢创意表达、设计、艺术与想象。",
-        "S": "社会型：喜欢帮助他人、教学、合作与沟通。",
-        "E": "企业型：喜欢领导、说服、管理与商业活动。",
-        "C": "常规型：喜欢组织、记录、文书与数据管理。"
-    }
-    hlafps_desc = {
-    "H": ("Hedonism", "Seeking enjoyment, pleasure, and creative life experiences; values freedom, aesthetics, and fun."),
-    "P": ("Power & Status", "Aspiring to influence, leadership, and recognition; motivated by prestige and social standing."),
-    "A": ("Altruism", "Driven by empathy, compassion, and a desire to help others or contribute to society."),
-    "L": ("Learning & Achievement", "Motivated by curiosity, mastery, and personal growth through knowledge and accomplishment."),
-    "F": ("Finance", "Focused on financial success, material stability, and economic independence."),
-    "S": ("Security", "Prefers stability, predictability, and safety; values structured environments and long-term certainty.")
-    }
-    order_map = {"RIASEC": ["R","I","A","S","E","C"], "HLAFPS": ["H","L","A","F","P","S"]}
-    axis = order_map.get(order.upper(), order_map["RIASEC"])
-
-    labels, values, hover_texts = [], [], []
-    for k in axis:
-        if k not in scores:
-            continue
-        if order=='RIASEC':
-            fullname, explanation = desc_en.get(k, (k, ""))
-        else:
-            fullname, explanation = hlafps_desc.get(k, (k, ""))
-        if bilingual:
-            explanation += f"<br><i>{desc_cn.get(k, '')}</i>"
-        label = fullname if show_fullname else k
-        labels.append(label)
-        values.append(scores[k])
-        hover_texts.append(f"<b>{fullname}</b><br>{explanation}<br><b>Score:</b> {scores[k]}")
-
-    # 闭合图形
-    labels_closed = labels + [labels[0]]
-    values_closed = values + [values[0]]
-    r_max = max(max(values), max(avg_scores.values()) if avg_scores else max(values)) * 1.3
-
-    fig = go.Figure()
-
-    # 如果提供平均值，先画平均层（灰色）
-    if avg_scores:
-        avg_vals = [avg_scores.get(k, 0) for k in axis if k in scores]
-        avg_vals += [avg_vals[0]]
-        fig.add_trace(go.Scatterpolar(
-            r=avg_vals,
-            theta=labels_closed,
-            mode='lines+markers',
-            line=dict(color='#ed2939', width=2),
-            marker=dict(size=6, color='#ed2939'),
-            fill='toself',
-            name="Average",
-            hovertemplate="<b>%{theta}</b><br>Average: %{r}<extra></extra>"
-        ))
-
-
-    # 用户个人得分层
-
-
-    fig.add_trace(go.Scatterpolar(
-        r=values_closed,
-        theta=labels_closed,
-        mode='lines+markers',
-        
-        line=dict(color='#007958', width=3),
-        marker=dict(size=10, color='#007958', line=dict(width=1, color='white')),
-        fill='toself',
-        name="You",
-        hovertext=hover_texts + [hover_texts[0]],
-        hoverinfo="text"
-    ))
-
-    # 外圈 hover 捕捉
-    fig.add_trace(go.Scatterpolar(
-        r=[r_max for _ in labels],
-        theta=labels,
-        mode='markers',
-        hovertext=hover_texts,
-        hoverinfo="text",
-        marker=dict(size=20, color='rgba(0,0,0,0)'),
-        showlegend=False
-    ))
-
-    # 布局
-    fig.update_layout(
-        title=title,
-        polar=dict(
-            radialaxis=dict(visible=True, range=[0, r_max], showticklabels=False),
-            angularaxis=dict(
-                direction="clockwise",
-                tickfont=dict(size=16, color="#222", family="Arial Black")
-            )
-        ),
-        hoverlabel=dict(
-            font_size=hover_font_size,
-            font_family="Arial",
-            bgcolor="rgba(255,255,255,0.95)",
-            bordercolor="#555"
-        ),
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.2,
-            xanchor="center",
-            x=0.5
-        ),
-        margin=dict(l=40, r=40, t=60, b=60)
-    )
-
-    return fig
-
-
-SYSTEM_PROMPT = """
-You are a senior academic pathways adviser.
-
-Please analyze the student's profile based on two psychological score models:
-
-1) HLAFPS – value-based motivations:
-   • H: Hedonism (enjoyment, pleasure)
-   • L: Learning & Achievement (curiosity, mastery)
-   • A: Altruism (helping, contributing)
-   • F: Finance (financial success, stability)
-   • P: Power & Status (leadership, recognition)
-   • S: Security (stability, predictability)
-
-2) RIASEC – interest and working style:
-   • R: Realistic (hands-on, technical, practical)
-   • I: Investigative (analytical, research-oriented)
-   • A: Artistic (creative, expressive)
-   • S: Social (helping, teaching, people-centered)
-   • E: Enterprising (leadership, business, persuasion)
-   • C: Conventional (structure, data, organization)
-
--------------------
-TASKS:
--------------------
-1. Interpret both models **holistically**:
-   - Do NOT convert HLAFPS into RIASEC or vice versa.
-   - RIASEC → what types of activities the student enjoys or excels in.
-   - HLAFPS → what the student finds meaningful and rewarding.
-   - Use both to understand interest + motivation.
-
-2. Identify the top 2 highest-scoring letters from each model.
-   - Format as: dominant_type = "RIASEC1-RIASEC2 + HLAFPS1-HLAFPS2"
-   - Example: "Investigative-Social + Learning-Altruism"
-
-3. Write a **2–3 sentence human-centered summary** that combines both:
-   - Tone: supportive, age-appropriate, future-focused.
-   - Show how their interests (RIASEC) and motivations (HLAFPS) complement each other.
-
--------------------
-INPUT FORMAT:
-HLAFPS scores (0–100): { "H": , "L": , "A": , "F": , "P": , "S": }
-RIASEC scores (0–100): { "R": , "I": , "A": , "S": , "E": , "C": }
-
--------------------
-OUTPUT FORMAT (no extra commentary):
-{
-  "dominant_type": "RIASEC1-RIASEC2 + HLAFPS1-HLAFPS2",
-  "summary": "2–3 sentence synthesis combining both models."
-}
-"""
-
-def brf_smry_streaming(holland: Dict[str, float],
-                       riasec: Dict[str, float],
-                       model: str = "gpt-5-nano",
-                       placeholder=None):
-    """流式显示 dominant type 分析"""
-    llm = ChatOpenAI(model_name=model, temperature=0.000001, streaming=True)
-    user_prompt = f"""
-HLAFPS scores (H/L/A/F/P/S): {holland}
-RIASEC scores (R/I/A/S/E/C): {riasec}
- Write a **2–3 sentence human-centered summary** that combines both:
-   - Tone: supportive, age-appropriate, future-focused.
-   - Show how their interests (RIASEC) and motivations (HLAFPS) complement each other.
-Return strict JSON matching the schema.
-"""
-    
-    # 收集流式响应（静默收集，不显示过程）
-    full_text = ""
-    
-    # 流式调用
-    for chunk in llm.stream([("system", SYSTEM_PROMPT), ("user", user_prompt)]):
-        if hasattr(chunk, 'content') and chunk.content:
-            full_text += chunk.content
-    
-    text = full_text.strip()
 
-    # Robust JSON extraction
+def candidate_fields(holland: Dict[str, float], riasec: Dict[str, float], k: int = 25) -> List[dict]:
+    """按学生画像筛选候选领域；向量检索失败时退回完整列表"""
     try:
-        result = json.loads(text)
-        return result
+        return shortlist_fields(get_field_index(), holland, riasec, k=k)
     except Exception:
-        start, end = text.find("{"), text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            result = json.loads(text[start:end+1])
-            return result
-        raise ValueError("Model did not return valid JSON.\n" + text)
-
-def brf_smry (holland: Dict[str, float],
-                     riasec: Dict[str, float],
-                     model: str = "gpt-5-nano") -> dict:
-    """非流式版本（用于缓存）"""
-    llm = ChatOpenAI(model_name=model, temperature=0.000001)
-    user_prompt = f"""
-HLAFPS scores (H/L/A/F/P/S): {holland}
-RIASEC scores (R/I/A/S/E/C): {riasec}
- Write a **2–3 sentence human-centered summary** that combines both:
-   - Tone: supportive, age-appropriate, future-focused.
-   - Show how their interests (RIASEC) and motivations (HLAFPS) complement each other.
-Return strict JSON matching the schema.
-"""
-    resp = llm.invoke([("system", SYSTEM_PROMPT), ("user", user_prompt)])
-    text = resp.content.strip()
-
-    # Robust JSON extraction
+        return load_asced_detail()
+
+
+def persist_analysis(summary: dict = None, recommendation: dict = None):
+    """把新生成的分析结果写入 career_planning，下次访问或其他页面直接复用
+
+    用户名取加载得分时保存的邮箱（与得分、指纹一致），而不是输入框中当前的内容。
+    """
+    username = st.session_state.get("loaded_email")
+    fingerprint = st.session_state.get("score_fingerprint")
+    if not username or not fingerprint:
+        return
     try:
-        return json.loads(text)
+        save_analysis(supabase, username, fingerprint, summary=summary, recommendation=recommendation)
     except Exception:
-        start, end = text.find("{"), text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            return json.loads(text[start:end+1])
-        raise ValueError("Model did not return valid JSON.\n" + text)
+        # 表结构未迁移时只保留在 session_state 中
+        pass
+
+
+# 批量生成一个班 / 一所学校的报告
+with st.expander("📦 Batch reports"):
+    batch_emails = st.text_area("Student emails (one per line)", key="batch_emails")
+    batch_school = st.text_input(f"or {GROUP_COLUMN}", key="batch_school") if GROUP_COLUMN else ""
+    if st.button("Generate reports"):
+        emails = [e.strip() for e in batch_emails.splitlines() if e.strip()]
+        if not emails and not batch_school:
+            st.warning("Please enter at least one email.")
+        else:
+            progress = st.progress(0.0, text="Preparing reports...")
+            try:
+                stats = get_cohort_stats()
+                stats.refresh(supabase)
+                bundle, count = build_report_bundle(
+                    supabase, emails=emails or None, school=batch_school or None, stats=stats,
+                    on_progress=lambda done, total: progress.progress(done / total, text=f"Rendered {done}/{total}"))
+                st.session_state.report_bundle = (bundle, count)
+            except Exception as e:
+                st.error(f"Error generating reports: {e}")
+    if st.session_state.get("report_bundle"):
+        bundle, count = st.session_state.report_bundle
+        st.download_button(f"Download {count} report(s)", data=bundle,
+                           file_name="survey_reports.zip", mime="application/zip")
+
+
+# 多名学生（或同一学生前后多次问卷）叠加对比
+with st.expander("🆚 Compare students"):
+    compare_emails = st.text_area("Student emails (one per line)", key="compare_emails")
+    if st.button("Compare"):
+        emails = list(dict.fromkeys(e.strip() for e in compare_emails.splitlines() if e.strip()))
+        if not emails:
+            st.warning("Please enter at least one email.")
+        else:
+            try:
+                # 一次 in_ 查询取回所有人的得分
+                rows, matrix = load_score_vectors(supabase, usernames=emails, columns="id," + SCORE_SELECT)
+                order = sorted(range(len(rows)), key=lambda i: (emails.index(rows[i]["Username"]), rows[i]["id"]))
+                profiles_h, profiles_r, seen = {}, {}, {}
+                for i in order:
+                    name = rows[i]["Username"]
+                    seen[name] = seen.get(name, 0) + 1
+                    # 同一学生有多次问卷时按时间顺序编号
+                    label = name if seen[name] == 1 else f"{name} (#{seen[name]})"
+                    profiles_h[label], profiles_r[label] = vector_to_dicts(matrix[i])
+                st.session_state.comparison = (profiles_h, profiles_r)
+                missing = [e for e in emails if e not in seen]
+                if missing:
+                    st.info(f"No survey results for: {', '.join(missing)}")
+            except Exception as e:
+                st.error(f"Error querying Supabase: {e}")
+    if st.session_state.get("comparison"):
+        profiles_h, profiles_r = st.session_state.comparison
+        h_avg, r_avg = get_cohort_stats().averages()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(comparison_chart(profiles_r, r_avg, order="RIASEC", title="RIASEC COMPARISON"))
+        with col2:
+            st.plotly_chart(comparison_chart(profiles_h, h_avg, order="HLAFPS", title="HLAFPS COMPARISON"))
+
 
 st.session_state.exs=None
 if st.button("My Survey Result"):
@@ -521,11 +392,13 @@ if st.button("My Survey Result"):
         st.warning("Please enter a valid User_id.")
     else:
         try:
-            # Query the survey_processed table
+            # 同一学生可能有多次问卷，取最新的一次（id 最大）；count 为该学生的问卷总数
             response = (
                 supabase.table("survey_processed")
-                .select("*")
+                .select("id," + SCORE_SELECT, count="exact")
                 .eq("Username", user_id)
+                .order("id", desc=True)
+                .limit(1)
                 .execute()
             )
             
@@ -533,16 +406,46 @@ if st.button("My Survey Result"):
             if not data:
                 st.info("No matching records found.")
             else:
-                df = pd.DataFrame(data)
-                h_vals = {k: float(v) for k, v in (item.split(":") for item in df.loc[0, "Holland_Scores"].replace(" ", "").split(","))}
-                r_vals = {k: float(v) for k, v in (item.split(":") for item in df.loc[0, "RIASEC_Scores"].replace(" ", "").split(","))}
-                st.success(f"Found {len(df)} record(s) for {user_id}")
+                # 优先读取数值列，未回填的旧行再解析字符串
+                h_vals, r_vals = row_scores(data[0])
+                total = response.count or 1
+                st.success(f"Loaded the latest survey for {user_id}"
+                           + (f" ({total} surveys on record)" if total > 1 else ""))
                 st.session_state.h_vals=h_vals
                 st.session_state.r_vals=r_vals
-                # 清除该用户的 dominant type 缓存，以便重新分析
+                st.session_state.loaded_email = user_id
+                # 清除该用户的 dominant type / 推荐缓存，以便重新分析
                 dominant_type_key = f"dominant_type_{user_id}"
                 if dominant_type_key in st.session_state:
                     del st.session_state[dominant_type_key]
+                recommendation_key = f"recommendation_{user_id}"
+                if recommendation_key in st.session_state:
+                    del st.session_state[recommendation_key]
+
+                # 得分和 prompt 版本都没变时直接复用已存储的分析结果
+                fingerprint = score_fingerprint(h_vals, r_vals)
+                st.session_state.score_fingerprint = fingerprint
+                try:
+                    stored = load_stored_analysis(supabase, user_id, fingerprint)
+                except Exception:
+                    stored = None
+                if stored and stored.get("summary"):
+                    st.session_state[dominant_type_key] = stored["summary"]
+                if stored and stored.get("recommendation"):
+                    st.session_state[recommendation_key] = stored["recommendation"]
+
+                # 缺失的部分立即在后台并行启动，不等用户点击
+                need_summary = dominant_type_key not in st.session_state
+                need_recommendation = recommendation_key not in st.session_state
+                if need_summary or need_recommendation:
+                    try:
+                        field_index = get_field_index()
+                    except Exception:
+                        field_index = None
+                    start_speculative_analysis(
+                        user_id, h_vals, r_vals, field_index, load_asced_detail(),
+                        need_summary=need_summary,
+                        need_recommendation=need_recommendation)
                  
         except Exception as e:
             st.error(f"Error querying Supabase: {e}")
@@ -550,35 +453,24 @@ if st.button("My Survey Result"):
 
 st.divider()
 
+# 分析结果属于加载得分时的学生；输入框改成其他邮箱但还没点按钮时不变
+loaded_email = st.session_state.get("loaded_email", user_id)
+
 
 if "h_vals" in st.session_state:
 
     h_vals = st.session_state.h_vals
     r_vals = st.session_state.r_vals
+    h_avg, r_avg, h_pct, r_pct = cohort_averages(h_vals, r_vals)
     col1, col2 = st.columns(2)
     with col1:
 
-        fig = spider_chart_with_avg(r_vals,{'R': 21.13, 'I': 19.85, 'A': 29.34, 'S': 22.68, 'E': 24.25, 'C': 18.72}, order="RIASEC", title='YOUR RIASEC TYPE')
+        fig = cached_spider_chart(r_vals, r_avg, order="RIASEC", title='YOUR RIASEC TYPE', percentiles=r_pct)
         st.plotly_chart(fig)
     with col2:
-        fig = spider_chart_with_avg(h_vals,{'H': 31.25, 'L': 22.48, 'A': 18.73, 'F': 27.10, 'P': 25.87, 'S': 29.55}, order="HLAFPS", title="YOUR HLAFPS TYPE")
+        fig = cached_spider_chart(h_vals, h_avg, order="HLAFPS", title="YOUR HLAFPS TYPE", percentiles=h_pct)
         st.plotly_chart(fig)
     
-    # 只在第一次分析时计算 Dominant Type，避免重复分析
-    dominant_type_key = f"dominant_type_{user_id}"
-    if dominant_type_key not in st.session_state:
-        # 使用流式分析（静默模式，不显示过程）
-        with st.spinner("Analyzing Dominant Type..."):
-            bs = brf_smry_streaming(
-                holland=h_vals,
-                riasec=r_vals,
-                model="gpt-5-nano",
-                placeholder=None
-            )
-        st.session_state[dominant_type_key] = bs
-    else:
-        bs = st.session_state[dominant_type_key]
-
     def color_text_dynamic(text):
         # 定义 RIASEC + HLAFPS 对应颜色（包含完整名称和缩写）
         color_map = {
@@ -619,9 +511,57 @@ if "h_vals" in st.session_state:
     
     st.divider()
     st.header("Your Dominant Type")
+    type_slot = st.empty()
+    summary_slot = st.empty()
+
+    def show_partial(values: dict):
+        # 流式输出中：边生成边显示
+        type_slot.markdown(color_text_dynamic(values.get("dominant_type", "")), unsafe_allow_html=True)
+        summary_slot.markdown(values.get("summary", "") + "▌")
+
+    # 只在第一次分析时计算 Dominant Type，避免重复分析
+    dominant_type_key = f"dominant_type_{loaded_email}"
+    if dominant_type_key not in st.session_state:
+        summary_slot.caption("Analyzing Dominant Type...")
+        speculative = get_speculative_analysis(loaded_email)
+        bs = None
+        if speculative and speculative.summary:
+            # 后台任务仍在生成时，轮询其已生成的部分
+            while not speculative.summary.done():
+                if speculative.summary_partial:
+                    show_partial(speculative.summary_partial)
+                time.sleep(0.1)
+            try:
+                bs = speculative.summary.result()
+            except Exception:
+                bs = None
+        if bs is None:
+            bs = brf_smry_streaming(
+                holland=h_vals,
+                riasec=r_vals,
+                model="gpt-5-nano",
+                on_update=show_partial
+            )
+        st.session_state[dominant_type_key] = bs
+        persist_analysis(summary=bs)
+    else:
+        bs = st.session_state[dominant_type_key]
+
     colored = color_text_dynamic(bs.get("dominant_type", "N/A"))
-    st.markdown(colored, unsafe_allow_html=True)
-    st.write(bs.get("summary", "N/A"))
+    type_slot.markdown(colored, unsafe_allow_html=True)
+    summary_slot.write(bs.get("summary", "N/A"))
+
+    with st.expander("👥 Students like you"):
+        try:
+            neighbours = similar_students(loaded_email, h_vals, r_vals)
+        except Exception as e:
+            neighbours = None
+            st.warning(f"Could not load similar students: {e}")
+        if neighbours is not None:
+            if neighbours.empty:
+                st.info("No other survey results yet.")
+            else:
+                st.dataframe(neighbours, hide_index=True, use_container_width=True)
     st.divider()
 
     # asced= (
@@ -661,159 +601,102 @@ if "h_vals" in st.session_state:
 
 
 
-asced= (
-                supabase.table("ased_detail")
-                .select("detailed_field_code,description")
-                .execute()
-                )
-                
-
-fields = asced.data
-
-
-
 run_btn = st.button('🤖 AI-Powered Study Field Recommendation')
 
-# ---------------------------
-# Single-call LLM function
-# ---------------------------
-schema_bloack="""
-{
-  "top_recommendations": [
-    {
-      "field_name": "string",                     // e.g., "Computer Science & Data"
-      "asced_broad_code": "string|null",          // optional if you use ASCED mapping (e.g., "02")
-      "asced_narrow_code": "string|null",         // optional (e.g., "0201")
-      "why_fit": "1 sentences",
-      "sample_university_majors": ["string", "..."],
-      "suggested_high_school_subjects": ["string", "..."],
-      "useful_extracurriculars": ["string", "..."],
-      "possible_career_paths": ["string", "..."],
-      "cautions": ["string", "..."],
-      "Universities": ["string", "..."],
-      "Courses": ["string", "..."],       
-      }
-    }
-  ],
-  "notes": "short global note (e.g., portfolio/math intensity/subject prerequisites)."
-}
-"""
-SYSTEM_PROMPT_2 = f"""
-You are an academic pathways adviser. Based on two score models—
-1) HLAFPS: H (Hedonism), L (Learning & Achievement), A (Altruism), F (Finance), P (Power & Status), S (Security)
-2) RIASEC: R (Realistic), I (Investigative), A (Artistic), S (Social), E (Enterprising), C (Conventional)
-
-Recommend suitable fields of study for a high school student. Be concise, age-appropriate, practical, and culturally neutral. 
-Do not reveal step-by-step reasoning; provide only short, decision-relevant rationales.
-
-RULES:
-- Consider both models; default weights: RIASEC 60%, HLAFPS 40%. If user provides custom weights, use them.
-- Interpret peaks and meaningful pairs/triads:
-  • R → engineering, trades, applied tech, environmental fieldwork
-  • I → science, mathematics, CS, data, research
-  • A → design, media, performing arts, architecture
-  • S → education, nursing, psychology, social work, community services
-  • E → business, entrepreneurship, management, law-adjacent, communications
-  • C → accounting, finance ops, information systems, administration, library/info mgmt
-  • H (Hedonism high) → creative, experiential, hands-on or project-based settings
-  • L (Learning & Achievement) → research-intensive, academic rigor, competitions/olympiads
-  • A (Altruism) → health, education, social impact, sustainability
-  • F (Finance) → business, economics, accounting, fintech, quantitative fields
-  • P (Power & Status) → leadership tracks, policy, law, management, debating/public speaking
-  • S (Security) → regulated/stable careers: healthcare, civil service, accounting, infrastructure
-- Break ties with HLAFPS emphasis and the student’s constraints/interests if provided.
-- university in australia has higher priority in uni recommendation 
-- Provide 2–3 top fields only select from {fields}. For each, include “why it fits”, sample university majors, suggested high-school subjects, helpful extracurriculars, and 2–3 career pathways, university and courses recommendation.
-- Keep cautions pragmatic (e.g., “heavy math load”, “portfolio required”).
-- Output strictly in JSON matching the schema below. No extra text.
-
-INPUT:
-HLAFPS scores : 
-RIASEC scores :
-OUTPUT JSON SCHEMA:
-{schema_bloack}
-"""
-
-def one_call_unified(holland: Dict[str, float],
-                     riasec: Dict[str, float],
-                     model: str = "gpt-5-nano") -> dict:    
-    llm = ChatOpenAI(model_name=model, temperature=0.00001)
-    user_prompt = f"""
-HLAFPS scores (H/L/A/F/P/S): {holland}
-RIASEC scores (R/I/A/S/E/C): {riasec}
-
-Return strict JSON matching the schema.
-"""
-    resp = llm.invoke([("system", SYSTEM_PROMPT_2), ("user", user_prompt)])
-    text = resp.content.strip()
-
-    # Robust JSON extraction
-    try:
-        return json.loads(text)
-    except Exception:
-        start, end = text.find("{"), text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            return json.loads(text[start:end+1])
-        raise ValueError("Model did not return valid JSON.\n" + text)
 
 # ---------------------------
 # Run & render
 # ---------------------------
 
 
-if run_btn:
-    with st.spinner("Analysing"):
-        
-        result = one_call_unified(
-            holland=h_vals,
-            riasec=r_vals,
-            model="gpt-5-nano"
-        )
+def render_recommendation(idx: int, rec: dict):
+    """显示一个推荐领域（可折叠）"""
+    with st.expander(f"✅ {idx}. {rec.get('field_name', 'Unnamed Field')}"):
+        st.markdown(f"**Why it fits:** {rec.get('why_fit', '')}")
 
-    # Notes removed - no longer showing blue info box
+        # 以两列形式展示
+        col1, col2 = st.columns(2)
 
-# 遍历每一个推荐专业
-    for idx, rec in enumerate(result.get("top_recommendations", []), start=1):
-        with st.expander(f"✅ {idx}. {rec.get('field_name', 'Unnamed Field')}"):
-            st.markdown(f"**Why it fits:** {rec.get('why_fit', '')}")
+        with col1:
+            st.markdown("**🎓 Sample University Majors:**")
+            for major in rec.get("sample_university_majors", []):
+                st.markdown(f"- {major}")
 
-            # 以两列形式展示
-            col1, col2 = st.columns(2)
+            st.markdown("**📘 Suggested High School Subjects:**")
+            for subject in rec.get("suggested_high_school_subjects", []):
+                st.markdown(f"- {subject}")
 
-            with col1:
-                st.markdown("**🎓 Sample University Majors:**")
-                for major in rec.get("sample_university_majors", []):
-                    st.markdown(f"- {major}")
-
-                st.markdown("**📘 Suggested High School Subjects:**")
-                for subject in rec.get("suggested_high_school_subjects", []):
-                    st.markdown(f"- {subject}")
-
-            with col2:
-                st.markdown("**🛠 Useful Extracurriculars:**")
-                for ext in rec.get("useful_extracurriculars", []):
-                    st.markdown(f"- {ext}")
+        with col2:
+            st.markdown("**🛠 Useful Extracurriculars:**")
+            for ext in rec.get("useful_extracurriculars", []):
+                st.markdown(f"- {ext}")
+
+            st.markdown("**💼 Possible Career Paths:**")
+            for career in rec.get("possible_career_paths", []):
+                st.markdown(f"- {career}")
+
+        # 注意事项
+        st.markdown("**⚠ Cautions:**")
+        for c in rec.get("cautions", []):
+            st.markdown(f"- {c}")
+
+        # Fit signals 显示
+        fit = rec.get("fit_signals", {})
+        st.markdown("---")
+        st.markdown("**Universit Recommendation:**")
+        for uni in rec.get("Universities", []):
+                st.markdown(f"- {uni}")
+        st.markdown("**Courses Recommendation:**")       
+        for course in rec.get("Courses", []):
+                st.markdown(f"- {course}")
+        if "notes" in fit:
+            st.write(f"- **Note:** {fit['notes']}")
+
+
+recommendation_key = f"recommendation_{loaded_email}"
+speculative = get_speculative_analysis(loaded_email)
+# 后台推荐已完成时先放入 session，点击按钮即可直接显示
+if (speculative and speculative.recommendation and recommendation_key not in st.session_state
+        and speculative.recommendation.done()):
+    try:
+        st.session_state[recommendation_key] = speculative.recommendation.result()
+        persist_analysis(recommendation=st.session_state[recommendation_key])
+    except Exception:
+        pass
 
-                st.markdown("**💼 Possible Career Paths:**")
-                for career in rec.get("possible_career_paths", []):
-                    st.markdown(f"- {career}")
+if run_btn:
+    # 没有现成结果时边生成边显示，完成后由下方的结果列表接管
+    live = st.empty()
+    with st.spinner("Analysing"):
+        result = st.session_state.get(recommendation_key)
+        if result is None:
+            if speculative and speculative.recommendation:
+                try:
+                    result = speculative.recommendation.result()
+                except Exception:
+                    result = None
+            if result is None:
+                recommendations = []
+                live_box = live.container()
+                for rec in stream_recommendations(
+                    holland=h_vals,
+                    riasec=r_vals,
+                    fields=candidate_fields(h_vals, r_vals),
+                    model="gpt-5-nano"
+                ):
+                    recommendations.append(rec)
+                    with live_box:
+                        render_recommendation(len(recommendations), rec)
+                live.empty()
+                result = {"top_recommendations": recommendations, "notes": ""}
+            st.session_state[recommendation_key] = result
+            persist_analysis(recommendation=result)
 
-            # 注意事项
-            st.markdown("**⚠ Cautions:**")
-            for c in rec.get("cautions", []):
-                st.markdown(f"- {c}")
+    # Notes removed - no longer showing blue info box
 
-            # Fit signals 显示
-            fit = rec.get("fit_signals", {})
-            st.markdown("---")
-            st.markdown("**Universit Recommendation:**")
-            for uni in rec.get("Universities", []):
-                    st.markdown(f"- {uni}")
-            st.markdown("**Courses Recommendation:**")       
-            for course in rec.get("Courses", []):
-                    st.markdown(f"- {course}")
-            if "notes" in fit:
-                st.write(f"- **Note:** {fit['notes']}")
+# 遍历每一个推荐专业
+    for idx, rec in enumerate(result.get("top_recommendations", []), start=1):
+        render_recommendation(idx, rec)
 
 
 else:
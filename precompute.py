@@ -0,0 +1,177 @@
+"""离线批量预计算：为 survey_processed 中所有学生生成 summary 和 recommendation
+
+用法：
+    python precompute.py --concurrency 4
+    python precompute.py --llm-base-url http://127.0.0.1:8765/v1   # 使用本地 llm_stub.py 端到端测试
+
+按 (Username, id) 复合游标做 keyset 分页遍历，已有相同得分指纹结果的行会被跳过；
+每页处理完后写入 checkpoint，中断后再次运行会从上次的位置继续。
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import streamlit as st
+
+from asced_embeddings import CACHE_DIR, build_field_index, shortlist_fields
+from recommendation_store import build_row, load_stored_analyses, lookup_user_ids, save_rows, score_fingerprint
+from roster_query import fetch_roster_page
+from survey_analysis import ANALYSIS_VERSION, brf_smry, one_call_unified
+from survey_scores import row_scores
+
+DEFAULT_CHECKPOINT = CACHE_DIR / "precompute_checkpoint.json"
+
+
+def load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        state = json.loads(path.read_text(encoding="utf-8"))
+        # prompt 版本变化、上一轮已完成或旧格式（只有 Username 游标）时从头开始
+        if state.get("version") == ANALYSIS_VERSION and not state.get("done") and "cursor" in state:
+            return state
+    return {"version": ANALYSIS_VERSION, "cursor": None,
+            "scanned": 0, "generated": 0, "failed": 0}
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def fetch_page(supabase, cursor: Optional[Tuple], page_size: int) -> Tuple[List[dict], Optional[Tuple]]:
+    """keyset 分页：返回 (本页行, 下一页游标)
+
+    Username 不唯一（同一学生可能有多次问卷），游标用 (Username, id)，
+    一页在某个学生的几行中间结束时，剩下的行会出现在下一页。
+    """
+    return fetch_roster_page(supabase, sort_column="Username", cursor=cursor, page_size=page_size)
+
+
+def analyse(row: dict, field_index, fallback_fields: List[dict], model: str,
+            user_id: Optional[int] = None) -> dict:
+    holland, riasec = row["holland"], row["riasec"]
+    fields = fallback_fields
+    if field_index is not None:
+        try:
+            fields = shortlist_fields(field_index, holland, riasec)
+        except Exception:
+            pass
+    summary = row.get("summary") or brf_smry(holland, riasec, model=model)
+    recommendation = row.get("recommendation") or one_call_unified(holland, riasec, fields=fields, model=model)
+    return build_row(row["Username"], row["fingerprint"], summary=summary, recommendation=recommendation,
+                     user_id=user_id)
+
+
+def run(supabase, page_size: int, concurrency: int, checkpoint: Path,
+        model: str, limit: Optional[int] = None) -> dict:
+    state = load_checkpoint(checkpoint)
+    fallback_fields = (
+        supabase.table("ased_detail").select("detailed_field_code,description").execute().data or []
+    )
+    try:
+        field_index = build_field_index(fallback_fields)
+    except Exception as e:
+        print(f"Embedding index unavailable ({e}); using the full ASCED list", file=sys.stderr)
+        field_index = None
+
+    finished = False
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while limit is None or state["scanned"] < limit:
+            cursor = tuple(state["cursor"]) if state["cursor"] else None
+            page, next_cursor = fetch_page(supabase, cursor, page_size)
+            if not page:
+                finished = True
+                break
+
+            # 计算指纹并批量查询已有结果，只为缺失的行调用 LLM
+            rows = []
+            seen = set()
+            for raw in page:
+                holland, riasec = row_scores(raw)
+                if any(np.isnan(v) for v in list(holland.values()) + list(riasec.values())):
+                    state["failed"] += 1
+                    continue
+                fingerprint = score_fingerprint(holland, riasec)
+                # 重复导入或重复提交的相同得分只生成一次；同一次 upsert 中出现两次相同的
+                # (username, score_fingerprint) 会被 Postgres 拒绝
+                if (raw["Username"], fingerprint) in seen:
+                    continue
+                seen.add((raw["Username"], fingerprint))
+                rows.append({"Username": raw["Username"], "holland": holland, "riasec": riasec,
+                             "fingerprint": fingerprint})
+            stored = load_stored_analyses(supabase, [r["fingerprint"] for r in rows])
+            todo = []
+            for r in rows:
+                existing = stored.get((r["Username"], r["fingerprint"]))
+                if existing and existing.get("summary") and existing.get("recommendation"):
+                    continue
+                if existing:
+                    r["summary"] = existing.get("summary")
+                    r["recommendation"] = existing.get("recommendation")
+                todo.append(r)
+
+            # major_search 按 user_id 读取 career_planning
+            user_ids = lookup_user_ids(supabase, [r["Username"] for r in todo])
+            results = []
+            futures = {pool.submit(analyse, r, field_index, fallback_fields, model, user_ids.get(r["Username"])): r
+                       for r in todo}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    state["failed"] += 1
+                    print(f"Failed {futures[future]['Username']}: {e}", file=sys.stderr)
+
+            # 整页一次性写回
+            save_rows(supabase, results)
+            state["generated"] += len(results)
+            state["scanned"] += len(page)
+            state["cursor"] = [page[-1]["Username"], page[-1]["id"]]
+            save_checkpoint(checkpoint, state)
+            print(f"scanned={state['scanned']} generated={state['generated']} "
+                  f"failed={state['failed']} last={page[-1]['Username']}")
+            if next_cursor is None:
+                finished = True
+                break
+
+    # 只有完整扫描到末尾才算完成；因 --limit 停下时下次继续
+    state["done"] = finished
+    save_checkpoint(checkpoint, state)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--limit", type=int, default=None, help="stop after scanning this many rows")
+    parser.add_argument("--model", default="gpt-5-nano")
+    parser.add_argument("--llm-base-url", default=None,
+                        help="OpenAI-compatible endpoint, e.g. the local llm_stub.py")
+    args = parser.parse_args(argv)
+
+    if args.llm_base_url:
+        os.environ["OPENAI_BASE_URL"] = args.llm_base_url
+        os.environ["OPENAI_API_BASE"] = args.llm_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+    elif "OPENAI_API_KEY" not in os.environ:
+        os.environ["OPENAI_API_KEY"] = st.secrets["openai"]["api_key"]
+    if args.reset and args.checkpoint.exists():
+        args.checkpoint.unlink()
+
+    from supabase_client import get_supabase_client
+    state = run(get_supabase_client(), args.page_size, args.concurrency,
+                args.checkpoint, args.model, args.limit)
+    print(json.dumps(state, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 随 langchain-openai 安装，缺失时按字符估算
+    tiktoken = None
+
+# 变量部分可以是文本，也可以是按相关度排好序的列表（超预算时从尾部裁剪）
+Part = Union[str, List]
+
+_encodings: Dict[str, object] = {}
+
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # 编码表需要联网下载，离线时退回按字符估算
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """统计 token 数（无 tiktoken 时按 4 字符 ≈ 1 token 估算）"""
+    enc = _encoding(model)
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """把文本截断到 max_tokens 以内"""
+    if max_tokens <= 0:
+        return ""
+    enc = _encoding(model)
+    if enc is None:
+        return text if len(text) <= max_tokens * 4 else text[:max_tokens * 4] + "…"
+    tokens = enc.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens]) + "…"
+
+
+class PromptBudgetError(ValueError):
+    """静态前缀本身已经超出输入预算"""
+
+
+class CallSite:
+    """一个 LLM 调用点：字节稳定的静态前缀 + 末尾的变量后缀
+
+    静态前缀（system 消息）在进程内只构建一次且永不插值，
+    这样服务商的 prompt caching 才能命中；所有与用户相关的内容
+    都放在 user 消息里，并受 input_budget / output_budget 约束。
+    """
+
+    def __init__(self, name: str, system: str, suffix: str,
+                 model: str = "gpt-4o",
+                 input_budget: int = 8000,
+                 output_budget: Optional[int] = None):
+        self.name = name
+        self.system = system.strip() + "\n"
+        self.suffix = suffix
+        self.model = model
+        self.input_budget = input_budget
+        self.output_budget = output_budget
+        self.prefix_tokens = count_tokens(self.system, model)
+        self.version = hashlib.sha256(
+            (model + self.system + self.suffix).encode("utf-8")).hexdigest()[:12]
+        if self.prefix_tokens > input_budget:
+            raise PromptBudgetError(
+                f"{name}: static prefix is {self.prefix_tokens} tokens, budget is {input_budget}")
+
+    def llm_kwargs(self) -> dict:
+        """传给 ChatOpenAI 的输出预算参数"""
+        return {"max_tokens": self.output_budget} if self.output_budget else {}
+
+    def _render(self, parts: Dict[str, Part]) -> str:
+        values = {k: "\n".join(str(x) for x in v) if isinstance(v, list) else v
+                  for k, v in parts.items()}
+        return self.suffix.format(**values)
+
+    def compile(self, **parts: Part) -> List[Tuple[str, str]]:
+        """生成消息列表；超出输入预算时裁剪最长的变量部分"""
+        parts = {k: (list(v) if isinstance(v, (list, tuple)) else str(v)) for k, v in parts.items()}
+        available = self.input_budget - self.prefix_tokens
+        user = self._render(parts)
+        overflow = count_tokens(user, self.model) - available
+        while overflow > 0:
+            sizes = {k: count_tokens(self._render({**dict.fromkeys(parts, ""), k: v}), self.model)
+                     for k, v in parts.items()}
+            name = max(sizes, key=sizes.get)
+            value = parts[name]
+            if isinstance(value, list) and len(value) > 1:
+                # 列表按相关度排序，从尾部丢弃四分之一
+                parts[name] = value[:len(value) * 3 // 4]
+            else:
+                text = "\n".join(map(str, value)) if isinstance(value, list) else value
+                if not text:
+                    break
+                keep = count_tokens(text, self.model) - overflow - 1
+                parts[name] = truncate_tokens(text, keep, self.model) if keep > 0 else ""
+            user = self._render(parts)
+            overflow = count_tokens(user, self.model) - available
+        return [("system", self.system), ("user", user)]
+
+    def record(self, response) -> None:
+        """记录一次调用的缓存命中情况（读取 OpenAI usage 中的 cached tokens）"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        STATS.record(self.name, self.version, self.prefix_tokens,
+                     usage.get("input_tokens", 0), details.get("cache_read", 0) or 0)
+
+
+class PrefixCacheStats:
+    """按调用点统计服务商 prompt 前缀缓存命中率"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites: Dict[str, dict] = {}
+
+    def record(self, site: str, version: str, prefix_tokens: int,
+               input_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            s = self._sites.setdefault(site, {
+                "calls": 0, "cache_hits": 0, "input_tokens": 0,
+                "cached_tokens": 0, "prefix_tokens": prefix_tokens, "version": version,
+            })
+            s["calls"] += 1
+            s["cache_hits"] += 1 if cached_tokens > 0 else 0
+            s["input_tokens"] += input_tokens
+            s["cached_tokens"] += cached_tokens
+            s["version"] = version
+
+    def report(self) -> List[dict]:
+        with self._lock:
+            rows = []
+            for name, s in self._sites.items():
+                rows.append({
+                    "call_site": name,
+                    "version": s["version"],
+                    "calls": s["calls"],
+                    "prefix_tokens": s["prefix_tokens"],
+                    "hit_rate": s["cache_hits"] / s["calls"] if s["calls"] else 0.0,
+                    "cached_token_share": s["cached_tokens"] / s["input_tokens"] if s["input_tokens"] else 0.0,
+                })
+            return rows
+
+
+STATS = PrefixCacheStats()
+
+
+def cache_report() -> List[dict]:
+    return STATS.report()
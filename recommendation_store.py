@@ -0,0 +1,127 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from survey_analysis import ANALYSIS_VERSION
+
+TABLE = "career_planning"
+
+
+def score_fingerprint(holland: Dict[str, float],
+                      riasec: Dict[str, float],
+                      version: str = ANALYSIS_VERSION) -> str:
+    """得分向量 + prompt 版本的指纹；任一变化都需要重新调用 LLM"""
+    payload = json.dumps({
+        "h": {k: round(float(v), 4) for k, v in sorted(holland.items())},
+        "r": {k: round(float(v), 4) for k, v in sorted(riasec.items())},
+        "v": version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_stored_analysis(supabase, username: str, fingerprint: str) -> Optional[dict]:
+    """读取已存储的 summary / recommendation（没有则返回 None）"""
+    response = (
+        supabase.table(TABLE)
+        .select("summary,recommendation,plan_name,recommended_fields,updated_at")
+        .eq("username", username)
+        .eq("score_fingerprint", fingerprint)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def load_stored_analyses(supabase, fingerprints: List[str]) -> Dict[str, dict]:
+    """按指纹批量读取（批处理任务用），返回 {(username, fingerprint): row}"""
+    if not fingerprints:
+        return {}
+    response = (
+        supabase.table(TABLE)
+        .select("username,score_fingerprint,summary,recommendation")
+        .in_("score_fingerprint", fingerprints)
+        .execute()
+    )
+    return {(row["username"], row["score_fingerprint"]): row for row in response.data or []}
+
+
+def load_latest_analyses(supabase, usernames: List[str]) -> Dict[str, dict]:
+    """每个学生最近一次的分析结果，返回 {username: row}"""
+    if not usernames:
+        return {}
+    response = (
+        supabase.table(TABLE)
+        .select("username,plan_name,recommended_fields,updated_at")
+        .in_("username", usernames)
+        .order("updated_at", desc=True)
+        .execute()
+    )
+    latest: Dict[str, dict] = {}
+    for row in response.data or []:
+        latest.setdefault(row["username"], row)
+    return latest
+
+
+def _lookup_user_id(supabase, username: str) -> Optional[int]:
+    response = (
+        supabase.table("users")
+        .select("id")
+        .eq("username", username)
+        .execute()
+    )
+    return response.data[0]["id"] if response.data else None
+
+
+def lookup_user_ids(supabase, usernames: List[str]) -> Dict[str, int]:
+    """批量查询 users.id（批处理任务用），返回 {username: id}"""
+    if not usernames:
+        return {}
+    response = (
+        supabase.table("users")
+        .select("id,username")
+        .in_("username", sorted(set(usernames)))
+        .execute()
+    )
+    return {row["username"]: row["id"] for row in response.data or []}
+
+
+def build_row(username: str,
+              fingerprint: str,
+              summary: Optional[dict] = None,
+              recommendation: Optional[dict] = None,
+              user_id: Optional[int] = None) -> dict:
+    """组装 career_planning 行；只包含已有的字段，upsert 时不会覆盖另一半结果"""
+    row = {
+        "username": username,
+        "score_fingerprint": fingerprint,
+        "prompt_version": ANALYSIS_VERSION,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if user_id is not None:
+        row["user_id"] = user_id
+    if summary is not None:
+        row["summary"] = summary
+        row["plan_name"] = summary.get("dominant_type")
+    if recommendation is not None:
+        row["recommendation"] = recommendation
+        # major_search 读取 recommended_fields 生成专业推荐
+        row["recommended_fields"] = [
+            rec.get("field_name") for rec in recommendation.get("top_recommendations", [])
+            if rec.get("field_name")
+        ]
+    return row
+
+
+def save_analysis(supabase, username: str, fingerprint: str,
+                  summary: Optional[dict] = None,
+                  recommendation: Optional[dict] = None) -> None:
+    """按 (username, score_fingerprint) upsert 分析结果"""
+    row = build_row(username, fingerprint, summary, recommendation,
+                    user_id=_lookup_user_id(supabase, username))
+    save_rows(supabase, [row])
+
+
+def save_rows(supabase, rows: List[dict]) -> None:
+    if rows:
+        supabase.table(TABLE).upsert(rows, on_conflict="username,score_fingerprint").execute()
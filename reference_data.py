@@ -0,0 +1,92 @@
+"""各页面共用的参考数据：ANZSCO / ASCED 表、ASCED 向量索引和各国大学排名
+
+这些函数放在独立模块里（而不是页面脚本中），启动预热（warmup.py）和页面调用的是同一个
+缓存函数，预热填好的缓存页面可以直接命中。查询失败时抛出异常，由页面决定如何提示。
+
+有 bake 制品（artifact.py）时优先使用其中的快照：分类表和向量索引直接读制品，
+排名和大学概况在 prompt 版本一致且未过期时读制品，否则照常查询知识库。
+"""
+from typing import List, Optional
+
+import streamlit as st
+
+from artifact import get_artifact
+from asced_embeddings import build_field_index
+from supabase_client import get_supabase_client
+from university_kb import PROMPT_VERSION, RANKINGS_MAX_AGE, is_stale, load_country, seed_cache
+
+ASCED_TABLES = ("ased_broad", "ased_narrow", "ased_detail")
+
+
+def _baked_table(table: str) -> Optional[List[dict]]:
+    artifact = get_artifact()
+    return artifact.table(table) if artifact is not None else None
+
+
+def _baked_universities(name: str) -> Optional[dict]:
+    """制品中的排名 / 概况；prompt 版本变化后不再使用"""
+    artifact = get_artifact()
+    if artifact is None or not artifact.has(name) or artifact.manifest.get("prompt_version") != PROMPT_VERSION:
+        return None
+    return artifact.json(name)
+
+
+@st.cache_data
+def load_anzsco() -> List[dict]:
+    baked = _baked_table("anzsco")
+    if baked is not None:
+        return baked
+    return get_supabase_client().table("anzsco").select("*").execute().data
+
+
+@st.cache_data(ttl=3600)
+def load_ased_table(table: str) -> List[dict]:
+    """整张 ASCED 表（ased_broad / ased_narrow / ased_detail）"""
+    baked = _baked_table(table)
+    if baked is not None:
+        return baked
+    return get_supabase_client().table(table).select("*").execute().data
+
+
+@st.cache_data(ttl=3600)
+def load_asced_detail() -> List[dict]:
+    """ASCED 细分领域代码和描述（推荐 prompt 的候选领域列表）"""
+    baked = _baked_table("ased_detail")
+    if baked is not None:
+        return [{"detailed_field_code": r.get("detailed_field_code"), "description": r.get("description")}
+                for r in baked]
+    return (
+        get_supabase_client().table("ased_detail")
+        .select("detailed_field_code,description")
+        .execute()
+        .data
+    )
+
+
+@st.cache_resource
+def get_field_index():
+    """ASCED 细分领域向量索引（进程内共享，仅对变更行重新 embedding）"""
+    artifact = get_artifact()
+    return build_field_index(load_asced_detail(), baked_dir=artifact.path if artifact is not None else None)
+
+
+# 大学知识库：所有会话共用，读表只需几毫秒
+@st.cache_data(ttl=60)
+def load_country_universities(country: str) -> List[dict]:
+    baked = (_baked_universities("rankings.json.gz") or {}).get(country)
+    if baked and not any(is_stale(r.get("rankings_refreshed_at"), RANKINGS_MAX_AGE) for r in baked):
+        return baked
+    return load_country(get_supabase_client(), country)
+
+
+def seed_university_profiles() -> List[str]:
+    """把制品中的大学概况和课程放进知识库的进程缓存，返回这些大学的名称"""
+    profiles = _baked_universities("profiles.json.gz") or {}
+    seeded = []
+    for country, universities in profiles.items():
+        for university, stages in universities.items():
+            for stage, row in stages.items():
+                if row is not None:
+                    seed_cache(stage, country, university, row)
+            seeded.append(university)
+    return seeded
@@ -0,0 +1,217 @@
+"""批量生成学生报告（HTML，打包为 zip）
+
+用法：
+    python reports.py --emails a@school.cn b@school.cn --out class.zip
+    python reports.py --emails-file class_7a.txt --workers 8
+    python reports.py --school "Benenden Guangzhou"      # 需要设置 OIC_COHORT_GROUP_COLUMN
+
+得分一次批量查询，已存储的 summary / recommendation 按指纹一次批量读取；
+图表渲染和 HTML 生成在进程池中并行，主进程按完成顺序写入 zip。
+尚未分析的学生在报告中注明，可先运行 precompute.py 补齐。
+"""
+import argparse
+import html
+import io
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from charts import spider_chart_with_avg
+from cohort_stats import GROUP_COLUMN, CohortStats
+from survey_scores import IN_CHUNK, SCORE_SELECT, score_matrix, vector_to_dicts
+
+TABLE = "survey_processed"
+PLOTLY_JS = "plotly.min.js"
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: Arial, sans-serif; max-width: 1100px; margin: 2rem auto; color: #222; }}
+.charts {{ display: flex; flex-wrap: wrap; }}
+.charts > div {{ flex: 1 1 500px; }}
+.rec {{ border-top: 1px solid #ddd; padding: .5rem 0; }}
+.muted {{ color: #777; }}
+</style></head><body>
+{body}
+</body></html>
+"""
+
+
+def fetch_rows(supabase, emails: Optional[List[str]] = None, school: Optional[str] = None,
+               group_column: Optional[str] = GROUP_COLUMN, page_size: int = 1000) -> List[dict]:
+    """按邮箱列表（in_ 分批）或学校（keyset 分页）读取得分行"""
+    rows: List[dict] = []
+    if emails:
+        for i in range(0, len(emails), IN_CHUNK):
+            rows += (
+                supabase.table(TABLE)
+                .select("id," + SCORE_SELECT)
+                .in_("Username", emails[i:i + IN_CHUNK])
+                .execute()
+            ).data or []
+        return rows
+    if not group_column:
+        raise ValueError("Filtering by school needs OIC_COHORT_GROUP_COLUMN to be set")
+    last_id = None
+    while True:
+        query = (
+            supabase.table(TABLE)
+            .select("id," + SCORE_SELECT)
+            .eq(group_column, school)
+            .order("id")
+            .limit(page_size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.execute().data or []
+        if not page:
+            return rows
+        rows += page
+        last_id = page[-1]["id"]
+
+
+def latest_per_student(rows: List[dict]) -> List[dict]:
+    """同一学生有多次问卷时只保留最新的一次（id 最大），每个学生一份报告"""
+    latest = {}
+    for row in rows:
+        current = latest.get(row["Username"])
+        if current is None or row["id"] > current["id"]:
+            latest[row["Username"]] = row
+    return list(latest.values())
+
+
+def report_filename(username: str) -> str:
+    return re.sub(r"[^A-Za-z0-9@._-]", "_", username) + ".html"
+
+
+def render_report(job: dict) -> Tuple[str, str]:
+    """单个学生的 HTML 报告（在工作进程中运行）"""
+    fig_r = spider_chart_with_avg(job["riasec"], job["r_avg"], order="RIASEC",
+                                  title="RIASEC TYPE", percentiles=job["r_pct"])
+    fig_h = spider_chart_with_avg(job["holland"], job["h_avg"], order="HLAFPS",
+                                  title="HLAFPS TYPE", percentiles=job["h_pct"])
+    esc = html.escape
+    parts = [
+        f"<h1>{esc(job['username'])}</h1>",
+        '<div class="charts">',
+        fig_r.to_html(full_html=False, include_plotlyjs=False),
+        fig_h.to_html(full_html=False, include_plotlyjs=False),
+        "</div>",
+    ]
+    summary = job.get("summary")
+    if summary:
+        parts += [f"<h2>Dominant Type: {esc(summary.get('dominant_type', 'N/A'))}</h2>",
+                  f"<p>{esc(summary.get('summary', ''))}</p>"]
+    recommendation = job.get("recommendation")
+    if recommendation:
+        parts.append("<h2>Study Field Recommendations</h2>")
+        for idx, rec in enumerate(recommendation.get("top_recommendations", []), start=1):
+            parts.append(f'<div class="rec"><h3>{idx}. {esc(rec.get("field_name", "Unnamed Field"))}</h3>'
+                         f'<p><b>Why it fits:</b> {esc(rec.get("why_fit", ""))}</p>')
+            for label, key in [("Sample University Majors", "sample_university_majors"),
+                               ("Suggested High School Subjects", "suggested_high_school_subjects"),
+                               ("Possible Career Paths", "possible_career_paths"),
+                               ("Cautions", "cautions")]:
+                items = rec.get(key) or []
+                if items:
+                    parts.append(f"<p><b>{label}:</b> " + ", ".join(esc(str(x)) for x in items) + "</p>")
+            parts.append("</div>")
+    if not summary and not recommendation:
+        parts.append('<p class="muted">No stored analysis for these scores yet.</p>')
+    page = PAGE.format(title=esc(job["username"]), plotly_js=PLOTLY_JS, body="\n".join(parts))
+    return report_filename(job["username"]), page
+
+
+def build_jobs(supabase, rows: List[dict], stats: CohortStats) -> List[dict]:
+    # 只在主进程导入（会加载 LangChain）；工作进程导入本模块时保持轻量
+    from recommendation_store import load_stored_analyses, score_fingerprint
+
+    matrix = score_matrix(rows)
+    h_avg, r_avg = stats.averages()
+    jobs = []
+    for row, vector in zip(rows, matrix):
+        if np.isnan(vector).any():  # 得分无法解析
+            continue
+        holland, riasec = vector_to_dicts(vector)
+        h_pct, r_pct = stats.student_percentiles(holland, riasec)
+        jobs.append({"username": row["Username"], "holland": holland, "riasec": riasec,
+                     "h_avg": h_avg, "r_avg": r_avg, "h_pct": h_pct, "r_pct": r_pct,
+                     "fingerprint": score_fingerprint(holland, riasec)})
+    try:
+        stored = load_stored_analyses(supabase, [j["fingerprint"] for j in jobs])
+    except Exception:
+        stored = {}
+    for job in jobs:
+        row = stored.get((job["username"], job["fingerprint"]), {})
+        job["summary"], job["recommendation"] = row.get("summary"), row.get("recommendation")
+    return jobs
+
+
+def build_report_bundle(supabase, emails: Optional[List[str]] = None, school: Optional[str] = None,
+                        stats: Optional[CohortStats] = None, workers: Optional[int] = None,
+                        on_progress: Optional[Callable[[int, int], None]] = None) -> Tuple[bytes, int]:
+    """生成 zip（字节）并返回 (zip, 报告数)；on_progress(done, total) 每完成一份调用一次"""
+    if stats is None:
+        stats = CohortStats()
+        stats.refresh(supabase, force=True)
+    rows = latest_per_student(fetch_rows(supabase, emails=emails, school=school))
+    jobs = build_jobs(supabase, rows, stats)
+
+    import plotly.offline
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as bundle:
+        # plotly.js 只打包一份，所有报告离线共用
+        bundle.writestr(PLOTLY_JS, plotly.offline.get_plotlyjs())
+        names = []
+        # spawn：Streamlit 服务进程是多线程的，fork 可能死锁
+        ctx = multiprocessing.get_context("spawn")
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(render_report, job) for job in jobs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                name, page = future.result()
+                bundle.writestr(name, page)
+                names.append(name)
+                if on_progress:
+                    on_progress(done, len(jobs))
+        index = "".join(f'<li><a href="{html.escape(n)}">{html.escape(n[:-5])}</a></li>' for n in sorted(names))
+        bundle.writestr("index.html", PAGE.format(title="Reports", plotly_js=PLOTLY_JS,
+                                                  body=f"<h1>Reports</h1><ul>{index}</ul>"))
+    return buffer.getvalue(), len(jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", nargs="*", default=None)
+    parser.add_argument("--emails-file", type=Path, default=None, help="one email per line")
+    parser.add_argument("--school", default=None, help=f"value of the {GROUP_COLUMN or 'group'} column")
+    parser.add_argument("--out", type=Path, default=Path("reports.zip"))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    emails = list(args.emails or [])
+    if args.emails_file:
+        emails += [line.strip() for line in args.emails_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not emails and not args.school:
+        parser.error("pass --emails, --emails-file or --school")
+
+    def progress(done, total):
+        print(f"\rrendered {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    from supabase_client import get_supabase_client
+    data, count = build_report_bundle(get_supabase_client(), emails=emails or None, school=args.school,
+                                      workers=args.workers, on_progress=progress)
+    args.out.write_bytes(data)
+    print(f"\nWrote {count} report(s) to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
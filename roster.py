@@ -0,0 +1,102 @@
+import streamlit as st
+import pandas as pd
+from supabase_client import get_supabase_client
+from auth import require_login
+from cohort_stats import GROUP_COLUMN
+from recommendation_store import load_latest_analyses
+from roster_query import SORTABLE_COLUMNS, estimate_roster_size, fetch_roster_page
+from survey_scores import SCORE_COLUMNS, score_matrix
+
+# 获取 Supabase 客户端
+supabase = get_supabase_client()
+
+# 名单包含所有学生的邮箱和得分，必须登录
+require_login("the Student Roster")
+
+# 页面标题
+st.title("Student Roster")
+st.markdown("Browse surveyed students, sort by any trait and open a student's survey")
+
+COLUMN_LABELS = {"Username": "Email", **{c: c.split("_")[1].upper() + (" (HLAFPS)" if c.startswith("hlafps") else " (RIASEC)")
+                                       for c in SCORE_COLUMNS}}
+
+
+@st.cache_data(ttl=600)
+def roster_size():
+    try:
+        return estimate_roster_size(supabase)
+    except Exception:
+        return None
+
+
+# 排序与筛选（都在数据库端完成）
+col1, col2, col3, col4 = st.columns([2, 1, 2, 1])
+with col1:
+    sort_column = st.selectbox("Sort by", SORTABLE_COLUMNS, format_func=COLUMN_LABELS.get)
+with col2:
+    descending = st.toggle("Descending", value=sort_column != "Username")
+with col3:
+    search = st.text_input("Search email", placeholder="e.g. 2024@benenden")
+with col4:
+    page_size = st.selectbox("Rows per page", [25, 50, 100], index=1)
+
+min_scores = {}
+with st.expander("Trait filters"):
+    filter_cols = st.columns(6)
+    for i, column in enumerate(SCORE_COLUMNS):
+        with filter_cols[i % 6]:
+            minimum = st.number_input(f"Min {COLUMN_LABELS[column]}", min_value=0.0, value=0.0,
+                                      step=1.0, key=f"min_{column}")
+            if minimum > 0:
+                min_scores[column] = minimum
+    group = st.text_input(GROUP_COLUMN) if GROUP_COLUMN else None
+
+# 排序 / 筛选条件变化时回到第一页
+query_key = (sort_column, descending, search, page_size, tuple(sorted(min_scores.items())), group)
+if st.session_state.get("roster_query_key") != query_key:
+    st.session_state.roster_query_key = query_key
+    # 每一页起始游标的栈，第一页为 None
+    st.session_state.roster_cursors = [None]
+
+cursors = st.session_state.roster_cursors
+try:
+    rows, next_cursor = fetch_roster_page(
+        supabase, sort_column=sort_column, descending=descending, cursor=cursors[-1],
+        page_size=page_size, search=search.strip(), min_scores=min_scores,
+        group_column=GROUP_COLUMN, group=group or None)
+except Exception as e:
+    st.error(f"Error querying Supabase: {e}")
+    rows, next_cursor = [], None
+
+# 本页学生的 dominant type 一次批量读取
+try:
+    latest = load_latest_analyses(supabase, [r["Username"] for r in rows])
+except Exception:
+    latest = {}
+
+df = pd.DataFrame(score_matrix(rows).round(2), columns=[COLUMN_LABELS[c] for c in SCORE_COLUMNS])
+df.insert(0, "Email", [r["Username"] for r in rows])
+df.insert(1, "Dominant Type", [latest.get(r["Username"], {}).get("plan_name") or "" for r in rows])
+
+total = roster_size()
+st.caption(f"Page {len(cursors)}" + (f" · ≈{total:,} students" if total else ""))
+
+selection = st.dataframe(df, hide_index=True, use_container_width=True,
+                         on_select="rerun", selection_mode="single-row", key="roster_table")
+
+nav1, nav2, nav3 = st.columns([1, 1, 4])
+with nav1:
+    if st.button("◀ Previous", disabled=len(cursors) == 1, use_container_width=True):
+        cursors.pop()
+        st.rerun()
+with nav2:
+    if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+        cursors.append(next_cursor)
+        st.rerun()
+
+selected = selection.selection.rows if selection else []
+with nav3:
+    if selected and st.button(f"Open survey for {df.iloc[selected[0]]['Email']}", type="primary"):
+        # person.py 的邮箱输入框读取该值作为默认值
+        st.session_state.roster_selected_email = df.iloc[selected[0]]["Email"]
+        st.switch_page("./person.py")
@@ -0,0 +1,69 @@
+"""survey_processed 名单的 keyset（游标）分页查询
+
+按 (排序列, id) 复合游标翻页：每页只取 limit 行，不用 offset，
+配合 (列, id) 索引，无论翻到第几页代价都相同。
+"""
+from typing import Dict, List, Optional, Tuple
+
+from survey_scores import SCORE_COLUMNS, SCORE_SELECT
+
+TABLE = "survey_processed"
+SORTABLE_COLUMNS = ["Username"] + SCORE_COLUMNS
+
+
+def _quote(value) -> str:
+    """PostgREST or= 过滤中的值加双引号，邮箱里的 . , ( ) 不会被误解析"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def fetch_roster_page(supabase,
+                      sort_column: str = "Username",
+                      descending: bool = False,
+                      cursor: Optional[Tuple] = None,
+                      page_size: int = 50,
+                      search: str = "",
+                      min_scores: Optional[Dict[str, float]] = None,
+                      group_column: Optional[str] = None,
+                      group: Optional[str] = None) -> Tuple[List[dict], Optional[Tuple]]:
+    """返回 (本页行, 下一页游标)；游标为 (排序列的值, id)，没有下一页时为 None"""
+    if sort_column not in SORTABLE_COLUMNS:
+        raise ValueError(f"Cannot sort by {sort_column}")
+    columns = "id," + SCORE_SELECT + (f",{group_column}" if group_column else "")
+    query = supabase.table(TABLE).select(columns)
+
+    if search:
+        query = query.ilike("Username", f"%{search}%")
+    for column, minimum in (min_scores or {}).items():
+        query = query.gte(column, minimum)
+    if group_column and group:
+        query = query.eq(group_column, group)
+    if sort_column != "Username":
+        # 数值列尚未回填的旧行不参与按特质排序
+        query = query.not_.is_(sort_column, "null")
+
+    if cursor is not None:
+        value, last_id = cursor
+        op = "lt" if descending else "gt"
+        query = query.or_(
+            f"{sort_column}.{op}.{_quote(value)},"
+            f"and({sort_column}.eq.{_quote(value)},id.{op}.{last_id})"
+        )
+
+    rows = (
+        query.order(sort_column, desc=descending)
+        .order("id", desc=descending)
+        .limit(page_size + 1)
+        .execute()
+    ).data or []
+    # 多取一行判断是否还有下一页
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = (rows[-1][sort_column], rows[-1]["id"]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def estimate_roster_size(supabase) -> Optional[int]:
+    """表行数的估计值（planner 统计，不做全表 count）"""
+    response = supabase.table(TABLE).select("id", count="estimated").limit(1).execute()
+    return response.count
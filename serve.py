@@ -0,0 +1,35 @@
+"""ASGI 入口：启动时在后台预热共享缓存，并提供负载均衡器轮询的就绪检查
+
+用法：
+    uvicorn serve:app --host 0.0.0.0 --port 8501
+    python serve.py
+
+存活检查沿用 Streamlit 自带的 /_stcore/health；就绪检查为 /api/ready，
+预热结束前返回 503，结束后返回 200，响应体中是各项预热任务的状态（见 warmup.py）。
+用 `streamlit run app.py` 部署时没有 /api/ready，预热在第一个会话打开时开始。
+"""
+from contextlib import asynccontextmanager
+
+import streamlit as st
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from warmup import start_warmup, warmup_status
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # 预热在后台线程中进行，服务照常启动，存活检查不受影响
+    start_warmup()
+    yield
+
+
+async def ready(request):
+    status = warmup_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+app = st.App("app.py", lifespan=lifespan, routes=[Route("/api/ready", ready)])
+
+if __name__ == "__main__":
+    app.run()
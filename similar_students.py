@@ -0,0 +1,150 @@
+"""“和你相似的学生”：12 维 HLAFPS+RIASEC 得分向量的最近邻检索
+
+得分先按建索引时的全体均值 / 标准差标准化，再做 L2 归一化，
+内积即余弦相似度。默认 float32 矩阵暴力 top-k；装了 scipy 且行数较多时
+对已建树部分用 KD 树（归一化后欧氏距离与余弦单调对应），新插入的行暴力补查。
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from survey_scores import HLAFPS_KEYS, RIASEC_KEYS, SCORE_COLUMNS, SCORE_SELECT, score_matrix
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # 可选依赖
+    cKDTree = None
+
+TABLE = "survey_processed"
+# 超过该行数且可用 scipy 时才建 KD 树；12 维下更小的表暴力检索更快
+KD_TREE_MIN_ROWS = 200_000
+
+
+class StudentIndex:
+    def __init__(self, capacity: int = 1024, refresh_interval: float = 60):
+        dim = len(SCORE_COLUMNS)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._usernames: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._center = np.zeros(dim, dtype=np.float32)
+        self._scale = np.ones(dim, dtype=np.float32)
+        self._tree = None
+        self._tree_rows = 0
+        self._last_id = None
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._usernames)
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        z = (np.asarray(matrix, dtype=np.float32) - self._center) / self._scale
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        return z / np.maximum(norms, 1e-6)
+
+    def add(self, usernames: List[str], matrix: np.ndarray) -> None:
+        """增量插入；同一学生再次出现时覆盖旧向量"""
+        if not len(usernames):
+            return
+        vectors = self._normalize(matrix)
+        with self._lock:
+            for name, vec in zip(usernames, vectors):
+                pos = self._positions.get(name)
+                if pos is None:
+                    pos = len(self._usernames)
+                    if pos == len(self._vectors):
+                        grown = np.zeros((2 * len(self._vectors), self._vectors.shape[1]), dtype=np.float32)
+                        grown[:pos] = self._vectors
+                        self._vectors = grown
+                    self._usernames.append(name)
+                    self._positions[name] = pos
+                elif pos < self._tree_rows:
+                    # 已在 KD 树中的行被修改，下次查询前重建
+                    self._tree = None
+                    self._tree_rows = 0
+                self._vectors[pos] = vec
+            self._maybe_build_tree()
+
+    def _maybe_build_tree(self):
+        n = len(self._usernames)
+        if cKDTree is None or n < KD_TREE_MIN_ROWS:
+            return
+        # 未入树的新行超过 10% 时重建
+        if self._tree is None or n - self._tree_rows > 0.1 * self._tree_rows:
+            self._tree = cKDTree(self._vectors[:n])
+            self._tree_rows = n
+
+    def refresh(self, supabase, page_size: int = 1000, force: bool = False) -> int:
+        """按 id 增量读取 survey_processed 的新行；首次读取时确定标准化参数"""
+        now = time.time()
+        if not force and now - self._refreshed_at < self.refresh_interval:
+            return 0
+        with self._lock:
+            added = self._read_new_rows(supabase, page_size)
+            self._refreshed_at = now
+            return added
+
+    def _read_new_rows(self, supabase, page_size: int) -> int:
+        added = 0
+        first = self._last_id is None
+        # 游标只在行真正加入索引后才提交：首次读取中途失败时下次从头再读，不会跳过已读的页
+        last_id = self._last_id
+        pending_names, pending = [], []
+        while True:
+            query = supabase.table(TABLE).select("id," + SCORE_SELECT).order("id").limit(page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            page = query.execute().data or []
+            if not page:
+                break
+            last_id = page[-1]["id"]
+            matrix = score_matrix(page)
+            valid = ~np.isnan(matrix).any(axis=1)
+            names = [r["Username"] for r, ok in zip(page, valid) if ok]
+            if first:
+                pending_names += names
+                pending.append(matrix[valid])
+            else:
+                self.add(names, matrix[valid])
+                self._last_id = last_id
+            added += len(names)
+        if first and pending_names:
+            full = np.vstack(pending)
+            self._center = full.mean(axis=0).astype(np.float32)
+            self._scale = np.maximum(full.std(axis=0), 1e-3).astype(np.float32)
+            self.add(pending_names, full)
+        if first:
+            self._last_id = last_id
+        return added
+
+    def top_k(self, holland: Dict[str, float], riasec: Dict[str, float],
+              k: int = 10, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """返回 [(Username, 余弦相似度)]，按相似度降序"""
+        query = [holland[key] for key in HLAFPS_KEYS] + [riasec[key] for key in RIASEC_KEYS]
+        q = self._normalize(np.array([query]))[0]
+        n = len(self._usernames)
+        if not n:
+            return []
+        want = min(k + 1, n)  # 多取一个，留给被排除的本人
+
+        if self._tree is not None:
+            _, tree_idx = self._tree.query(q, k=min(want, self._tree_rows))
+            tail = np.arange(self._tree_rows, n)
+            candidates = np.concatenate([np.atleast_1d(tree_idx), tail])
+        else:
+            candidates = np.arange(n)
+        sims = self._vectors[candidates] @ q
+        if len(sims) > want:
+            part = np.argpartition(-sims, want - 1)[:want]
+            candidates, sims = candidates[part], sims[part]
+        order = np.argsort(-sims)
+
+        results = []
+        for i in order:
+            name = self._usernames[candidates[i]]
+            if name != exclude:
+                results.append((name, float(sims[i])))
+        return results[:k]
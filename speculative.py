@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+from asced_embeddings import FieldIndex, shortlist_fields
+from survey_analysis import AnalysisCancelled, brf_smry_streaming, one_call_unified
+
+SESSION_KEY = "speculative_analysis"
+
+
+@st.cache_resource
+def get_analysis_pool() -> ThreadPoolExecutor:
+    """进程内共享的分析线程池（所有会话共用，限制并发的 LLM 调用数）"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-analysis")
+
+
+class SpeculativeAnalysis:
+    """查询到问卷结果后立即并行启动 summary 和 recommendation 两个分析
+
+    工作线程里不能调用任何 st.* 接口，结果通过 Future 交回页面。
+    """
+
+    def __init__(self, email: str,
+                 holland: Dict[str, float],
+                 riasec: Dict[str, float],
+                 field_index: Optional[FieldIndex],
+                 fallback_fields: List[dict],
+                 model: str = "gpt-5-nano",
+                 need_summary: bool = True,
+                 need_recommendation: bool = True):
+        self.email = email
+        self.cancel_event = threading.Event()
+        # summary 流式生成中已得到的部分，页面轮询显示
+        self.summary_partial: Dict[str, str] = {}
+        pool = get_analysis_pool()
+        # 已有存储结果的部分不再提交（对应 Future 为 None）
+        self.summary = pool.submit(
+            brf_smry_streaming, holland, riasec, model, None, self.cancel_event,
+            self._on_summary_update) if need_summary else None
+        self.recommendation = pool.submit(
+            self._recommend, holland, riasec, field_index, fallback_fields, model) if need_recommendation else None
+
+    def _on_summary_update(self, values: Dict[str, str]) -> None:
+        self.summary_partial = values
+
+    def _recommend(self, holland, riasec, field_index, fallback_fields, model):
+        fields = fallback_fields
+        if field_index is not None:
+            try:
+                fields = shortlist_fields(field_index, holland, riasec)
+            except Exception:
+                pass
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled()
+        return one_call_unified(holland, riasec, fields=fields, model=model)
+
+    def cancel(self) -> None:
+        # 未开始的任务直接取消；进行中的流式调用会在下一个 chunk 时退出
+        self.cancel_event.set()
+        for future in (self.summary, self.recommendation):
+            if future is not None:
+                future.cancel()
+
+
+def start_speculative_analysis(email: str, *args, **kwargs) -> SpeculativeAnalysis:
+    """为 email 启动推测分析，并取消当前会话中其他邮箱的任务"""
+    cancel_speculative_analysis()
+    run = SpeculativeAnalysis(email, *args, **kwargs)
+    st.session_state[SESSION_KEY] = run
+    return run
+
+
+def get_speculative_analysis(email: str) -> Optional[SpeculativeAnalysis]:
+    run = st.session_state.get(SESSION_KEY)
+    if run is not None and run.email == email and not run.cancel_event.is_set():
+        return run
+    return None
+
+
+def cancel_speculative_analysis(keep_email: Optional[str] = None) -> None:
+    """取消当前会话的推测分析（keep_email 与任务邮箱一致时保留）"""
+    run = st.session_state.get(SESSION_KEY)
+    if run is None or (keep_email is not None and run.email == keep_email):
+        return
+    run.cancel()
+    del st.session_state[SESSION_KEY]
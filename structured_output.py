@@ -0,0 +1,107 @@
+"""结构化输出：按 Pydantic 模型生成严格的 JSON Schema，由服务商约束模型输出
+
+服务商保证输出符合 schema，本地仍用同一个模型校验：不合格时先做轻量修复
+（去掉 ```json 围栏和前后多余文字、删除多余的逗号、裸数组补上外层对象），
+修复不了或业务校验（如 ASCED 代码）不通过时，把上一次的回复和具体错误发回模型重试一次。
+模型里的字段要么必填，要么可为 null 且默认 None，这样才能生成 strict schema。
+"""
+import json
+import re
+from typing import Callable, Optional, Type, TypeVar, get_args, get_origin
+
+from openai import pydantic_function_tool
+from pydantic import BaseModel
+
+MAX_RETRIES = 1
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def response_format(schema: Type[BaseModel]) -> dict:
+    """传给 ChatOpenAI 的 response_format（strict JSON Schema）
+
+    用 dict 而不是直接传模型类：模型类会让 openai 客户端在本地解析，
+    格式不对时直接抛异常，拿不到原始回复，也就无法修复或重试。
+    """
+    function = pydantic_function_tool(schema)["function"]
+    return {"type": "json_schema",
+            "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True}}
+
+
+def list_field(schema: Type[BaseModel]) -> str:
+    """模型中唯一的列表字段名（如 QSUniversityList.universities）"""
+    names = [name for name, field in schema.model_fields.items()
+             if get_origin(field.annotation) is list]
+    if len(names) != 1:
+        raise TypeError(f"{schema.__name__} must have exactly one list field")
+    return names[0]
+
+
+def item_model(schema: Type[BaseModel]) -> Type[BaseModel]:
+    return get_args(schema.model_fields[list_field(schema)].annotation)[0]
+
+
+def repair_json(text: str):
+    """轻量修复后解析：去掉围栏和首尾多余文字、删除多余逗号（失败时抛出 ValueError）"""
+    text = _FENCE.sub("", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("Model did not return valid JSON.\n" + text[:200])
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]") + 1
+    return json.loads(_TRAILING_COMMA.sub(r"\1", text[start:end]))
+
+
+def parse_structured(text: str, schema: Type[Model]) -> Model:
+    """按模型校验回复；不合格时修复一次再校验，仍失败则抛出 ValueError"""
+    try:
+        return schema.model_validate_json(text)
+    except ValueError:
+        data = repair_json(text)
+    if isinstance(data, list):
+        data = {list_field(schema): data}
+    return schema.model_validate(data)
+
+
+def retry_messages(messages, reply: str, problem: str) -> list:
+    # 静态前缀不变，只在末尾追加上次的回复和错误，prompt 缓存照样命中
+    return list(messages) + [
+        ("assistant", reply or "(empty reply)"),
+        ("user", f"Your reply was rejected: {problem[:1000]}\n"
+                 "Return the corrected JSON only, matching the schema."),
+    ]
+
+
+def invoke_structured(llm, messages, schema: Type[Model], site=None,
+                      check: Optional[Callable[[Model], Optional[str]]] = None,
+                      retries: int = MAX_RETRIES) -> Model:
+    """调用 LLM 并返回校验后的模型实例
+
+    check(result) 返回错误说明时视为不合格，带着错误重试（默认一次）；
+    重试后仍不通过业务校验时照常返回结果，由调用方修正。解析失败则抛出 ValueError。
+    """
+    bound = llm.bind(response_format=response_format(schema))
+    for attempt in range(retries + 1):
+        response = bound.invoke(messages)
+        if site is not None:
+            site.record(response)
+        text = response.content if isinstance(response.content, str) else ""
+        refusal = response.additional_kwargs.get("refusal")
+        if refusal:
+            raise ValueError(f"Model refused the request: {refusal}")
+        try:
+            result = parse_structured(text, schema)
+        except ValueError as e:
+            result, problem = None, str(e)
+        else:
+            problem = check(result) if check is not None else None
+            if not problem:
+                return result
+        if attempt < retries:
+            messages = retry_messages(messages, text, problem)
+    if result is None:
+        raise ValueError(f"Model did not return valid {schema.__name__} JSON: {problem}")
+    return result
@@ -0,0 +1,19 @@
+-- 持久化 Personal Survey 的分析结果，按 (username, score_fingerprint) 复用
+create table if not exists career_planning (
+    id bigint generated by default as identity primary key,
+    user_id bigint,
+    plan_name text,
+    recommended_fields jsonb,
+    created_at timestamptz not null default now()
+);
+
+alter table career_planning
+    add column if not exists username text,
+    add column if not exists score_fingerprint text,
+    add column if not exists prompt_version text,
+    add column if not exists summary jsonb,
+    add column if not exists recommendation jsonb,
+    add column if not exists updated_at timestamptz not null default now();
+
+create unique index if not exists career_planning_username_fingerprint_key
+    on career_planning (username, score_fingerprint);
@@ -0,0 +1,18 @@
+-- survey_processed：把 "H:31,L:22,..." 字符串拆成 12 个数值列，支持 SQL 端筛选和聚合
+alter table survey_processed
+    add column if not exists hlafps_h real,
+    add column if not exists hlafps_l real,
+    add column if not exists hlafps_a real,
+    add column if not exists hlafps_f real,
+    add column if not exists hlafps_p real,
+    add column if not exists hlafps_s real,
+    add column if not exists riasec_r real,
+    add column if not exists riasec_i real,
+    add column if not exists riasec_a real,
+    add column if not exists riasec_s real,
+    add column if not exists riasec_e real,
+    add column if not exists riasec_c real;
+
+-- 旧字符串行的回填由 import_scores.py 分批完成；这里只为待回填的行建部分索引
+create index if not exists survey_processed_scores_pending_idx
+    on survey_processed (id) where hlafps_h is null;
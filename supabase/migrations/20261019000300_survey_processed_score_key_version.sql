@@ -0,0 +1,3 @@
+-- survey_processed：记录得分由哪个版本的计分键算出（survey_scoring.py 写入；旧行为 null）
+alter table survey_processed
+    add column if not exists score_key_version text;
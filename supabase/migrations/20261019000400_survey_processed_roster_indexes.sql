@@ -0,0 +1,14 @@
+-- 名单页按 (排序列, id) 做 keyset 分页，每个可排序列一个复合索引
+create index if not exists survey_processed_username_id_idx on survey_processed ("Username", id);
+create index if not exists survey_processed_hlafps_h_id_idx on survey_processed (hlafps_h, id);
+create index if not exists survey_processed_hlafps_l_id_idx on survey_processed (hlafps_l, id);
+create index if not exists survey_processed_hlafps_a_id_idx on survey_processed (hlafps_a, id);
+create index if not exists survey_processed_hlafps_f_id_idx on survey_processed (hlafps_f, id);
+create index if not exists survey_processed_hlafps_p_id_idx on survey_processed (hlafps_p, id);
+create index if not exists survey_processed_hlafps_s_id_idx on survey_processed (hlafps_s, id);
+create index if not exists survey_processed_riasec_r_id_idx on survey_processed (riasec_r, id);
+create index if not exists survey_processed_riasec_i_id_idx on survey_processed (riasec_i, id);
+create index if not exists survey_processed_riasec_a_id_idx on survey_processed (riasec_a, id);
+create index if not exists survey_processed_riasec_s_id_idx on survey_processed (riasec_s, id);
+create index if not exists survey_processed_riasec_e_id_idx on survey_processed (riasec_e, id);
+create index if not exists survey_processed_riasec_c_id_idx on survey_processed (riasec_c, id);
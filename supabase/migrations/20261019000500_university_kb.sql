@@ -0,0 +1,18 @@
+-- 大学知识库：排名和详情由 university_kb.py 批量 / 后台刷新，所有会话共用
+create table if not exists university_kb (
+    country               text not null,
+    university_name       text not null,
+    rank                  integer,
+    location              text,
+    qs_score              real,
+    overview              text,
+    strengths             jsonb,
+    popular_courses       jsonb,
+    prompt_version        text,
+    -- 排名与详情分别记录刷新时间，过期后才重新调用 LLM
+    rankings_refreshed_at timestamptz,
+    details_refreshed_at  timestamptz,
+    primary key (country, university_name)
+);
+
+create index if not exists university_kb_country_rank_idx on university_kb (country, rank);
@@ -0,0 +1,6 @@
+-- 大学详情拆成两阶段：课程单独生成，单独记录刷新时间
+alter table university_kb add column if not exists courses_refreshed_at timestamptz;
+
+update university_kb
+set courses_refreshed_at = details_refreshed_at
+where popular_courses is not null and courses_refreshed_at is null;
@@ -0,0 +1,8 @@
+-- survey_processed 的自然键：(Username, 作答内容哈希)
+-- import_scores.py / survey_scoring.py 按这个键 upsert，重复导入同一份作答更新原行而不是插入重复行；
+-- 同一学生的新问卷作答不同，仍作为新行保留历史。旧行的 response_hash 为 null，不受唯一约束影响。
+alter table survey_processed
+    add column if not exists response_hash text;
+
+create unique index if not exists survey_processed_username_response_hash_key
+    on survey_processed ("Username", response_hash);
@@ -0,0 +1,308 @@
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+from json_stream import JsonFieldExtractor, stream_json_array
+from prompt_compiler import CallSite
+from structured_output import invoke_structured, parse_structured, response_format, retry_messages
+
+class AnalysisCancelled(Exception):
+    """推测执行的分析已被取消（用户切换了查询邮箱）"""
+
+
+SYSTEM_PROMPT = """
+You are a senior academic pathways adviser.
+
+Please analyze the student's profile based on two psychological score models:
+
+1) HLAFPS – value-based motivations:
+   • H: Hedonism (enjoyment, pleasure)
+   • L: Learning & Achievement (curiosity, mastery)
+   • A: Altruism (helping, contributing)
+   • F: Finance (financial success, stability)
+   • P: Power & Status (leadership, recognition)
+   • S: Security (stability, predictability)
+
+2) RIASEC – interest and working style:
+   • R: Realistic (hands-on, technical, practical)
+   • I: Investigative (analytical, research-oriented)
+   • A: Artistic (creative, expressive)
+   • S: Social (helping, teaching, people-centered)
+   • E: Enterprising (leadership, business, persuasion)
+   • C: Conventional (structure, data, organization)
+
+-------------------
+TASKS:
+-------------------
+1. Interpret both models **holistically**:
+   - Do NOT convert HLAFPS into RIASEC or vice versa.
+   - RIASEC → what types of activities the student enjoys or excels in.
+   - HLAFPS → what the student finds meaningful and rewarding.
+   - Use both to understand interest + motivation.
+
+2. Identify the top 2 highest-scoring letters from each model.
+   - Format as: dominant_type = "RIASEC1-RIASEC2 + HLAFPS1-HLAFPS2"
+   - Example: "Investigative-Social + Learning-Altruism"
+
+3. Write a **2–3 sentence human-centered summary** that combines both:
+   - Tone: supportive, age-appropriate, future-focused.
+   - Show how their interests (RIASEC) and motivations (HLAFPS) complement each other.
+
+-------------------
+INPUT FORMAT:
+HLAFPS scores (0–100): { "H": , "L": , "A": , "F": , "P": , "S": }
+RIASEC scores (0–100): { "R": , "I": , "A": , "S": , "E": , "C": }
+
+-------------------
+OUTPUT FORMAT (no extra commentary):
+{
+  "dominant_type": "RIASEC1-RIASEC2 + HLAFPS1-HLAFPS2",
+  "summary": "2–3 sentence synthesis combining both models."
+}
+"""
+
+# 静态前缀（system）不含任何用户数据，用户得分只出现在末尾的 user 消息中
+SUMMARY_SITE = CallSite(
+    "personal_summary",
+    system=SYSTEM_PROMPT,
+    suffix="""
+HLAFPS scores (H/L/A/F/P/S): {holland}
+RIASEC scores (R/I/A/S/E/C): {riasec}
+Return strict JSON matching the schema.
+""",
+    model="gpt-5-nano",
+    input_budget=2000,
+    output_budget=4000,
+)
+
+class PersonalSummary(BaseModel):
+    dominant_type: str = Field(..., description="RIASEC1-RIASEC2 + HLAFPS1-HLAFPS2")
+    summary: str = Field(..., description="2-3 sentence synthesis combining both models")
+
+
+def brf_smry_streaming(holland: Dict[str, float],
+                       riasec: Dict[str, float],
+                       model: str = "gpt-5-nano",
+                       placeholder=None,
+                       cancel_event: Optional[threading.Event] = None,
+                       on_update: Optional[Callable[[Dict[str, str]], None]] = None):
+    """流式生成 dominant type 分析；cancel_event 被置位时中止流式读取
+
+    每收到新的字段内容时调用 on_update({"dominant_type": ..., "summary": ...})（目前已生成的部分），
+    或直接写入 placeholder（仅限页面主线程）。
+    """
+    llm = ChatOpenAI(model_name=model, temperature=0.000001, streaming=True,
+                     stream_usage=True, **SUMMARY_SITE.llm_kwargs())
+    messages = SUMMARY_SITE.compile(holland=holland, riasec=riasec)
+    
+    full_text = ""
+    usage = None
+    extractor = JsonFieldExtractor(["dominant_type", "summary"])
+    
+    # 流式调用（服务商按 PersonalSummary 的 schema 约束输出）
+    for chunk in llm.bind(response_format=response_format(PersonalSummary)).stream(messages):
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelled()
+        if chunk.usage_metadata:
+            usage = chunk
+        if hasattr(chunk, 'content') and chunk.content:
+            full_text += chunk.content
+            # JSON 还没闭合时就把 summary 已生成的部分交给页面
+            if extractor.feed(chunk.content):
+                if on_update is not None:
+                    on_update(dict(extractor.values))
+                if placeholder is not None:
+                    placeholder.markdown(extractor.values.get("summary", "") + "▌")
+    if usage is not None:
+        SUMMARY_SITE.record(usage)
+
+    try:
+        return parse_structured(full_text, PersonalSummary).model_dump()
+    except ValueError as e:
+        # 修复不了时带着错误重试一次
+        return invoke_structured(llm, retry_messages(messages, full_text, str(e)), PersonalSummary,
+                                 SUMMARY_SITE, retries=0).model_dump()
+
+def brf_smry (holland: Dict[str, float],
+                     riasec: Dict[str, float],
+                     model: str = "gpt-5-nano") -> dict:
+    """非流式版本（用于缓存）"""
+    llm = ChatOpenAI(model_name=model, temperature=0.000001, **SUMMARY_SITE.llm_kwargs())
+    return invoke_structured(llm, SUMMARY_SITE.compile(holland=holland, riasec=riasec),
+                             PersonalSummary, SUMMARY_SITE).model_dump()
+
+
+# ---------------------------
+# Single-call LLM function
+# ---------------------------
+schema_bloack="""
+{
+  "top_recommendations": [
+    {
+      "field_name": "string",                     // e.g., "Computer Science & Data"
+      "asced_broad_code": "string|null",          // first 2 digits of the chosen candidate field code (e.g., "02")
+      "asced_narrow_code": "string|null",         // first 4 digits of the chosen candidate field code (e.g., "0201")
+      "why_fit": "1 sentences",
+      "sample_university_majors": ["string", "..."],
+      "suggested_high_school_subjects": ["string", "..."],
+      "useful_extracurriculars": ["string", "..."],
+      "possible_career_paths": ["string", "..."],
+      "cautions": ["string", "..."],
+      "Universities": ["string", "..."],
+      "Courses": ["string", "..."]
+    }
+  ],
+  "notes": "short global note (e.g., portfolio/math intensity/subject prerequisites)."
+}
+"""
+SYSTEM_PROMPT_2 = f"""
+You are an academic pathways adviser. Based on two score models—
+1) HLAFPS: H (Hedonism), L (Learning & Achievement), A (Altruism), F (Finance), P (Power & Status), S (Security)
+2) RIASEC: R (Realistic), I (Investigative), A (Artistic), S (Social), E (Enterprising), C (Conventional)
+
+Recommend suitable fields of study for a high school student. Be concise, age-appropriate, practical, and culturally neutral. 
+Do not reveal step-by-step reasoning; provide only short, decision-relevant rationales.
+
+RULES:
+- Consider both models; default weights: RIASEC 60%, HLAFPS 40%. If user provides custom weights, use them.
+- Interpret peaks and meaningful pairs/triads:
+  • R → engineering, trades, applied tech, environmental fieldwork
+  • I → science, mathematics, CS, data, research
+  • A → design, media, performing arts, architecture
+  • S → education, nursing, psychology, social work, community services
+  • E → business, entrepreneurship, management, law-adjacent, communications
+  • C → accounting, finance ops, information systems, administration, library/info mgmt
+  • H (Hedonism high) → creative, experiential, hands-on or project-based settings
+  • L (Learning & Achievement) → research-intensive, academic rigor, competitions/olympiads
+  • A (Altruism) → health, education, social impact, sustainability
+  • F (Finance) → business, economics, accounting, fintech, quantitative fields
+  • P (Power & Status) → leadership tracks, policy, law, management, debating/public speaking
+  • S (Security) → regulated/stable careers: healthcare, civil service, accounting, infrastructure
+- Break ties with HLAFPS emphasis and the student’s constraints/interests if provided.
+- university in australia has higher priority in uni recommendation 
+- Provide 2–3 top fields only select from the CANDIDATE FIELDS listed in the user message. For each, include “why it fits”, sample university majors, suggested high-school subjects, helpful extracurriculars, and 2–3 career pathways, university and courses recommendation.
+- Keep cautions pragmatic (e.g., “heavy math load”, “portfolio required”).
+- Output strictly in JSON matching the schema below. No extra text.
+
+INPUT:
+HLAFPS scores : 
+RIASEC scores :
+OUTPUT JSON SCHEMA:
+{schema_bloack}
+"""
+
+RECOMMEND_SITE = CallSite(
+    "study_field_recommendation",
+    system=SYSTEM_PROMPT_2,
+    suffix="""
+CANDIDATE FIELDS (ASCED detailed code: description):
+{fields}
+
+HLAFPS scores (H/L/A/F/P/S): {holland}
+RIASEC scores (R/I/A/S/E/C): {riasec}
+
+Return strict JSON matching the schema.
+""",
+    model="gpt-5-nano",
+    input_budget=6000,
+    output_budget=12000,
+)
+
+class FieldRecommendation(BaseModel):
+    field_name: str
+    asced_broad_code: Optional[str] = None
+    asced_narrow_code: Optional[str] = None
+    why_fit: str
+    sample_university_majors: List[str]
+    suggested_high_school_subjects: List[str]
+    useful_extracurriculars: List[str]
+    possible_career_paths: List[str]
+    cautions: List[str]
+    Universities: List[str]
+    Courses: List[str]
+
+
+class StudyRecommendation(BaseModel):
+    top_recommendations: List[FieldRecommendation]
+    notes: str
+
+
+def _candidate_codes(fields: List[dict]) -> Dict[int, Set[str]]:
+    """候选领域（来自本地 ASCED 表）对应的 broad（2 位）和 narrow（4 位）代码"""
+    codes = [str(f.get("detailed_field_code") or "").strip() for f in fields]
+    return {digits: {c[:digits] for c in codes if len(c) >= digits} for digits in (2, 4)}
+
+
+def _asced_problems(result: StudyRecommendation, valid: Dict[int, Set[str]]) -> Optional[str]:
+    """返回的 ASCED 代码不在候选领域中、或 narrow 与 broad 不一致时给出错误说明"""
+    problems = []
+    for rec in result.top_recommendations:
+        broad, narrow = rec.asced_broad_code, rec.asced_narrow_code
+        if narrow is not None and narrow.strip() not in valid[4]:
+            problems.append(f"{rec.field_name}: asced_narrow_code {narrow!r} is not one of the candidate fields")
+        elif broad is not None and broad.strip() not in valid[2]:
+            problems.append(f"{rec.field_name}: asced_broad_code {broad!r} is not one of the candidate fields")
+        elif broad is not None and narrow is not None and not narrow.strip().startswith(broad.strip()):
+            problems.append(f"{rec.field_name}: asced_narrow_code {narrow!r} is not within broad code {broad!r}")
+    return "; ".join(problems) or None
+
+
+def _fix_asced_codes(recs: List[FieldRecommendation], valid: Dict[int, Set[str]]) -> None:
+    """重试后仍不合法的代码：能从 narrow 推出 broad 就推出，否则置为 null"""
+    for rec in recs:
+        narrow = (rec.asced_narrow_code or "").strip()
+        broad = (rec.asced_broad_code or "").strip()
+        if narrow in valid[4]:
+            rec.asced_narrow_code, rec.asced_broad_code = narrow, narrow[:2]
+        else:
+            rec.asced_narrow_code = None
+            rec.asced_broad_code = broad if broad in valid[2] else None
+
+
+def one_call_unified(holland: Dict[str, float],
+                     riasec: Dict[str, float],
+                     fields: List[dict],
+                     model: str = "gpt-5-nano") -> dict:    
+    llm = ChatOpenAI(model_name=model, temperature=0.00001, **RECOMMEND_SITE.llm_kwargs())
+    # 只把最相关的候选领域放进 prompt，而不是整个 ased_detail 表
+    messages = RECOMMEND_SITE.compile(
+        fields=[f"{f.get('detailed_field_code')}: {f.get('description')}" for f in fields],
+        holland=holland,
+        riasec=riasec,
+    )
+    valid = _candidate_codes(fields)
+    # 没有候选领域时无从校验代码
+    check = (lambda result: _asced_problems(result, valid)) if valid[2] else None
+    result = invoke_structured(llm, messages, StudyRecommendation, RECOMMEND_SITE, check=check)
+    if check is not None and check(result):
+        _fix_asced_codes(result.top_recommendations, valid)
+    return result.model_dump()
+
+
+def stream_recommendations(holland: Dict[str, float],
+                           riasec: Dict[str, float],
+                           fields: List[dict],
+                           model: str = "gpt-5-nano") -> Iterator[dict]:
+    """one_call_unified 的流式版本：每解析出一条推荐就产出（dict）
+
+    流中途无法带着错误重试，不合法的 ASCED 代码直接就地修正。
+    """
+    llm = ChatOpenAI(model_name=model, temperature=0.00001, stream_usage=True, **RECOMMEND_SITE.llm_kwargs())
+    messages = RECOMMEND_SITE.compile(
+        fields=[f"{f.get('detailed_field_code')}: {f.get('description')}" for f in fields],
+        holland=holland,
+        riasec=riasec,
+    )
+    valid = _candidate_codes(fields)
+    for item in stream_json_array(llm, messages, RECOMMEND_SITE, schema=StudyRecommendation):
+        if valid[2]:
+            rec = FieldRecommendation.model_validate(item)
+            _fix_asced_codes([rec], valid)
+            item = rec.model_dump()
+        yield item
+
+
+# 分析结果的版本号：任一调用点的 prompt 或模型变化都会使已存储的结果失效
+ANALYSIS_VERSION = f"{SUMMARY_SITE.version}.{RECOMMEND_SITE.version}"
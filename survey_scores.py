@@ -0,0 +1,113 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 两个模型的字母顺序（与图表、prompt 中的顺序一致）
+HLAFPS_KEYS = ["H", "L", "A", "F", "P", "S"]
+RIASEC_KEYS = ["R", "I", "A", "S", "E", "C"]
+
+# survey_processed 中的 12 个数值列，顺序即得分向量的顺序
+HLAFPS_COLUMNS = [f"hlafps_{k.lower()}" for k in HLAFPS_KEYS]
+RIASEC_COLUMNS = [f"riasec_{k.lower()}" for k in RIASEC_KEYS]
+SCORE_COLUMNS = HLAFPS_COLUMNS + RIASEC_COLUMNS
+
+# 旧的字符串列
+LEGACY_COLUMNS = ["Holland_Scores", "RIASEC_Scores"]
+SCORE_SELECT = ",".join(["Username"] + SCORE_COLUMNS + LEGACY_COLUMNS)
+
+# in_ 过滤放在 GET 查询串里，每批邮箱数要让 URL 保持在代理 / PostgREST 的长度限制内
+IN_CHUNK = 150
+
+
+def parse_score_strings(strings: pd.Series, keys: List[str]) -> np.ndarray:
+    """向量化解析一整列得分字符串，返回 (n, len(keys)) 数组，缺失为 NaN"""
+    strings = strings.fillna("").astype(str).str.replace(" ", "", regex=False)
+    out = np.full((len(strings), len(keys)), np.nan)
+    for j, key in enumerate(keys):
+        extracted = strings.str.extract(rf"(?:^|,){key}:([-+0-9.eE]+)", expand=False)
+        out[:, j] = pd.to_numeric(extracted, errors="coerce").to_numpy(dtype=float)
+    return out
+
+
+def parse_legacy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """把旧字符串列批量转换为 12 个数值列（无法解析的行保留 NaN）"""
+    h = parse_score_strings(df["Holland_Scores"], HLAFPS_KEYS)
+    r = parse_score_strings(df["RIASEC_Scores"], RIASEC_KEYS)
+    return pd.DataFrame(np.hstack([h, r]), columns=SCORE_COLUMNS, index=df.index)
+
+
+def response_hash(frame: pd.DataFrame) -> pd.Series:
+    """每行作答内容的哈希（列按名称排序），与 Username 组成 survey_processed 的自然键
+
+    同一份作答重复导入时 upsert 到同一行，新的作答插入为新行。
+    """
+    text = frame[sorted(frame.columns)].astype(str).agg("\x1f".join, axis=1)
+    return text.map(lambda t: hashlib.sha1(t.encode("utf-8")).hexdigest())
+
+
+def score_matrix(rows: Iterable[dict]) -> np.ndarray:
+    """行列表 → (n, 12) float32 得分矩阵；优先使用数值列，缺失时回退解析字符串"""
+    df = pd.DataFrame(list(rows))
+    if df.empty:
+        return np.zeros((0, len(SCORE_COLUMNS)), dtype=np.float32)
+    for col in SCORE_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    matrix = df[SCORE_COLUMNS].to_numpy(dtype=np.float32, na_value=np.nan)
+    pending = np.isnan(matrix).any(axis=1)
+    if pending.any() and all(c in df.columns for c in LEGACY_COLUMNS):
+        matrix[pending] = parse_legacy_frame(df.loc[pending]).to_numpy(dtype=np.float32)
+    return matrix
+
+
+def vector_to_dicts(vector) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """得分向量 → (HLAFPS dict, RIASEC dict)"""
+    # float32 → 保留 4 位小数，避免 prompt 和指纹中出现 18.700000762939453
+    vector = [round(float(v), 4) for v in vector]
+    return dict(zip(HLAFPS_KEYS, vector[:6])), dict(zip(RIASEC_KEYS, vector[6:]))
+
+
+def row_scores(row: dict) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """单行 → (HLAFPS dict, RIASEC dict)"""
+    return vector_to_dicts(score_matrix([row])[0])
+
+
+def load_score_vectors(supabase,
+                       usernames: Optional[List[str]] = None,
+                       columns: str = SCORE_SELECT,
+                       page_size: int = 1000) -> Tuple[List[dict], np.ndarray]:
+    """读取 survey_processed，返回 (行信息, (n, 12) 得分矩阵)
+
+    usernames 为空时按 id keyset 分页读取整张表；否则按 IN_CHUNK 个邮箱一批查询。
+    """
+    rows: List[dict] = []
+    if usernames is not None:
+        for i in range(0, len(usernames), IN_CHUNK):
+            rows += (
+                supabase.table("survey_processed")
+                .select(columns)
+                .in_("Username", usernames[i:i + IN_CHUNK])
+                .execute()
+            ).data or []
+    else:
+        last_id = None
+        while True:
+            query = (
+                supabase.table("survey_processed")
+                .select("id," + columns)
+                .order("id")
+                .limit(page_size)
+            )
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            page = query.execute().data or []
+            if not page:
+                break
+            rows += page
+            last_id = page[-1]["id"]
+    matrix = score_matrix(rows)
+    # 去掉得分无法解析的行
+    valid = ~np.isnan(matrix).any(axis=1)
+    return [r for r, ok in zip(rows, valid) if ok], matrix[valid]
@@ -0,0 +1,162 @@
+"""问卷原始作答 → 12 项 RIASEC/HLAFPS 得分的向量化计分引擎
+
+计分键（JSON，带版本号），每道题对应一个特质列：
+    {
+      "version": "2026.1",
+      "scale": {"min": 1, "max": 5},
+      "normalize": "sum",            # 或 "percent"：按题目可能的最小/最大总分换算为 0–100
+      "items": {
+        "Q01": {"trait": "riasec_r"},
+        "Q02": {"trait": "hlafps_h", "reverse": true, "weight": 1.0},
+        ...
+      }
+    }
+
+用法：
+    python survey_scoring.py --key keys/2026.1.json --responses intake.csv          # 写入 survey_processed
+    python survey_scoring.py --key keys/2026.1.json --responses intake.csv --out scores.csv
+
+responses 为宽表 CSV：一行一个学生，Username 列 + 每道题一列。
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from import_scores import NATURAL_KEY
+from survey_scores import HLAFPS_COLUMNS, HLAFPS_KEYS, RIASEC_COLUMNS, RIASEC_KEYS, SCORE_COLUMNS, response_hash
+
+TABLE = "survey_processed"
+
+
+class ScoringKeyError(ValueError):
+    """计分键格式错误"""
+
+
+class ScoringKey:
+    """题目 → 特质的计分矩阵（items × 12）"""
+
+    def __init__(self, spec: dict):
+        try:
+            self.version = str(spec["version"])
+            self.scale_min = float(spec.get("scale", {}).get("min", 1))
+            self.scale_max = float(spec.get("scale", {}).get("max", 5))
+            self.normalize = spec.get("normalize", "sum")
+            items = spec["items"]
+        except (KeyError, TypeError) as e:
+            raise ScoringKeyError(f"Invalid scoring key: {e}")
+        if self.normalize not in ("sum", "percent"):
+            raise ScoringKeyError(f"Unknown normalize mode: {self.normalize}")
+
+        self.item_ids: List[str] = list(items)
+        self.weights = np.zeros((len(items), len(SCORE_COLUMNS)))
+        self.reverse = np.zeros(len(items), dtype=bool)
+        for i, item_id in enumerate(self.item_ids):
+            item = items[item_id]
+            if item.get("trait") not in SCORE_COLUMNS:
+                raise ScoringKeyError(f"{item_id}: unknown trait {item.get('trait')!r}")
+            self.weights[i, SCORE_COLUMNS.index(item["trait"])] = float(item.get("weight", 1.0))
+            self.reverse[i] = bool(item.get("reverse", False))
+        if not (self.weights != 0).any(axis=0).all():
+            missing = [c for c, used in zip(SCORE_COLUMNS, (self.weights != 0).any(axis=0)) if not used]
+            raise ScoringKeyError(f"No items for trait(s): {', '.join(missing)}")
+
+    @classmethod
+    def load(cls, path: Path) -> "ScoringKey":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def score(self, responses: np.ndarray) -> np.ndarray:
+        """(学生数, 题目数) 作答矩阵 → (学生数, 12) 得分矩阵
+
+        未作答（NaN）的题目按该特质已答题目的平均水平折算。
+        """
+        x = np.asarray(responses, dtype=float)
+        x = np.where(self.reverse, self.scale_min + self.scale_max - x, x)
+        answered = ~np.isnan(x)
+        used = (self.weights != 0).astype(float)
+
+        raw = np.where(answered, x, 0.0) @ self.weights
+        # 按已答题目比例折算缺失
+        coverage = (answered.astype(float) @ used) / used.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = np.where(coverage > 0, raw / coverage, np.nan)
+
+        if self.normalize == "percent":
+            w = self.weights
+            low = np.where(w > 0, w * self.scale_min, w * self.scale_max).sum(axis=0)
+            high = np.where(w > 0, w * self.scale_max, w * self.scale_min).sum(axis=0)
+            scores = 100.0 * (scores - low) / (high - low)
+        return scores
+
+
+def score_frame(responses: pd.DataFrame, key: ScoringKey) -> pd.DataFrame:
+    """宽表作答 → survey_processed 行（数值列 + 旧字符串列 + 计分键版本 + 作答哈希）"""
+    missing = [c for c in key.item_ids if c not in responses.columns]
+    if missing:
+        raise ScoringKeyError(f"Responses are missing {len(missing)} item column(s), e.g. {missing[:5]}")
+    answers = responses[key.item_ids].apply(pd.to_numeric, errors="coerce")
+    scores = pd.DataFrame(key.score(answers.to_numpy(dtype=float)).round(2), columns=SCORE_COLUMNS,
+                          index=responses.index)
+
+    out = pd.concat([responses[["Username"]], scores], axis=1)
+    out = out[~scores.isna().any(axis=1)]
+    # 旧的字符串格式，兼容还在读 Holland_Scores / RIASEC_Scores 的地方
+    out["Holland_Scores"] = _legacy_strings(out[HLAFPS_COLUMNS], HLAFPS_KEYS)
+    out["RIASEC_Scores"] = _legacy_strings(out[RIASEC_COLUMNS], RIASEC_KEYS)
+    out["score_key_version"] = key.version
+    out["response_hash"] = response_hash(answers.loc[out.index])
+    return out
+
+
+def _legacy_strings(frame: pd.DataFrame, keys: List[str]) -> pd.Series:
+    parts = [k + ":" + frame[c].map("{:g}".format) for k, c in zip(keys, frame.columns)]
+    joined = parts[0]
+    for p in parts[1:]:
+        joined = joined + "," + p
+    return joined
+
+
+def write_scores(supabase, scored: pd.DataFrame, chunk_size: int = 500) -> int:
+    """分批写入 survey_processed，按 (Username, response_hash) upsert
+
+    同一份作答重新计分（如换了计分键版本）时更新原来那一行；学生的新问卷作答不同，
+    插入为新行，之前的问卷保留下来供前后对比。
+    """
+    # 同一次 upsert 中不能出现两行相同的键
+    scored = scored.drop_duplicates(["Username", "response_hash"])
+    written = 0
+    for i in range(0, len(scored), chunk_size):
+        records = scored.iloc[i:i + chunk_size].to_dict("records")
+        supabase.table(TABLE).upsert(records, on_conflict=NATURAL_KEY).execute()
+        written += len(records)
+        print(f"wrote {written}/{len(scored)} row(s)")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--key", type=Path, required=True, help="versioned scoring key JSON")
+    parser.add_argument("--responses", type=Path, required=True, help="wide CSV of raw item responses")
+    parser.add_argument("--out", type=Path, default=None, help="write scores to CSV instead of Supabase")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    key = ScoringKey.load(args.key)
+    responses = pd.read_csv(args.responses, dtype={"Username": str})
+    scored = score_frame(responses, key)
+    skipped = len(responses) - len(scored)
+    print(f"Scored {len(scored)} student(s) with key {key.version}"
+          + (f"; skipped {skipped} with no answers for a trait" if skipped else ""))
+
+    if args.out:
+        scored.to_csv(args.out, index=False)
+    else:
+        from supabase_client import get_supabase_client
+        write_scores(get_supabase_client(), scored, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,623 @@
+"""大学知识库（university_kb 表）：QS 排名、概况和课程
+
+页面只读表中的数据；记录过期时在后台线程里调用 LLM 刷新，不阻塞页面。
+排名网格显示后会在后台预取前几所大学的详情，交互请求优先于预取。
+也可以离线批量刷新：
+    python university_kb.py                         # 四个国家的排名 + 所有大学详情
+    python university_kb.py --countries Canada --stale-only --concurrency 4
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import json
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+from json_stream import stream_json_array
+from prompt_compiler import CallSite
+from structured_output import invoke_structured
+
+TABLE = "university_kb"
+COUNTRY_NAMES = ["United Kingdom", "Canada", "Australia", "New Zealand"]
+TOP_N = 20
+
+# 超过这个时间的记录视为过期，需要重新生成
+RANKINGS_MAX_AGE = timedelta(days=30)
+DETAILS_MAX_AGE = timedelta(days=90)
+
+
+# QS Top 大学数据模型
+class QSUniversity(BaseModel):
+    rank: int = Field(..., description="QS World University Ranking")
+    university_name: str = Field(..., description="University name")
+    location: str = Field(..., description="City/Location")
+    qs_score: Optional[float] = Field(None, description="QS Score if available")
+
+class QSUniversityList(BaseModel):
+    country: str
+    universities: List[QSUniversity]
+
+# 大学概况（第一阶段）和热门课程（第二阶段）
+# 位置和排名来自排名列表（location / rank 列），概况里不再让模型重复生成
+class UniversityProfile(BaseModel):
+    overview: str = Field(..., description="Short overview in 3-4 sentences")
+    strengths: List[str] = Field(..., description="5-7 key strengths, each a short phrase")
+
+class Course(BaseModel):
+    course_name: str = Field(..., description="Full name of the course")
+    field: str = Field(..., description="Field of study")
+    degree_level: str = Field(..., description="Bachelor, Master, or PhD")
+    brief_description: str = Field(..., description="1-2 sentence description")
+
+class CourseList(BaseModel):
+    popular_courses: List[Course]
+
+# QS 排名调用点：说明全部放在静态前缀中，国家和数量放在末尾
+RANKINGS_SITE = CallSite(
+    "qs_rankings",
+    system="""You are an expert in international higher education rankings.
+    You MUST provide ACCURATE QS World University Rankings data (2024 or 2025).
+    CRITICAL: Verify rankings before returning. Use the most recent available data (2024 or 2025).
+    Return ONLY valid JSON, no explanations or additional text.
+
+    The user gives a country and a number N. Provide the top N universities in that country based on QS World University Rankings (2024 or 2025, global ranking, not country-specific ranking).
+
+    IMPORTANT:
+    - Use QS World University Rankings 2024 or 2025 data (whichever is most recent and accurate)
+    - The rank must be the GLOBAL WORLD RANKING position, not country-specific
+    - Use accurate and verified rankings
+    - If 2025 data is not available or uncertain, use 2024 data
+
+    For each university, include:
+    - rank: QS World University Ranking (GLOBAL RANK, integer) - this is the worldwide ranking position
+    - university_name: Full official name
+    - location: City name
+    - qs_score: QS Score if available (float, or null)
+
+    Return as JSON with this structure:
+    {
+        "country": "Australia",
+        "universities": [
+            {
+                "rank": 14,
+                "university_name": "Australian National University",
+                "location": "Canberra",
+                "qs_score": 95.2
+            },
+            ...
+        ]
+    }
+
+    IMPORTANT: Use accurate QS rankings (2024 or 2025). Return JSON only, no other text.""",
+    suffix="""Country: {country}
+N: {top_n}""",
+    model="gpt-4o",
+    input_budget=1500,
+    output_budget=3000,
+)
+
+# 大学详情第一阶段：简短概况和优势，输出小、返回快
+DETAILS_SITE = CallSite(
+    "university_details",
+    system="""You are an expert in international higher education.
+    Provide concise and accurate information about universities.
+    Return ONLY valid JSON, no explanations or additional text.
+
+    The user gives a university and its country. Provide a short profile of that university.
+
+    Include:
+    - overview: A short overview of the university in 3-4 sentences (history, reputation, strengths)
+    - strengths: List of 5-7 key strengths or notable features, each a short phrase
+
+    Return as JSON with this structure:
+    {
+        "overview": "Short overview...",
+        "strengths": ["Strength 1", "Strength 2", ...]
+    }
+
+    Return JSON only, no other text.""",
+    suffix="""University: {university}
+Country: {country}""",
+    model="gpt-4o",
+    input_budget=1500,
+    output_budget=600,
+)
+
+# 大学详情第二阶段：热门课程，展开课程区域时才生成
+COURSES_SITE = CallSite(
+    "university_courses",
+    system="""You are an expert in international higher education.
+    Provide accurate information about the courses universities offer.
+    Return ONLY valid JSON, no explanations or additional text.
+
+    The user gives a university and its country. List 8-10 popular/notable courses/majors offered there, each with:
+    - course_name: Full name of the course
+    - field: Field of study (e.g., Engineering, Business, Science)
+    - degree_level: Bachelor, Master, or PhD
+    - brief_description: 1-2 sentence description
+
+    Return as JSON with this structure:
+    {
+        "popular_courses": [
+            {
+                "course_name": "Computer Science",
+                "field": "Engineering",
+                "degree_level": "Bachelor",
+                "brief_description": "Description..."
+            },
+            ...
+        ]
+    }
+
+    Return JSON only, no other text.""",
+    suffix="""University: {university}
+Country: {country}""",
+    model="gpt-4o",
+    input_budget=1500,
+    output_budget=2500,
+)
+
+PROMPT_VERSION = hashlib.sha256(f"{RANKINGS_SITE.version}.{DETAILS_SITE.version}.{COURSES_SITE.version}".encode()).hexdigest()[:12]
+
+
+# ---------------------------
+# LLM 生成
+# ---------------------------
+def stream_rankings(country: str, top_n: int = TOP_N) -> Iterator[dict]:
+    """流式获取 QS Top 大学列表：每解析出一所大学就立即产出"""
+    llm = ChatOpenAI(model="gpt-4o", temperature=0, stream_usage=True, **RANKINGS_SITE.llm_kwargs())
+    yield from stream_json_array(llm, RANKINGS_SITE.compile(country=country, top_n=top_n), RANKINGS_SITE,
+                                 schema=QSUniversityList)
+
+
+def fetch_rankings(country: str, top_n: int = TOP_N) -> List[dict]:
+    """调用 LLM 获取指定国家的 QS Top 大学列表（失败时抛出异常）"""
+    data = list(stream_rankings(country, top_n))
+    if not data:
+        raise ValueError(f"API returned empty list for {country}")
+    return data
+
+
+def fetch_details(university: str, country: str) -> dict:
+    """调用 LLM 生成大学简短概况和优势（第一阶段）"""
+    llm = ChatOpenAI(model="gpt-4o", temperature=0.3, **DETAILS_SITE.llm_kwargs())
+    return invoke_structured(llm, DETAILS_SITE.compile(university=university, country=country),
+                             UniversityProfile, DETAILS_SITE).model_dump()
+
+
+def fetch_courses(university: str, country: str) -> List[dict]:
+    """调用 LLM 生成大学热门课程（第二阶段）"""
+    llm = ChatOpenAI(model="gpt-4o", temperature=0.3, **COURSES_SITE.llm_kwargs())
+    result = invoke_structured(llm, COURSES_SITE.compile(university=university, country=country),
+                               CourseList, COURSES_SITE)
+    return [course.model_dump() for course in result.popular_courses]
+
+
+# ---------------------------
+# 读写知识库
+# ---------------------------
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def is_stale(timestamp: Optional[str], max_age: timedelta) -> bool:
+    if not timestamp:
+        return True
+    try:
+        refreshed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return True
+    return _now() - refreshed > max_age
+
+
+def load_country(supabase, country: str, top_n: int = TOP_N) -> List[dict]:
+    """某国按排名排序的大学列表（含 rankings_refreshed_at）"""
+    response = (
+        supabase.table(TABLE)
+        .select("university_name,rank,location,qs_score,rankings_refreshed_at")
+        .eq("country", country)
+        .not_.is_("rank", "null")
+        .order("rank")
+        .limit(top_n)
+        .execute()
+    )
+    return response.data or []
+
+
+def load_details(supabase, country: str, university: str) -> Optional[dict]:
+    """大学详情（概况、优势，以及排名列表中的位置和排名）；尚未生成时返回 None"""
+    response = (
+        supabase.table(TABLE)
+        .select("overview,location,rank,strengths,details_refreshed_at")
+        .eq("country", country)
+        .eq("university_name", university)
+        .limit(1)
+        .execute()
+    )
+    row = response.data[0] if response.data else None
+    if not row or row.get("overview") is None:
+        return None
+    row["qs_rank"] = row.pop("rank")
+    return row
+
+
+def load_courses(supabase, country: str, university: str) -> Optional[dict]:
+    """大学热门课程 {"popular_courses", "courses_refreshed_at"}；尚未生成时返回 None"""
+    response = (
+        supabase.table(TABLE)
+        .select("popular_courses,courses_refreshed_at")
+        .eq("country", country)
+        .eq("university_name", university)
+        .limit(1)
+        .execute()
+    )
+    row = response.data[0] if response.data else None
+    if not row or row.get("popular_courses") is None:
+        return None
+    return row
+
+
+def save_rankings(supabase, country: str, universities: List[dict]) -> None:
+    """整批写入排名；本次未出现的大学清空排名（详情保留）"""
+    now = _now().isoformat()
+    rows = [{
+        "country": country,
+        "university_name": str(u.get("university_name", "")).strip(),
+        "rank": u.get("rank"),
+        "location": u.get("location"),
+        "qs_score": u.get("qs_score"),
+        "prompt_version": PROMPT_VERSION,
+        "rankings_refreshed_at": now,
+    } for u in universities if u.get("university_name")]
+    if not rows:
+        return
+    supabase.table(TABLE).upsert(rows, on_conflict="country,university_name").execute()
+    (
+        supabase.table(TABLE)
+        .update({"rank": None})
+        .eq("country", country)
+        .lt("rankings_refreshed_at", now)
+        .execute()
+    )
+
+
+def save_details(supabase, country: str, university: str, details: dict) -> None:
+    supabase.table(TABLE).upsert({
+        "country": country,
+        "university_name": university,
+        "overview": details.get("overview"),
+        "strengths": details.get("strengths"),
+        "prompt_version": PROMPT_VERSION,
+        "details_refreshed_at": _now().isoformat(),
+    }, on_conflict="country,university_name").execute()
+
+
+def save_courses(supabase, country: str, university: str, courses: List[dict]) -> None:
+    supabase.table(TABLE).upsert({
+        "country": country,
+        "university_name": university,
+        "popular_courses": courses,
+        "prompt_version": PROMPT_VERSION,
+        "courses_refreshed_at": _now().isoformat(),
+    }, on_conflict="country,university_name").execute()
+
+
+def refresh_country(supabase, country: str, top_n: int = TOP_N) -> List[dict]:
+    universities = fetch_rankings(country, top_n)
+    save_rankings(supabase, country, universities)
+    return universities
+
+
+def _save(save, supabase, country: str, university: str, data, strict: bool) -> None:
+    try:
+        save(supabase, country, university, data)
+    except Exception:
+        # 页面请求写入失败时本次仍可使用生成的结果；批量刷新需要如实报错
+        if strict:
+            raise
+
+
+def refresh_details(supabase, country: str, university: str, strict: bool = True) -> dict:
+    details = fetch_details(university, country)
+    _save(save_details, supabase, country, university, details, strict)
+    details["details_refreshed_at"] = _now().isoformat()
+    return details
+
+
+def refresh_courses(supabase, country: str, university: str, strict: bool = True) -> dict:
+    courses = fetch_courses(university, country)
+    _save(save_courses, supabase, country, university, courses, strict)
+    return {"popular_courses": courses, "courses_refreshed_at": _now().isoformat()}
+
+
+# ---------------------------
+# 后台任务：交互请求优先，预取和过期刷新让路
+# ---------------------------
+INTERACTIVE, BACKGROUND = 0, 10
+PREFETCH_TOP_N = 15
+
+
+class _Task:
+    __slots__ = ("fn", "args", "future", "started")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.started = False
+
+
+class _PriorityPool:
+    """按优先级取任务的线程池
+
+    后台任务最多同时占用 max_background 个线程，始终留出空闲线程给交互请求；
+    已排队的任务可以用更高优先级再次入队（提升优先级），先被取到的那份执行，另一份丢弃。
+    """
+
+    def __init__(self, workers: int = 4, max_background: int = 3):
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._max_background = max_background
+        self._background_running = 0
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"university-kb-{i}", daemon=True).start()
+
+    def push(self, priority: int, task: _Task) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._seq), task))
+            self._cond.notify_all()
+
+    def _take(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2].started:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    priority = self._heap[0][0]
+                    if priority < BACKGROUND or self._background_running < self._max_background:
+                        _, _, task = heapq.heappop(self._heap)
+                        task.started = True
+                        if priority >= BACKGROUND:
+                            self._background_running += 1
+                        return priority, task
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            priority, task = self._take()
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        task.future.set_result(task.fn(*task.args))
+                    except BaseException as e:
+                        task.future.set_exception(e)
+            finally:
+                if priority >= BACKGROUND:
+                    with self._cond:
+                        self._background_running -= 1
+                        self._cond.notify_all()
+
+
+_pool = _PriorityPool()
+_in_flight: Dict[tuple, _Task] = {}
+_in_flight_lock = threading.Lock()
+
+# 详情分两阶段：概况（details）先显示，课程（courses）展开时才加载
+_STAGES = {
+    "details": (load_details, refresh_details, "details_refreshed_at"),
+    "courses": (load_courses, refresh_courses, "courses_refreshed_at"),
+}
+
+# 进程内详情缓存（所有会话共用），键为 (阶段, 国家, 大学)：预取完成后点击可立即显示
+_cache: Dict[tuple, dict] = {}
+
+
+def _submit(key: tuple, priority: int, fn, *args) -> Future:
+    """同一条记录只保留一个任务；交互请求遇到排队中的后台任务时提升其优先级"""
+    with _in_flight_lock:
+        task = _in_flight.get(key)
+        if task is None:
+            task = _Task(fn, args)
+            _in_flight[key] = task
+
+            def done(_, key=key, task=task):
+                with _in_flight_lock:
+                    if _in_flight.get(key) is task:
+                        del _in_flight[key]
+            task.future.add_done_callback(done)
+        elif priority >= BACKGROUND or task.started:
+            return task.future
+    _pool.push(priority, task)
+    return task.future
+
+
+def _refresh_task(stage: str, supabase, country: str, university: str) -> dict:
+    try:
+        row = _STAGES[stage][1](supabase, country, university, strict=False)
+    except Exception as e:
+        # 后台刷新失败时保留旧数据，下次访问再试
+        print(f"university_kb {stage} refresh failed for {university} ({country}): {e}", file=sys.stderr)
+        raise
+    _cache[(stage, country, university)] = row
+    return row
+
+
+def _load_task(stage: str, supabase, country: str, university: str) -> dict:
+    """先读知识库，没有时调用 LLM 生成并写入"""
+    load, refresh, _ = _STAGES[stage]
+    try:
+        row = load(supabase, country, university)
+    except Exception:
+        # 表尚未迁移时直接调用 AI
+        row = None
+    if row is None:
+        row = refresh(supabase, country, university, strict=False)
+    _cache[(stage, country, university)] = row
+    return row
+
+
+def _refresh_country_task(supabase, country: str) -> List[dict]:
+    try:
+        return refresh_country(supabase, country)
+    except Exception as e:
+        print(f"university_kb rankings refresh failed for {country}: {e}", file=sys.stderr)
+        raise
+
+
+def refresh_in_background(supabase, country: str, university: Optional[str] = None,
+                          stage: str = "details") -> bool:
+    """提交后台刷新（university 为空时刷新排名）；同一条记录已在刷新中时不重复提交。返回是否提交了新任务"""
+    key = (stage if university else "rankings", country, university)
+    with _in_flight_lock:
+        if key in _in_flight:
+            return False
+    if university is None:
+        _submit(key, BACKGROUND, _refresh_country_task, supabase, country)
+    else:
+        _submit(key, BACKGROUND, _refresh_task, stage, supabase, country, university)
+    return True
+
+
+def _get(stage: str, supabase, country: str, university: str, timeout: Optional[float]) -> dict:
+    row = _cache.get((stage, country, university))
+    if row is None:
+        row = _submit((stage, country, university), INTERACTIVE,
+                      _load_task, stage, supabase, country, university).result(timeout)
+    if is_stale(row.get(_STAGES[stage][2]), DETAILS_MAX_AGE):
+        refresh_in_background(supabase, country, university, stage)
+    return row
+
+
+def get_details(supabase, country: str, university: str, timeout: Optional[float] = None) -> dict:
+    """交互读取大学概况：进程缓存 → 进行中的预取 → 知识库 → LLM；过期记录照常返回并在后台刷新"""
+    return _get("details", supabase, country, university, timeout)
+
+
+def get_courses(supabase, country: str, university: str, timeout: Optional[float] = None) -> List[dict]:
+    """交互读取大学热门课程（第二阶段，课程区域展开时调用）"""
+    return _get("courses", supabase, country, university, timeout).get("popular_courses") or []
+
+
+def seed_cache(stage: str, country: str, university: str, row: dict) -> None:
+    """用 bake 制品中的记录预填进程缓存（已有的记录不覆盖）"""
+    _cache.setdefault((stage, country, university), row)
+
+
+def prefetch_details(supabase, country: str, universities: List[str], top_n: int = PREFETCH_TOP_N) -> int:
+    """在后台预取前 top_n 所大学的概况（一次查询判断哪些缺失或过期），返回提交的任务数
+
+    只预取第一阶段：请求小、返回快；课程只在用户展开时生成。
+    每所大学单独请求，合并成多校请求会推迟第一条结果的到达。
+    """
+    names = [u for u in universities[:top_n] if ("details", country, u) not in _cache]
+    if not names:
+        return 0
+    try:
+        rows = (
+            supabase.table(TABLE)
+            .select("university_name,overview,location,rank,strengths,details_refreshed_at")
+            .eq("country", country)
+            .in_("university_name", names)
+            .execute()
+        ).data or []
+    except Exception:
+        rows = []
+    found = {}
+    for row in rows:
+        if row.get("overview") is not None:
+            row["qs_rank"] = row.pop("rank")
+            found[row.pop("university_name")] = row
+
+    submitted = 0
+    for name in names:
+        row = found.get(name)
+        if row is not None:
+            _cache[("details", country, name)] = row
+            if not is_stale(row.get("details_refreshed_at"), DETAILS_MAX_AGE):
+                continue
+        if refresh_in_background(supabase, country, name):
+            submitted += 1
+    return submitted
+
+
+# ---------------------------
+# 批量刷新
+# ---------------------------
+def _stale_details(supabase, country: str) -> Dict[str, Dict[str, bool]]:
+    """{大学: {阶段: 是否过期}}"""
+    rows = (
+        supabase.table(TABLE)
+        .select("university_name,details_refreshed_at,courses_refreshed_at")
+        .eq("country", country)
+        .not_.is_("rank", "null")
+        .execute()
+    ).data or []
+    return {r["university_name"]: {stage: is_stale(r.get(stamp), DETAILS_MAX_AGE)
+                                   for stage, (_, _, stamp) in _STAGES.items()} for r in rows}
+
+
+def refresh_all(supabase, countries: List[str], top_n: int = TOP_N, concurrency: int = 4,
+                stale_only: bool = False, details: bool = True) -> dict:
+    stats = {"countries": 0, "details": 0, "courses": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        jobs = {}
+        for country in countries:
+            rows = load_country(supabase, country, top_n) if stale_only else []
+            if not rows or any(is_stale(r.get("rankings_refreshed_at"), RANKINGS_MAX_AGE) for r in rows):
+                jobs[pool.submit(refresh_country, supabase, country, top_n)] = (country, None)
+        for future in as_completed(jobs):
+            try:
+                future.result()
+                stats["countries"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"rankings failed for {jobs[future][0]}: {e}", file=sys.stderr)
+
+        if details:
+            jobs = {}
+            for country in countries:
+                for name, stale in _stale_details(supabase, country).items():
+                    for stage, (_, refresh, _) in _STAGES.items():
+                        if stale[stage] or not stale_only:
+                            jobs[pool.submit(refresh, supabase, country, name)] = (stage, country, name)
+            for done, future in enumerate(as_completed(jobs), start=1):
+                try:
+                    future.result()
+                    stats[jobs[future][0]] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"details failed for {jobs[future]}: {e}", file=sys.stderr)
+                print(f"\rdetails {done}/{len(jobs)}", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--countries", nargs="*", default=COUNTRY_NAMES)
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stale-only", action="store_true", help="skip records that are still fresh")
+    parser.add_argument("--no-details", action="store_true", help="refresh rankings only")
+    args = parser.parse_args(argv)
+
+    import os
+    import streamlit as st
+    from supabase_client import get_supabase_client
+    if "OPENAI_API_KEY" not in os.environ:
+        os.environ["OPENAI_API_KEY"] = st.secrets["openai"]["api_key"]
+    stats = refresh_all(get_supabase_client(), args.countries, args.top_n, args.concurrency,
+                        stale_only=args.stale_only, details=not args.no_details)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""大学注册表：规范名称、别名、缩写、国家和官网域名
+
+数据来自 data/universities.json，可以用环境变量 OIC_UNIVERSITY_DATA 追加更多文件
+（多个路径用系统路径分隔符隔开，后面的文件覆盖同名大学）。
+
+名称解析顺序：规范化后精确匹配（O(1)）→ 括号内外的名称 → 名称中包含的已知大学名或缩写
+→ 按共有词筛选候选后用 difflib 模糊匹配。结果按 (名称, 国家) 缓存。
+"""
+import difflib
+import json
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+DATA_FILE = Path(__file__).parent / "data" / "universities.json"
+EXTRA_DATA_ENV = "OIC_UNIVERSITY_DATA"
+
+# 页面里的国家写法不统一（UK / United Kingdom）
+COUNTRY_ALIASES = {
+    "uk": "United Kingdom",
+    "united kingdom": "United Kingdom",
+    "great britain": "United Kingdom",
+    "england": "United Kingdom",
+    "scotland": "United Kingdom",
+    "wales": "United Kingdom",
+    "australia": "Australia",
+    "canada": "Canada",
+    "new zealand": "New Zealand",
+    "nz": "New Zealand",
+}
+
+# 建候选集时忽略的常见词
+STOPWORDS = {"university", "of", "the", "and", "college", "institute", "de", "at", "in"}
+
+FUZZY_CUTOFF = 0.85
+RESOLVE_CACHE_SIZE = 4096
+
+
+def normalize(name: str) -> str:
+    """小写、去重音、& → and、去标点、去掉开头的 the"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    text = text.lower().replace("&", " and ")
+    text = re.sub(r"['’.]", "", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    if text.startswith("the "):
+        text = text[4:]
+    return text
+
+
+def normalize_country(country: Optional[str]) -> Optional[str]:
+    if not country:
+        return None
+    return COUNTRY_ALIASES.get(normalize(country), country)
+
+
+class UniversityRegistry:
+    """大学注册表；entries 为 {"name", "country", "domain", "aliases", "abbreviations"} 字典"""
+
+    def __init__(self, entries: Iterable[dict] = ()):
+        self.entries: List[dict] = []
+        self._by_key: Dict[str, List[dict]] = {}
+        # 可以在更长的名称中按整词出现的键（多词名称和缩写）
+        self._phrases: Dict[str, List[dict]] = {}
+        self._by_token: Dict[str, set] = {}
+        # 解析结果缓存（每个实例一份，注册表变化时清空）
+        self._resolved: Dict[Tuple[str, Optional[str]], Optional[dict]] = {}
+        self._resolved_lock = threading.Lock()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: dict) -> None:
+        entry = dict(entry, country=normalize_country(entry.get("country")))
+        # 同名同国的大学以后加入的为准
+        for i, old in enumerate(self.entries):
+            if normalize(old["name"]) == normalize(entry["name"]) and old["country"] == entry["country"]:
+                self.entries[i] = entry
+                self._reindex()
+                return
+        self.entries.append(entry)
+        self._index(len(self.entries) - 1, entry)
+        with self._resolved_lock:
+            self._resolved.clear()
+
+    def _reindex(self) -> None:
+        self._by_key, self._phrases, self._by_token = {}, {}, {}
+        for i, entry in enumerate(self.entries):
+            self._index(i, entry)
+        with self._resolved_lock:
+            self._resolved.clear()
+
+    def _index(self, i: int, entry: dict) -> None:
+        names = [entry["name"]] + list(entry.get("aliases") or [])
+        abbreviations = list(entry.get("abbreviations") or [])
+        for name in names + abbreviations:
+            key = normalize(name)
+            if not key:
+                continue
+            self._by_key.setdefault(key, []).append(entry)
+            # 单个普通词（如 Oxford）太容易误中，只作精确匹配
+            if " " in key or name in abbreviations:
+                self._phrases.setdefault(key, []).append(entry)
+            for token in key.split():
+                if token not in STOPWORDS:
+                    self._by_token.setdefault(token, set()).add(i)
+
+    @staticmethod
+    def _pick(matches: List[dict], country: Optional[str]) -> Optional[dict]:
+        if country:
+            for entry in matches:
+                if entry["country"] == country:
+                    return entry
+            return None
+        return matches[0] if matches else None
+
+    def _exact(self, key: str, country: Optional[str]) -> Optional[dict]:
+        return self._pick(self._by_key.get(key, []), country)
+
+    def resolve(self, name: str, country: Optional[str] = None) -> Optional[dict]:
+        """把任意写法的大学名解析为注册表中的大学；找不到时返回 None"""
+        key = (name, country)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        # 解析在锁外进行；多个页面线程共用一个实例，淘汰和写入要加锁
+        result = self._resolve(name, country)
+        with self._resolved_lock:
+            if len(self._resolved) >= RESOLVE_CACHE_SIZE:
+                # 满了就丢掉最早的一条
+                self._resolved.pop(next(iter(self._resolved)), None)
+            self._resolved[key] = result
+        return result
+
+    def _resolve(self, name: str, country: Optional[str]) -> Optional[dict]:
+        country = normalize_country(country)
+        key = normalize(name)
+        if not key:
+            return None
+        entry = self._exact(key, country)
+        if entry is not None:
+            return entry
+
+        # “UNSW Sydney (University of New South Wales)” 这类写法
+        for part in re.split(r"[()\[\],–—-]", str(name)):
+            part_key = normalize(part)
+            if part_key and part_key != key:
+                entry = self._exact(part_key, country)
+                if entry is not None:
+                    return entry
+
+        # 名称中按整词出现的已知大学名或缩写，取最长的一个
+        padded = f" {key} "
+        tokens = [t for t in key.split() if t not in STOPWORDS]
+        candidates = set()
+        for token in tokens:
+            candidates |= self._by_token.get(token, set())
+        best = None
+        for i in candidates:
+            entry = self.entries[i]
+            if country and entry["country"] != country:
+                continue
+            for alias in [entry["name"]] + list(entry.get("aliases") or []) + list(entry.get("abbreviations") or []):
+                alias_key = normalize(alias)
+                if alias_key in self._phrases and f" {alias_key} " in padded:
+                    if best is None or len(alias_key) > len(best[0]):
+                        best = (alias_key, entry)
+        if best is not None:
+            return best[1]
+
+        # 模糊匹配：只在共有词的候选里比较
+        pool = {}
+        for i in candidates:
+            entry = self.entries[i]
+            if country and entry["country"] != country:
+                continue
+            for alias in [entry["name"]] + list(entry.get("aliases") or []):
+                pool[normalize(alias)] = entry
+        match = difflib.get_close_matches(key, list(pool), n=1, cutoff=FUZZY_CUTOFF)
+        return pool[match[0]] if match else None
+
+    def url(self, name: str, country: Optional[str] = None) -> str:
+        """大学官网主页；注册表中没有时返回搜索链接"""
+        entry = self.resolve(name, country)
+        if entry is not None and entry.get("domain"):
+            return f"https://www.{entry['domain']}"
+        return f"https://www.google.com/search?q={quote_plus(str(name))}"
+
+
+def load_entries(paths: Iterable[Path]) -> List[dict]:
+    entries = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            entries.extend(json.load(f))
+    return entries
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> UniversityRegistry:
+    """进程内共享的注册表（默认数据文件 + OIC_UNIVERSITY_DATA 中的文件）"""
+    paths = [DATA_FILE]
+    extra = os.environ.get(EXTRA_DATA_ENV, "")
+    paths += [Path(p) for p in extra.split(os.pathsep) if p]
+    return UniversityRegistry(load_entries(paths))
+
+
+def get_university_url(university_name: str, country: Optional[str] = None) -> str:
+    """获取大学官网主页链接"""
+    return get_registry().url(university_name, country)
@@ -0,0 +1,155 @@
+"""启动预热：部署后在应用报告就绪之前并行填充共享缓存
+
+预热内容：anzsco 和 ased_* 表、推荐 prompt（SYSTEM_PROMPT_2）用的 ASCED 候选领域列表和向量索引、
+四个国家的 QS 排名（知识库里还没有时调用 AI 生成并写入，过期时提交后台刷新），
+以及 bake 制品中的大学概况（见 bake.py；有制品时以上各项大多直接从制品读取）。
+
+每项任务在单独的守护线程中运行，有各自的时限，整体另有总时限（OIC_WARMUP_TIMEOUT 秒）。
+超时的任务不再等待，预热照常结束：线程无法终止，任务完成后结果仍会写入缓存；
+在此之前到达的会话由 Streamlit 的缓存锁等待同一次计算，不会重复查询。
+OIC_WARMUP=0 时跳过预热，直接就绪（本地开发用）。
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+WARMUP_ENABLED = os.environ.get("OIC_WARMUP", "1") != "0"
+WARMUP_TIMEOUT = float(os.environ.get("OIC_WARMUP_TIMEOUT", "120"))
+
+# 单项任务时限（秒）：读表很快；向量索引冷启动时要 embedding；排名缺失时要等 AI 生成
+TABLE_TIMEOUT = 20.0
+INDEX_TIMEOUT = 60.0
+RANKINGS_TIMEOUT = 90.0
+
+
+# 页面模块在导入时就读取 st.secrets，要等服务准备好运行环境后才能导入，所以都在函数内导入
+def _warm_rankings(country: str) -> List[dict]:
+    from reference_data import load_country_universities
+    from supabase_client import get_supabase_client
+    from university_kb import RANKINGS_MAX_AGE, is_stale, refresh_country, refresh_in_background
+
+    supabase = get_supabase_client()
+    rows = load_country_universities(country)
+    if not rows:
+        refresh_country(supabase, country)
+        load_country_universities.clear(country)
+        rows = load_country_universities(country)
+    elif any(is_stale(r.get("rankings_refreshed_at"), RANKINGS_MAX_AGE) for r in rows):
+        refresh_in_background(supabase, country)
+    return rows
+
+
+def warmup_tasks() -> List[Tuple[str, Callable, tuple, float]]:
+    """预热任务列表：(名称, 函数, 参数, 时限秒数)"""
+    from reference_data import (
+        ASCED_TABLES, get_field_index, load_anzsco, load_asced_detail, load_ased_table, seed_university_profiles,
+    )
+    from university_kb import COUNTRY_NAMES
+
+    tasks = [("anzsco", load_anzsco, (), TABLE_TIMEOUT)]
+    tasks += [(table, load_ased_table, (table,), TABLE_TIMEOUT) for table in ASCED_TABLES]
+    tasks.append(("candidate_fields", load_asced_detail, (), TABLE_TIMEOUT))
+    tasks.append(("field_index", get_field_index, (), INDEX_TIMEOUT))
+    tasks += [(f"rankings:{country}", _warm_rankings, (country,), RANKINGS_TIMEOUT)
+              for country in COUNTRY_NAMES]
+    # 只读 bake 制品，没有制品时为空操作
+    tasks.append(("profiles", seed_university_profiles, (), TABLE_TIMEOUT))
+    return tasks
+
+
+class Warmup:
+    """一次预热的执行和状态；所有任务结束、失败或超时后 ready 为 True"""
+
+    def __init__(self, tasks: List[Tuple[str, Callable, tuple, float]], timeout: float = WARMUP_TIMEOUT):
+        self.tasks = tasks
+        self.timeout = timeout
+        self.status: Dict[str, dict] = {name: {"state": "pending"} for name, *_ in tasks}
+        self.started_at: Optional[float] = None
+        self.elapsed: Optional[float] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> "Warmup":
+        self.started_at = time.monotonic()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _set(self, name: str, **fields) -> None:
+        with self._lock:
+            self.status[name] = dict(self.status[name], **fields)
+
+    def _call(self, name: str, fn: Callable, args: tuple, future: Future) -> None:
+        self._set(name, state="running")
+        start = time.monotonic()
+        try:
+            result = fn(*args)
+            # 超时后才完成的任务也记录下来，便于判断时限是否合适
+            self._set(name, state="ok", seconds=round(time.monotonic() - start, 2),
+                      items=len(result) if isinstance(result, list) else None)
+        except Exception as e:
+            self._set(name, state="failed", seconds=round(time.monotonic() - start, 2), error=str(e))
+        future.set_result(None)
+
+    def _run(self) -> None:
+        deadlines = {}
+        for name, fn, args, limit in self.tasks:
+            future = Future()
+            deadlines[future] = (name, self.started_at + min(limit, self.timeout))
+            threading.Thread(target=self._call, args=(name, fn, args, future),
+                             name=f"warmup-{name}", daemon=True).start()
+
+        pending = set(deadlines)
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f][1] <= now]:
+                pending.discard(future)
+                if not future.done():
+                    self._set(deadlines[future][0], state="timeout")
+            if not pending:
+                break
+            _, pending = wait(pending, timeout=min(deadlines[f][1] for f in pending) - now,
+                                 return_when=FIRST_COMPLETED)
+
+        self.elapsed = round(time.monotonic() - self.started_at, 2)
+        self._done.set()
+        failed = [name for name, s in self.status.items() if s["state"] in ("failed", "timeout")]
+        print(f"warmup finished in {self.elapsed}s"
+              + (f"; not warmed: {', '.join(failed)}" if failed else ""), file=sys.stderr)
+
+    def report(self) -> dict:
+        with self._lock:
+            tasks = {name: dict(s) for name, s in self.status.items()}
+        elapsed = self.elapsed
+        if elapsed is None and self.started_at is not None:
+            elapsed = round(time.monotonic() - self.started_at, 2)
+        return {"ready": self.ready, "elapsed": elapsed, "tasks": tasks}
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def start_warmup() -> Warmup:
+    """启动进程内的预热（只执行一次，重复调用返回同一个对象，不阻塞）"""
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Warmup(warmup_tasks() if WARMUP_ENABLED else []).start()
+        return _warmup
+
+
+def warmup_status() -> dict:
+    """就绪检查的内容；预热尚未启动时视为未就绪"""
+    if _warmup is None:
+        return {"ready": False, "elapsed": None, "tasks": {}}
+    return _warmup.report()